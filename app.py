@@ -3,10 +3,13 @@ import subprocess
 import threading
 import os
 import sys
+import json
 from pathlib import Path
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, Response, render_template, jsonify, request
 
 from diccionario_manager import DiccionarioManager
+from cola_revision import leer_revision, quitar_revision, buscar_revision
+from scrap_stock import aplicar_revision
 
 app = Flask(__name__, 
             template_folder='templates',
@@ -226,15 +229,19 @@ def diccionario_list():
     per_page = int(request.args.get('per_page', 50))
     filtro = request.args.get('filtro', 'todos')  # todos, con_traduccion, sin_traduccion
     search = request.args.get('search', '')
+    cursor = request.args.get('cursor')  # next_cursor de la página anterior
     
     try:
         result = diccionario_mgr.list_traducciones(
             page=page,
             per_page=per_page,
             filtro=filtro,
-            search=search
+            search=search,
+            cursor=cursor
         )
         return jsonify({"ok": True, "data": result})
+    except ValueError as e:
+        return jsonify({"ok": False, "msg": str(e)}), 400
     except Exception as e:
         return jsonify({"ok": False, "msg": str(e)}), 500
 
@@ -311,13 +318,29 @@ def diccionario_sugerencias(nombre_panacea):
 
 @app.route("/diccionario/export")
 def diccionario_export():
-    """Exporta el diccionario a JSON"""
+    """Exporta el diccionario a JSON (o NDJSON con ?formato=ndjson, gzip con ?gzip=1).
+    Se envía a medida que se leen las filas, sin armar el archivo antes."""
+    formato = request.args.get('formato', 'json')
+    comprimir = request.args.get('gzip', '0') in ('1', 'true')
     try:
-        filepath = diccionario_mgr.export_to_json()
-        return send_file(filepath, as_attachment=True, download_name="diccionario_panacea.json")
+        partes = diccionario_mgr.iter_export(formato=formato, comprimir=comprimir)
+        primera = next(partes)  # valida el formato antes de empezar la respuesta
+    except ValueError as e:
+        return jsonify({"ok": False, "msg": str(e)}), 400
     except Exception as e:
         return jsonify({"ok": False, "msg": str(e)}), 500
 
+    def generar():
+        yield primera
+        yield from partes
+
+    nombre = f"diccionario_panacea.{formato}" + (".gz" if comprimir else "")
+    mimetype = "application/gzip" if comprimir else ("application/x-ndjson" if formato == 'ndjson' else "application/json")
+    return Response(generar(), mimetype=mimetype, headers={
+        "Content-Disposition": f'attachment; filename="{nombre}"',
+        "X-Accel-Buffering": "no",  # que un proxy no lo junte entero antes de reenviarlo
+    })
+
 
 @app.route("/diccionario/import", methods=["POST"])
 def diccionario_import():
@@ -345,6 +368,49 @@ def diccionario_import():
         return jsonify({"ok": False, "msg": str(e)}), 500
 
 
+# ============================================================================
+# RUTAS - REVISIÓN DE STOCK (cola del modo desatendido)
+# ============================================================================
+
+@app.route("/stock/revision")
+def stock_revision_list():
+    """Lista los casos pendientes que dejó la carga desatendida"""
+    try:
+        return jsonify({"ok": True, "data": leer_revision()})
+    except Exception as e:
+        return jsonify({"ok": False, "msg": str(e)}), 500
+
+
+@app.route("/stock/revision/<item_id>", methods=["DELETE"])
+def stock_revision_delete(item_id):
+    """Marca un caso pendiente como resuelto (lo quita de la cola)"""
+    try:
+        if not quitar_revision(item_id):
+            return jsonify({"ok": False, "msg": "Caso no encontrado"}), 404
+        return jsonify({"ok": True, "msg": "Caso resuelto"})
+    except Exception as e:
+        return jsonify({"ok": False, "msg": str(e)}), 500
+
+
+@app.route("/stock/revision/<item_id>/aplicar", methods=["POST"])
+def stock_revision_aplicar(item_id):
+    """Carga el stock del caso (reemplaza el registro de ese día) y lo quita de la cola"""
+    try:
+        item = buscar_revision(item_id)
+        if item is None:
+            return jsonify({"ok": False, "msg": "Caso no encontrado"}), 404
+
+        data = request.get_json(silent=True) or {}
+        with diccionario_mgr.Session() as session:
+            aplicar_revision(session, item, data.get("producto_id"))
+        quitar_revision(item_id)
+        return jsonify({"ok": True, "msg": "Stock cargado"})
+    except ValueError as e:
+        return jsonify({"ok": False, "msg": str(e)}), 400
+    except Exception as e:
+        return jsonify({"ok": False, "msg": str(e)}), 500
+
+
 # ============================================================================
 # INICIO DE LA APLICACIÓN
 # ============================================================================
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Índice en memoria para el autocompletado de productos (/diccionario/productos-db).
+
+Cada nombre se indexa por sus bigramas y trigramas (en minúsculas y sin
+acentos). Una búsqueda toma la lista más corta entre los n-gramas del texto
+buscado y confirma la subcadena solo sobre esos candidatos, en vez de
+recorrer la tabla con ILIKE '%texto%'. Resultados ordenados: primero los que
+empiezan con el texto, después los que lo tienen al inicio de una palabra y
+por último el resto; dentro de cada grupo, los nombres más cortos.
+
+Como el índice de matching, no se modifica: con_cambios() arma uno nuevo que
+comparte las listas de los n-gramas que no cambiaron.
+
+Verificación contra una búsqueda lineal en tests/test_autocompletado.py;
+tiempos con python tests/bench_matching.py.
+"""
+import heapq
+import unicodedata
+from typing import Dict, List
+
+
+def clave_busqueda(texto) -> str:
+    """Minúsculas, sin acentos y con los espacios colapsados"""
+    if not texto: return ""
+    texto = str(texto).casefold()
+    if texto.isascii(): return " ".join(texto.split())
+    texto = unicodedata.normalize("NFKD", texto)
+    return " ".join("".join(c for c in texto if not unicodedata.combining(c)).split())
+
+
+def _ngramas(clave: str) -> set:
+    return {clave[i:i + n] for n in (2, 3) for i in range(len(clave) - n + 1)}
+
+
+class IndiceAutocompletado:
+    def __init__(self, ids: List[str], nombres: List[str]):
+        self.ids = list(ids)
+        self.nombres = list(nombres)
+        self.claves = [clave_busqueda(n) for n in self.nombres]
+        self.posiciones = {i: p for p, i in enumerate(self.ids)}
+        self.postings: Dict[str, List[int]] = {}
+        for pos, clave in enumerate(self.claves):
+            for ngrama in _ngramas(clave):
+                self.postings.setdefault(ngrama, []).append(pos)
+
+    def con_cambios(self, ids: List[str], nombres: List[str], borrados) -> "IndiceAutocompletado":
+        """Nuevo índice con los productos nuevos/modificados agregados al final y las
+        posiciones reemplazadas o borradas dadas de baja. Solo se copian las listas
+        de los n-gramas afectados."""
+        nuevo = object.__new__(IndiceAutocompletado)
+        nuevo.ids, nuevo.nombres, nuevo.claves = list(self.ids), list(self.nombres), list(self.claves)
+        nuevo.posiciones = dict(self.posiciones)
+        nuevo.postings = dict(self.postings)
+        bajas = {}
+        for id_producto in set(ids) | set(borrados):
+            pos = nuevo.posiciones.pop(id_producto, None)
+            if pos is None: continue
+            for ngrama in _ngramas(nuevo.claves[pos]):
+                bajas.setdefault(ngrama, set()).add(pos)
+            nuevo.ids[pos] = nuevo.nombres[pos] = nuevo.claves[pos] = None
+        for ngrama, posiciones in bajas.items():
+            nuevo.postings[ngrama] = [p for p in nuevo.postings[ngrama] if p not in posiciones]
+        copiadas = set(bajas)
+
+        def lista(ngrama):
+            if ngrama not in copiadas:
+                nuevo.postings[ngrama] = list(nuevo.postings.get(ngrama, ()))
+                copiadas.add(ngrama)
+            return nuevo.postings[ngrama]
+
+        for id_producto, nombre in zip(ids, nombres):
+            pos = len(nuevo.ids)
+            clave = clave_busqueda(nombre)
+            nuevo.ids.append(id_producto)
+            nuevo.nombres.append(nombre)
+            nuevo.claves.append(clave)
+            nuevo.posiciones[id_producto] = pos
+            for ngrama in _ngramas(clave):
+                lista(ngrama).append(pos)
+        for ngrama in copiadas:
+            if not nuevo.postings[ngrama]: del nuevo.postings[ngrama]
+        return nuevo
+
+    def buscar(self, texto: str, limite: int = 20) -> List[Dict]:
+        q = clave_busqueda(texto)
+        claves = self.claves
+        if len(q) >= 2:
+            # Cualquier lista contiene todos los resultados (para 2 letras es exacta):
+            # se parte de la más corta y, si es grande, se cruza con la siguiente
+            n = min(3, len(q))
+            listas = sorted((self.postings.get(ngrama, ()) for ngrama in _ngramas(q) if len(ngrama) == n), key=len)
+            candidatos = listas[0]
+            if len(listas) > 1 and len(candidatos) > 256:
+                candidatos = set(candidatos).intersection(listas[1])
+        else:
+            candidatos = self.posiciones.values()
+
+        # Por grupo (empieza con / inicio de palabra / en el medio), después más cortos
+        q_palabra = " " + q
+        grupos = ([], [], [])
+        for p in candidatos:
+            clave = claves[p]
+            if clave.startswith(q): grupos[0].append(p)
+            elif q_palabra in clave: grupos[1].append(p)
+            elif q in clave: grupos[2].append(p)
+
+        resultado = []
+        for grupo in grupos:
+            faltan = limite - len(resultado)
+            if faltan <= 0: break
+            resultado += heapq.nsmallest(faltan, grupo, key=lambda p: (len(claves[p]), claves[p], p))
+        return [{"id": self.ids[p], "nombre": self.nombres[p]} for p in resultado]
+
+    def __len__(self):
+        return len(self.posiciones)
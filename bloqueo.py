@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Bloqueo para el matching del diccionario: antes de comparar un nombre de
+Panacea contra todo el catálogo se lo restringe a los productos compatibles
+en laboratorio, forma farmacéutica y dosis/tamaño.
+
+Los atributos salen del nombre ya normalizado (normalizar_texto deja las
+formas y unidades en forma canónica: COMP, INY, GOT, 30 ML, 500 MG...) y,
+para el laboratorio, de un vocabulario armado con la columna LABORATORIO de
+productos.csv. Cada atributo es un conjunto; dos nombres son compatibles si
+para cada atributo alguno de los dos no lo tiene o comparten algún valor.
+
+Verificación sobre productos.csv en tests/test_bloqueo.py; aciertos, falsos
+positivos y tiempos con y sin bloqueo con python tests/bench_matching.py.
+"""
+import re
+import csv
+from pathlib import Path
+from functools import lru_cache
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, List, Tuple
+
+import numpy as np
+
+from normalizacion import normalizar_texto
+
+# Al lado del módulo, no del directorio de trabajo (la app y los scripts corren desde otros)
+PATH_PRODUCTOS_CSV = Path(__file__).resolve().parent / "productos.csv"
+
+# Token del nombre normalizado -> forma. AMP no entra: normalizar_texto también
+# lleva FCO/FRASCO a AMP y es envase, no forma. Los masticables son comprimidos.
+FORMAS = {
+    'COMP': 'COMP', 'PALAT': 'COMP', 'INY': 'INY', 'SUSP': 'SUSP', 'SOL': 'SOL', 'GOT': 'GOT',
+    'PIPETA': 'PIPETA', 'PIPETAS': 'PIPETA', 'CREMA': 'CREMA', 'SPRAY': 'SPRAY', 'COLLAR': 'COLLAR',
+    'POLVO': 'POLVO', 'SHAMPOO': 'SHAMPOO', 'GEL': 'GEL', 'JARABE': 'JARABE',
+}
+RE_PALABRA = re.compile(r"[A-ZÑ]+")
+RE_DOSIS = re.compile(r"(?<![\d.])(\d+(?:\.\d+)?) ?(ML|MG|GR|KG)\b")
+
+# Palabras de la columna LABORATORIO que no identifican al laboratorio
+PALABRAS_NO_LABORATORIO = {"CAD", "FRIO", "ARGENTINA", "GROUP", "VARIOS", "ALIMENTOS", "SPOT", "LAB"}
+
+Atributos = Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]  # (laboratorio, forma, dosis)
+
+
+@lru_cache(maxsize=4)
+def vocabulario_laboratorios(path_csv: Path = PATH_PRODUCTOS_CSV) -> Dict[str, str]:
+    """Palabra -> laboratorio, a partir de LABORATORIO de productos.csv. Se descartan
+    las palabras que aparecen más en nombres de otros laboratorios que del propio.
+    Se lee una vez por proceso: cada índice nuevo reutiliza el mismo vocabulario."""
+    if not path_csv.exists():
+        print(f"[WARN] No se encontró {path_csv}: el bloqueo del matching no usa laboratorio.")
+        return {}
+    with open(path_csv, encoding="utf-8", errors="replace") as f:
+        filas = [(fila.get("PRODUCTO") or "", (fila.get("LABORATORIO") or "").upper()) for fila in csv.DictReader(f)]
+
+    vocabulario = {}
+    for _, laboratorio in filas:
+        palabras = [p for p in RE_PALABRA.findall(laboratorio) if len(p) >= 4 and p not in PALABRAS_NO_LABORATORIO]
+        if not palabras: continue
+        for palabra in palabras:
+            vocabulario.setdefault(palabra, palabras[0])  # "BOEHRINGER CAD. DE FRIO" -> BOEHRINGER
+
+    propios, ajenos = Counter(), Counter()
+    for nombre, laboratorio in filas:
+        for palabra in set(RE_PALABRA.findall(normalizar_texto(nombre))) & vocabulario.keys():
+            (propios if vocabulario[palabra] in laboratorio else ajenos)[palabra] += 1
+    return {p: lab for p, lab in vocabulario.items() if ajenos[p] <= propios[p]}
+
+
+def extraer_atributos(nombre_limpio: str, laboratorios: Dict[str, str]) -> Atributos:
+    palabras = RE_PALABRA.findall(nombre_limpio)
+    laboratorio = frozenset(laboratorios[p] for p in palabras if p in laboratorios)
+    forma = frozenset(FORMAS[p] for p in palabras if p in FORMAS)
+    dosis = frozenset(f"{float(n):g}{u}" for n, u in RE_DOSIS.findall(nombre_limpio))
+    return laboratorio, forma, dosis
+
+
+class Bloques:
+    """Por atributo: valor -> posiciones de productos que lo tienen, y posiciones
+    de los productos que no tienen ninguno (compatibles con cualquier consulta)."""
+    LABORATORIO, FORMA, DOSIS = range(3)
+
+    def __init__(self, nombres_limpios: List[str], laboratorios: Dict[str, str]):
+        self.laboratorios = laboratorios
+        self.n_productos = len(nombres_limpios)
+        por_valor = [defaultdict(list) for _ in range(3)]
+        sin_valor = [[] for _ in range(3)]
+        for pos, nombre in enumerate(nombres_limpios):
+            for i, valores in enumerate(extraer_atributos(nombre, laboratorios)):
+                if not valores: sin_valor[i].append(pos)
+                for valor in valores: por_valor[i][valor].append(pos)
+        self.sin_valor = [np.array(s, dtype=np.int64) for s in sin_valor]
+        self.por_valor = [{v: np.array(p, dtype=np.int64) for v, p in d.items()} for d in por_valor]
+
+    def con_cambios(self, mantener: np.ndarray, nombres_nuevos: List[str]) -> "Bloques":
+        """Bloques sin las posiciones con mantener=False y con nombres_nuevos al final
+        (el orden de IndiceMatching.con_cambios). Solo se extraen los atributos de los
+        nombres nuevos; las posiciones que quedan se renumeran."""
+        bloques = object.__new__(Bloques)
+        bloques.laboratorios = self.laboratorios
+        quedan = int(np.count_nonzero(mantener))
+        bloques.n_productos = quedan + len(nombres_nuevos)
+        renumerar = np.cumsum(mantener) - 1
+
+        def ajustar(posiciones):
+            if quedan == self.n_productos: return posiciones
+            return renumerar[posiciones[mantener[posiciones]]]
+
+        por_valor = [defaultdict(list) for _ in range(3)]
+        sin_valor = [[] for _ in range(3)]
+        for pos, nombre in enumerate(nombres_nuevos, start=quedan):
+            for i, valores in enumerate(extraer_atributos(nombre, self.laboratorios)):
+                if not valores: sin_valor[i].append(pos)
+                for valor in valores: por_valor[i][valor].append(pos)
+
+        bloques.sin_valor = [np.concatenate([ajustar(anterior), np.array(s, dtype=np.int64)])
+                             for anterior, s in zip(self.sin_valor, sin_valor)]
+        bloques.por_valor = []
+        for anteriores, agregados in zip(self.por_valor, por_valor):
+            d = {}
+            for valor, posiciones in anteriores.items():
+                posiciones = ajustar(posiciones)
+                if len(posiciones): d[valor] = posiciones
+            for valor, p in agregados.items():
+                nuevas = np.array(p, dtype=np.int64)
+                d[valor] = np.concatenate([d[valor], nuevas]) if valor in d else nuevas
+            bloques.por_valor.append(d)
+        return bloques
+
+    def compatibles(self, atributo: int, valores: FrozenSet[str]) -> np.ndarray:
+        """Máscara de productos compatibles con los valores de un atributo"""
+        if not valores: return np.ones(self.n_productos, dtype=bool)
+        mascara = np.zeros(self.n_productos, dtype=bool)
+        mascara[self.sin_valor[atributo]] = True
+        for valor in valores:
+            if valor in self.por_valor[atributo]: mascara[self.por_valor[atributo][valor]] = True
+        return mascara
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP compartido para el scraping de stock.
+
+- Pool de conexiones keep-alive (requests.Session + HTTPAdapter).
+- Reintentos clasificados: solo se reintentan errores transitorios
+  (conexión, timeout, 429 y 5xx) con backoff exponencial + jitter.
+- Circuit breaker por host: tras N fallos seguidos (más que los reintentos de
+  un request) deja de pegarle al host durante un tiempo y luego prueba con un
+  único request (half-open).
+- Métricas por request: latencia y resultado, con un resumen al final.
+
+Verificación contra un servidor local que inyecta fallas en tests/test_cliente_http.py.
+"""
+import time
+import random
+import threading
+from collections import Counter
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+STATUS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+class ErrorHTTP(Exception):
+    """El request falló de forma definitiva (no reintentable o reintentos agotados)."""
+    def __init__(self, mensaje, status=None):
+        super().__init__(mensaje)
+        self.status = status
+        # Red, 429 o 5xx: el host puede recuperarse. Otro 4xx es un problema del request.
+        self.transitorio = status is None or status in STATUS_REINTENTABLES
+
+
+class CircuitoAbierto(ErrorHTTP):
+    """El host acumuló demasiados fallos seguidos y está en enfriamiento."""
+
+
+class CircuitBreaker:
+    def __init__(self, umbral_fallos=10, enfriamiento=120.0):
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.fallos = 0
+        self.abierto_desde = None
+        self.probando = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self.abierto_desde is None: return True
+            # Half-open: pasado el enfriamiento pasa un único request de prueba;
+            # los demás esperan a que ese cierre (éxito) o reabra (fallo) el circuito
+            if self.probando or time.monotonic() - self.abierto_desde < self.enfriamiento: return False
+            self.probando = True
+            return True
+
+    def registrar_exito(self):
+        with self._lock:
+            self.fallos = 0
+            self.abierto_desde = None
+            self.probando = False
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.probando or self.fallos >= self.umbral_fallos:
+                self.abierto_desde = time.monotonic()
+            self.probando = False
+
+
+class ClienteHTTP:
+    def __init__(self, headers=None, max_reintentos=5, backoff_base=2.0, backoff_max=120.0,
+                 timeout=(10, 60), umbral_circuito=10, enfriamiento_circuito=120.0, pool=10):
+        self.session = requests.Session()
+        if headers: self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.umbral_circuito = umbral_circuito
+        self.enfriamiento_circuito = enfriamiento_circuito
+
+        self._circuitos = {}
+        self._lock = threading.Lock()
+        self.resultados = Counter()
+        self.latencias = []
+
+    def _circuito(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._circuitos:
+                self._circuitos[host] = CircuitBreaker(self.umbral_circuito, self.enfriamiento_circuito)
+            return self._circuitos[host]
+
+    def _registrar(self, resultado, inicio):
+        with self._lock:
+            self.resultados[resultado] += 1
+            self.latencias.append(time.perf_counter() - inicio)
+
+    def _espera(self, intento, response=None):
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return min(float(response.headers["Retry-After"]), self.backoff_max)
+        espera = min(self.backoff_base * (2 ** intento), self.backoff_max)
+        return random.uniform(espera / 2, espera)
+
+    def request(self, metodo, url, **kwargs):
+        circuito = self._circuito(url)
+        kwargs.setdefault("timeout", self.timeout)
+        ultimo_error = None
+
+        for intento in range(self.max_reintentos + 1):
+            if not circuito.permitir():
+                with self._lock:
+                    self.resultados["circuito_abierto"] += 1
+                raise CircuitoAbierto(f"Circuito abierto para {urlparse(url).netloc}")
+
+            inicio = time.perf_counter()
+            response = None
+            try:
+                response = self.session.request(metodo, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._registrar("error_red", inicio)
+                ultimo_error = ErrorHTTP(f"{type(e).__name__}: {e}")
+            except Exception:
+                circuito.registrar_fallo()  # no dejar un request de prueba colgado
+                raise
+            else:
+                if response.status_code < 400:
+                    self._registrar("ok", inicio)
+                    circuito.registrar_exito()
+                    return response
+                self._registrar(f"http_{response.status_code}", inicio)
+                ultimo_error = ErrorHTTP(f"Status {response.status_code}", response.status_code)
+                if not ultimo_error.transitorio:
+                    # Error del cliente: reintentar no lo arregla y el host respondió bien
+                    circuito.registrar_exito()
+                    raise ultimo_error
+
+            circuito.registrar_fallo()
+            if intento < self.max_reintentos:
+                espera = self._espera(intento, response)
+                print(f"\n     [RETRY] {ultimo_error} - intento {intento + 1}/{self.max_reintentos}, "
+                      f"esperando {espera:.1f}s", flush=True)
+                time.sleep(espera)
+
+        raise ultimo_error
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def resumen(self):
+        total = sum(v for k, v in self.resultados.items() if k != "circuito_abierto")
+        if not self.latencias:
+            return "Sin requests."
+        lat = sorted(self.latencias)
+        p50 = lat[len(lat) // 2]
+        p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+        detalle = ", ".join(f"{k}={v}" for k, v in sorted(self.resultados.items()))
+        return f"{total} requests | p50 {p50 * 1000:.0f}ms | p95 {p95 * 1000:.0f}ms | {detalle}"
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Cola de revisión de la carga de stock desatendida (outputs/revision_stock.json).
+
+La escriben dos procesos, a veces a la vez: scrap_stock.py --batch agrega
+casos y la app web los quita al resolverlos. Cada lectura-modificación-escritura
+se hace con un lock exclusivo sobre un archivo .lock al lado de la cola, y el
+JSON se escribe en un temporal que después reemplaza al original (os.replace),
+así ningún lector ve un archivo a medio escribir.
+"""
+import os
+import json
+from contextlib import contextmanager
+
+PATH_REVISION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outputs", "revision_stock.json")
+
+if os.name == "nt":
+    import msvcrt
+
+    def _bloquear(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _liberar(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _bloquear(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _liberar(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _bloqueo(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "a+") as f:
+        _bloquear(f)
+        try:
+            yield
+        finally:
+            _liberar(f)
+
+
+def leer_revision(path=PATH_REVISION):
+    """Casos pendientes. Un archivo ilegible es un error: tratarlo como cola vacía
+    haría que la próxima escritura la pise entera."""
+    if not os.path.exists(path): return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _guardar(items, path):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(items, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _clave(item):
+    """Un caso por tipo, nombre y día: lo del día siguiente es otro stock a revisar."""
+    return item.get("tipo"), item.get("nombre"), (item.get("fecha") or "")[:10]
+
+
+def encolar_revision(nuevos, path=PATH_REVISION):
+    """Agrega a la cola los casos que el modo desatendido no resolvió. Si el mismo
+    caso ya estaba para ese día (una carga repetida), se actualiza con el último stock."""
+    if not nuevos: return
+    with _bloqueo(path):
+        pendientes = leer_revision(path)
+        por_clave = {_clave(p): p for p in pendientes}
+        agregados = actualizados = 0
+        for item in nuevos:
+            existente = por_clave.get(_clave(item))
+            if existente is not None:
+                existente.update({k: v for k, v in item.items() if k != "id"})
+                actualizados += 1
+                continue
+            por_clave[_clave(item)] = item
+            pendientes.append(item)
+            agregados += 1
+        _guardar(pendientes, path)
+    print(f">> Cola de revisión: {agregados} nuevos, {actualizados} actualizados "
+          f"({len(pendientes)} pendientes) -> {path}")
+
+
+def buscar_revision(item_id, path=PATH_REVISION):
+    """El caso con ese id, o None."""
+    return next((p for p in leer_revision(path) if p.get("id") == item_id), None)
+
+
+def quitar_revision(item_id, path=PATH_REVISION) -> bool:
+    """Quita un caso resuelto. False si no estaba en la cola."""
+    with _bloqueo(path):
+        pendientes = leer_revision(path)
+        restantes = [p for p in pendientes if p.get("id") != item_id]
+        if len(restantes) == len(pendientes): return False
+        _guardar(restantes, path)
+    return True
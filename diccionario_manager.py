@@ -1,25 +1,89 @@
 # -*- coding: utf-8 -*-
 import os
 import json
-import re
+import base64
+import zlib
+import time
+import shutil
+import threading
+import sys
 from pathlib import Path
 from typing import Dict, List, Optional
-from datetime import datetime
-from uuid import uuid4
+from datetime import datetime, timedelta
+from uuid import UUID as UUIDPy, uuid4
+from itertools import islice
 
 # Librerías de ML y Data
+import numpy as np
 import pandas as pd
-from sklearn.neighbors import NearestNeighbors
+import joblib
+import sklearn
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import TfidfVectorizer # <--- FALTABA ESTE IMPORT
 
 # SQLAlchemy Imports
-from sqlalchemy import create_engine, text, func, Column, String, Float, DateTime, Boolean, ForeignKey
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, text, func, insert, select, tuple_, literal_column, Column, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy.orm import sessionmaker, declarative_base, relationship, contains_eager
 from sqlalchemy.dialects.postgresql import UUID
 from dotenv import load_dotenv
 
+from lector_json import iterar_productos
+from normalizacion import normalizar_texto
+from autocompletado import IndiceAutocompletado
+from similitud import MotorSimilitud
+from bloqueo import Bloques, extraer_atributos, vocabulario_laboratorios
+
 load_dotenv()
 
+# Índice de matching persistido (vectorizer + matriz TF-IDF + ids/nombres).
+# Se reutiliza mientras la huella de la tabla productos no cambie.
+PATH_INDICE_MATCHING = Path("outputs/indice_matching")
+PARAMS_TFIDF = dict(analyzer='char_wb', ngram_range=(2, 5), max_features=6000, min_df=1, sublinear_tf=True)
+VERSION_INDICE_MATCHING = 2  # subir si cambia normalizar_texto o el armado del índice
+
+# Mantenimiento incremental: cada cuánto se mira la marca de productos, cuánto
+# se retrocede al buscar cambios (transacciones largas que commitean tarde con
+# un now() anterior) y cuándo conviene un refit completo en segundo plano.
+INTERVALO_VERIFICACION_INDICE = 30          # segundos
+MARGEN_MARCA_INDICE = timedelta(minutes=10)
+PROPORCION_REFIT_INDICE = 0.10              # filas incorporadas / total
+INTERVALO_REFIT_INDICE = 6 * 3600           # segundos con cambios sin refit
+
+# Nombres por consulta IN al buscar alias existentes (con psycopg2 alcanza una sola en la práctica)
+TAMANO_LOTE_ALIAS = 10000
+
+# Estadísticas del diccionario: se recalculan como mucho cada TTL_STATS segundos
+# (las escrituras propias las invalidan al instante)
+TTL_STATS = 30
+
+# Listado de traducciones: orden (confianza desc, texto, id) como una sola clave
+# ascendente para que el cursor sea una comparación de tuplas sobre un índice
+INDICE_LISTADO_ALIAS = "ix_producto_alias_listado"
+INDICE_TEXTO_ALIAS = "ix_producto_alias_texto_trgm"
+# Se crean una sola vez con: python diccionario_manager.py --migrar
+INDICES_ALIAS = {
+    INDICE_LISTADO_ALIAS: "ON producto_alias (origen, (-coalesce(confianza, -1)), texto_original, id)",
+    INDICE_TEXTO_ALIAS: "ON producto_alias USING gin (texto_original gin_trgm_ops)",
+}
+
+# Exportación: filas por lote del cursor del servidor (y por parte enviada)
+TAMANO_LOTE_EXPORT = 5000
+FORMATOS_EXPORT = ('json', 'ndjson')
+_json_compacto = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _clave_json(valor) -> str:
+    """Clave de objeto JSON como la convierte json.dump: None -> "null", el resto con str."""
+    return _json_compacto("null" if valor is None else str(valor))
+
+
+# Memoria máxima de la matriz de distancias (nombres x productos) por bloque de matching
+MEMORIA_BLOQUE_MATCHING = 64 * 1024 * 1024
+
+# Bloqueo por laboratorio/forma/dosis (ver bloqueo.py): si el mejor candidato del
+# bloque no llega a esta confianza el nombre se vuelve a buscar en todo el índice
+CONFIANZA_MINIMA_BLOQUE = 60.0
+
 # ============================================================================
 # DEFINICIÓN LOCAL DE MODELOS (Para no depender de src.core.models)
 # ============================================================================
@@ -51,6 +115,155 @@ class ProductoAlias(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     external_id = Column(String, nullable=True) 
 
+    producto = relationship(Producto)
+
+# ============================================================================
+# ÍNDICE DE MATCHING
+# ============================================================================
+
+class IndiceMatching:
+    """Productos + vectorizer + matriz TF-IDF + motor de vecinos. No se modifica: cada
+    actualización arma uno nuevo y el manager reemplaza la referencia, así que
+    una búsqueda en curso siempre ve un estado consistente."""
+
+    def __init__(self, productos: pd.DataFrame, vectorizer, matriz, marca=None, filas_incrementales: int = 0,
+                 autocompletado: Optional[IndiceAutocompletado] = None, transpuesta=None):
+        self.productos = productos.reset_index(drop=True)
+        self.vectorizer = vectorizer
+        self.matriz = matriz
+        self.marca = marca  # (cantidad, max timestamp) de productos al momento de armarlo
+        self.filas_incrementales = filas_incrementales
+        self.creado = time.monotonic()
+        self.motor = MotorSimilitud(matriz, transpuesta=transpuesta)
+        self._autocompletado = autocompletado
+        self._bloques = None
+        self._fragmentos_dosis = None
+
+    @property
+    def bloques(self) -> Bloques:
+        """Productos por laboratorio/forma/dosis, armado recién la primera vez que se usa"""
+        if self._bloques is None:
+            self._bloques = Bloques(self.productos['nombre_limpio'].tolist(), vocabulario_laboratorios())
+        return self._bloques
+
+    @property
+    def fragmentos_dosis(self) -> Dict[Optional[str], MotorSimilitud]:
+        """Un motor por valor de dosis con los productos que la tienen, y otro (None)
+        con los que no tienen dosis: una consulta con dosis solo mira esos fragmentos."""
+        if self._fragmentos_dosis is None:
+            bloques = self.bloques
+            fragmentos = {v: self.motor.subconjunto(p) for v, p in bloques.por_valor[Bloques.DOSIS].items()}
+            if len(bloques.sin_valor[Bloques.DOSIS]):
+                fragmentos[None] = self.motor.subconjunto(bloques.sin_valor[Bloques.DOSIS])
+            self._fragmentos_dosis = fragmentos
+        return self._fragmentos_dosis
+
+    @property
+    def autocompletado(self) -> IndiceAutocompletado:
+        """Índice de n-gramas para el autocompletado, armado recién la primera vez que se usa"""
+        if self._autocompletado is None:
+            self._autocompletado = IndiceAutocompletado(self.productos['id'].tolist(), self.productos['nombre'].tolist())
+        return self._autocompletado
+
+    def con_cambios(self, cambios: pd.DataFrame, borrados) -> "IndiceMatching":
+        """Nuevo índice con los productos nuevos/modificados transformados con el
+        vocabulario actual (sin refit) y sin las filas reemplazadas o borradas."""
+        afectados = set(cambios['id']) | set(borrados)
+        mantener = ~self.productos['id'].isin(afectados).to_numpy()
+        partes = [self.matriz[mantener]]
+        if len(cambios): partes.append(self.vectorizer.transform(cambios['nombre_limpio']))
+        autocompletado = None
+        if self._autocompletado is not None:
+            autocompletado = self._autocompletado.con_cambios(cambios['id'].tolist(), cambios['nombre'].tolist(), borrados)
+        indice = IndiceMatching(
+            pd.concat([self.productos[mantener], cambios], ignore_index=True),
+            self.vectorizer, vstack(partes).tocsr(), self.marca, self.filas_incrementales + len(cambios), autocompletado
+        )
+        indice.creado = self.creado
+        # Bloques y fragmentos se actualizan solo con las filas que cambiaron
+        if self._bloques is not None:
+            indice._bloques = self._bloques.con_cambios(mantener, cambios['nombre_limpio'].tolist())
+            if self._fragmentos_dosis is not None:
+                indice._fragmentos_dosis = self._fragmentos_con_cambios(indice, mantener)
+        return indice
+
+    def _fragmentos_con_cambios(self, indice: "IndiceMatching", mantener: np.ndarray) -> Dict[Optional[str], MotorSimilitud]:
+        """Fragmentos de dosis de `indice` a partir de los propios: uno que no perdió
+        ni ganó productos reutiliza su matriz y solo renumera posiciones; el resto
+        se vuelve a recortar del motor nuevo."""
+        renumerar = np.cumsum(mantener) - 1
+        bloques = indice.bloques
+        nuevos = dict(bloques.por_valor[Bloques.DOSIS])
+        if len(bloques.sin_valor[Bloques.DOSIS]): nuevos[None] = bloques.sin_valor[Bloques.DOSIS]
+
+        fragmentos = {}
+        for valor, posiciones in nuevos.items():
+            anterior = self._fragmentos_dosis.get(valor)
+            if anterior is not None and len(anterior.posiciones) == len(posiciones) and mantener[anterior.posiciones].all():
+                fragmento = MotorSimilitud(anterior.normalizada, anterior.hilos, transpuesta=anterior.transpuesta)
+                fragmento.posiciones = renumerar[anterior.posiciones]
+            else:
+                fragmento = indice.motor.subconjunto(posiciones)
+            fragmentos[valor] = fragmento
+        return fragmentos
+
+    def mejor_match(self, nombres_limpios: List[str], memoria_bloque: int = MEMORIA_BLOQUE_MATCHING, bloqueo: bool = True):
+        """Producto más parecido para cada nombre, en lote: un transform y un top-1
+        por bloques de consultas que no pasan de memoria_bloque (ver similitud.py).
+        Con bloqueo (ver bloqueo.py) un nombre con dosis se compara solo contra los
+        fragmentos de su dosis y el de productos sin dosis, y laboratorio y forma
+        descartan los incompatibles. Sin atributos, sin candidatos o con un mejor
+        candidato flojo se vuelve a buscar en todo el índice.
+        Devuelve (posiciones en self.productos, confianzas 0-100)."""
+        if not nombres_limpios: return np.array([], dtype=int), np.array([])
+        vec = self.vectorizer.transform(nombres_limpios)
+        posiciones = np.zeros(len(nombres_limpios), dtype=int)
+        confianzas = np.full(len(nombres_limpios), -np.inf)
+
+        if bloqueo:
+            atributos = [extraer_atributos(n, self.bloques.laboratorios) for n in nombres_limpios]
+            por_motor = {}  # motor -> filas que lo consultan
+            for i, (laboratorio, forma, dosis) in enumerate(atributos):
+                if dosis:
+                    for valor in list(dosis) + [None]:
+                        if valor in self.fragmentos_dosis: por_motor.setdefault(self.fragmentos_dosis[valor], []).append(i)
+                elif laboratorio or forma:
+                    por_motor.setdefault(self.motor, []).append(i)
+
+            mascaras = {}  # (laboratorio, forma) -> productos compatibles
+
+            def compatibles(laboratorio, forma):
+                if (laboratorio, forma) not in mascaras:
+                    mascaras[(laboratorio, forma)] = (self.bloques.compatibles(Bloques.LABORATORIO, laboratorio)
+                                                      & self.bloques.compatibles(Bloques.FORMA, forma))
+                return mascaras[(laboratorio, forma)]
+
+            for motor, filas in por_motor.items():
+                columnas = motor.posiciones if motor.posiciones is not None else slice(None)
+                # De a lotes para acotar la máscara de permitidos (consultas x productos del motor)
+                for inicio in range(0, len(filas), 1024):
+                    lote = filas[inicio:inicio + 1024]
+                    permitidos = None
+                    if any(atributos[i][0] or atributos[i][1] for i in lote):
+                        permitidos = np.stack([compatibles(*atributos[i][:2])[columnas] for i in lote])
+                    distancias, indices = motor.kneighbors(vec[lote], 1, memoria_bloque, permitidos)
+                    nuevas = (1 - distancias[:, 0]) * 100
+                    # Entre fragmentos gana la mayor confianza; a igual confianza, la menor posición
+                    mejora = (nuevas > confianzas[lote]) | ((nuevas == confianzas[lote]) & (indices[:, 0] < posiciones[lote]))
+                    lote = np.asarray(lote)[mejora]
+                    posiciones[lote], confianzas[lote] = indices[mejora, 0], nuevas[mejora]
+
+        completo = np.flatnonzero(confianzas < CONFIANZA_MINIMA_BLOQUE)
+        if len(completo):
+            distancias, indices = self.motor.kneighbors(vec[completo], 1, memoria_bloque)
+            posiciones[completo], confianzas[completo] = indices[:, 0], (1 - distancias[:, 0]) * 100
+        return posiciones, confianzas
+
+    def necesita_refit(self) -> bool:
+        if not self.filas_incrementales: return False
+        return (self.filas_incrementales > len(self.productos) * PROPORCION_REFIT_INDICE
+                or time.monotonic() - self.creado > INTERVALO_REFIT_INDICE)
+
 # ============================================================================
 # CLASE PRINCIPAL
 # ============================================================================
@@ -89,100 +302,164 @@ class DiccionarioManager:
         except Exception as e:
             print(f"--- [DEBUG] ❌ ERROR DE CONEXIÓN BD: {e}")
             print("Asegúrate de tener el puerto 5432 expuesto en Docker y el archivo .env creado.")
+        self._verificar_indices_alias()
         
-        self._productos_cache = None
-        self._vectorizer = None
-        self._nn_model = None
+        self._indice = None
+        self._lock_indice = threading.Lock()
+        self._ultima_verificacion = 0.0
+        self._refit_en_curso = False
+        self._stats = None
+        self._stats_vencen = 0.0
+        self._totales_busqueda = {}  # search -> (total, vence)
     
     # ------------------------------------------------------------------------
     # (El resto del código es idéntico al tuyo, solo he arreglado imports faltantes)
     # ------------------------------------------------------------------------
 
     def normalizar_texto(self, texto: str) -> str:
-        if not texto: return ""
-        texto = texto.upper().strip()
-        texto = texto.replace(',', '.')
-        texto = re.sub(r'\s*-\s*', '-', texto)
-        
-        traducciones = {
-            'GOLD': 'DORADO', 'YELLOW': 'DORADO', 'PURPLE': 'PURPURA', 'VIOLET': 'PURPURA',
-            'CARAMEL': 'CARAMELO', 'ORANGE': 'CARAMELO', 'TEAL': 'AZUL', 'BLUE': 'AZUL',
-            'GREEN': 'VERDE', 'BROWN': 'MARRON'
-        }
-        for eng, esp in traducciones.items():
-            texto = re.sub(rf'\b{eng}\b', esp, texto)
-        
-        # Normalizaciones médicas
-        texto = re.sub(r'\b(ML|CC|CM3|MILILITROS?)\b', 'ML', texto)
-        texto = re.sub(r'\b(GR|GRS|GRAM|GRAMOS?)\b', 'GR', texto)
-        texto = re.sub(r'\b(KG|KGS|KILO|KILOS)\b', 'KG', texto)
-        texto = re.sub(r'\b(MG|MGR|MILIGRAMOS?)\b', 'MG', texto)
-        texto = re.sub(r'\b(COMP|COMPRIMIDOS?|CS|CAPS|CAPSULAS?|TAB|TABLETS?|TABLETAS?)\b', 'COMP', texto)
-        texto = re.sub(r'\b(AMP|AMPOLLA|AMPOLLAS|FCO|FRASCO|FRASCOS|VIALES|VIAL)\b', 'AMP', texto)
-        texto = re.sub(r'\b(INY|INYECTABLE|INYECCION)\b', 'INY', texto)
-        texto = re.sub(r'\b(SUSP|SUSPENSION)\b', 'SUSP', texto)
-        texto = re.sub(r'\b(SOL|SOLUCION)\b', 'SOL', texto)
-        texto = re.sub(r'\b(GOT|GOTAS)\b', 'GOT', texto)
-        texto = re.sub(r'\b(PALAT|PALATABLE|MASTICABLE|MASTICABLES)\b', 'PALAT', texto)
-        
-        texto = re.sub(r'\bPOR\b', 'X', texto)
-        texto = re.sub(r'(?<=\d)\s*[xX×]\s*(?=\d)', ' X ', texto)
-        texto = re.sub(r'\s+[xX×]\s+(?=\d)', ' X ', texto)
-        texto = re.sub(r'\s+', ' ', texto)
-        return texto.strip()
+        # Pipeline precompilado + memo LRU (ver normalizacion.py)
+        return normalizar_texto(texto)
     
     def get_stats(self) -> Dict:
+        stats = self._stats
+        if stats is not None and time.monotonic() < self._stats_vencen:
+            return stats
         try:
+            proveedor = ProductoAlias.origen == TipoAlias.PROVEEDOR
+            consulta = select(
+                select(func.count(Producto.id)).scalar_subquery(),
+                func.count(ProductoAlias.id),
+                func.count(func.distinct(ProductoAlias.producto_id)),
+                func.count(ProductoAlias.id).filter(ProductoAlias.confianza >= 90),
+                func.count(ProductoAlias.id).filter(ProductoAlias.confianza >= 70, ProductoAlias.confianza < 90),
+                func.count(ProductoAlias.id).filter(ProductoAlias.confianza < 70),
+            ).where(proveedor)
             with self.Session() as session:
-                total_productos = session.query(func.count(Producto.id)).scalar()
-                
-                total_traducciones = session.query(func.count(ProductoAlias.id)).filter(
-                    ProductoAlias.origen == TipoAlias.PROVEEDOR
-                ).scalar()
-                
-                productos_traducidos = session.query(func.count(func.distinct(ProductoAlias.producto_id))).filter(
-                    ProductoAlias.origen == TipoAlias.PROVEEDOR
-                ).scalar()
-                
-                confianza_alta = session.query(func.count(ProductoAlias.id)).filter(
-                    ProductoAlias.origen == TipoAlias.PROVEEDOR, ProductoAlias.confianza >= 90
-                ).scalar()
-                
-                confianza_media = session.query(func.count(ProductoAlias.id)).filter(
-                    ProductoAlias.origen == TipoAlias.PROVEEDOR, ProductoAlias.confianza >= 70, ProductoAlias.confianza < 90
-                ).scalar()
-                
-                confianza_baja = session.query(func.count(ProductoAlias.id)).filter(
-                    ProductoAlias.origen == TipoAlias.PROVEEDOR, ProductoAlias.confianza < 70
-                ).scalar()
-                
-                return {
-                    "total_productos": total_productos,
-                    "total_traducciones": total_traducciones,
-                    "productos_traducidos": productos_traducidos,
-                    "productos_sin_traducir": (total_productos or 0) - (productos_traducidos or 0),
-                    "confianza": {"alta": confianza_alta, "media": confianza_media, "baja": confianza_baja}
-                }
+                (total_productos, total_traducciones, productos_traducidos,
+                 confianza_alta, confianza_media, confianza_baja) = session.execute(consulta).one()
+
+            stats = {
+                "total_productos": total_productos,
+                "total_traducciones": total_traducciones,
+                "productos_traducidos": productos_traducidos,
+                "productos_sin_traducir": (total_productos or 0) - (productos_traducidos or 0),
+                "confianza": {"alta": confianza_alta, "media": confianza_media, "baja": confianza_baja}
+            }
+            self._stats, self._stats_vencen = stats, time.monotonic() + TTL_STATS
+            return stats
         except Exception as e:
             print(f"--- [DEBUG] ERROR en get_stats: {e} ---")
             return {} # Retornar vacío en vez de romper
-    
-    def list_traducciones(self, page: int = 1, per_page: int = 50, filtro: str = 'todos', search: str = '') -> Dict:
+
+    def _invalidar_stats(self):
+        self._stats = None
+        self._totales_busqueda = {}
+
+    def _indices_alias_validos(self, conn) -> Dict[str, bool]:
+        """{nombre: indisvalid} de los índices de INDICES_ALIAS que existen."""
+        return dict(conn.execute(text("""
+            SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = ANY(:nombres)
+        """), {"nombres": list(INDICES_ALIAS)}).all())
+
+    def _verificar_indices_alias(self):
+        """Al iniciar solo se consulta el catálogo: sin los índices el listado y la
+        búsqueda funcionan igual, pero recorren toda la tabla."""
+        try:
+            with self.engine.connect() as conn:
+                validos = self._indices_alias_validos(conn)
+        except Exception as e:
+            print(f"--- [DEBUG] No se pudieron verificar los índices de producto_alias: {e} ---")
+            return
+        faltan = [nombre for nombre in INDICES_ALIAS if not validos.get(nombre)]
+        if faltan:
+            print(f"[WARN] Faltan índices de producto_alias ({', '.join(faltan)}): el listado y la búsqueda "
+                  f"recorren toda la tabla. Crearlos una vez con: python diccionario_manager.py --migrar")
+
+    def crear_indices_alias(self) -> bool:
+        """Paso manual (--migrar): índices del listado, uno por la clave de orden
+        (paginación por cursor) y uno de trigramas para que ILIKE '%texto%' no recorra
+        toda la tabla. Solo se construyen los que faltan, con CREATE INDEX CONCURRENTLY
+        (no bloquea las escrituras a producto_alias) y por eso fuera de una transacción."""
+        ok = True
+        with self.engine.execution_options(isolation_level="AUTOCOMMIT").connect() as conn:
+            validos = self._indices_alias_validos(conn)
+            for nombre, definicion in INDICES_ALIAS.items():
+                if validos.get(nombre):
+                    print(f">> El índice {nombre} ya existe.")
+                    continue
+                try:
+                    # Un CONCURRENTLY interrumpido deja el índice inválido: se rehace
+                    if nombre in validos:
+                        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}"))
+                    if nombre == INDICE_TEXTO_ALIAS:
+                        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                    print(f"[INFO] Creando índice {nombre}...")
+                    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} {definicion}"))
+                    print(f"✅ Índice {nombre} creado.")
+                except Exception as e:
+                    print(f"[ERROR] No se pudo crear el índice {nombre}: {e}")
+                    ok = False
+        return ok
+
+    @staticmethod
+    def _codificar_cursor(alias) -> str:
+        clave = [-(alias.confianza if alias.confianza is not None else -1), alias.texto_original, str(alias.id)]
+        return base64.urlsafe_b64encode(json.dumps(clave, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decodificar_cursor(cursor: str):
+        try:
+            orden, texto, alias_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return float(orden), texto, UUIDPy(alias_id)
+        except Exception:
+            raise ValueError("Cursor de paginación inválido")
+
+    def _total_traducciones(self, session, query, search: str) -> int:
+        """Total para el paginador: sin búsqueda sale de las stats (cacheadas); con
+        búsqueda se cuenta una vez por texto y se guarda TTL_STATS segundos."""
+        if not search:
+            total = self.get_stats().get("total_traducciones")
+            if total is not None: return total
+        cacheado = self._totales_busqueda.get(search)
+        if cacheado and time.monotonic() < cacheado[1]: return cacheado[0]
+        total = query.order_by(None).count()
+        if len(self._totales_busqueda) > 256: self._totales_busqueda = {}
+        self._totales_busqueda[search] = (total, time.monotonic() + TTL_STATS)
+        return total
+
+    def list_traducciones(self, page: int = 1, per_page: int = 50, filtro: str = 'todos', search: str = '',
+                          cursor: Optional[str] = None) -> Dict:
+        """Página de traducciones ordenadas por confianza desc, texto e id. Con cursor
+        (next_cursor de la página anterior) se sigue desde esa fila sin OFFSET, así
+        que cualquier página cuesta lo mismo; page solo se usa sin cursor."""
+        # Clave de orden ascendente: -confianza (NULL como -1), texto, id
+        orden_confianza = -func.coalesce(ProductoAlias.confianza, literal_column("-1"))
+        clave = (orden_confianza, ProductoAlias.texto_original, ProductoAlias.id)
+        desde = self._decodificar_cursor(cursor) if cursor else None
         try:
             with self.Session() as session:
-                query = session.query(ProductoAlias).filter(ProductoAlias.origen == TipoAlias.PROVEEDOR)
+                # El producto viene en el mismo SELECT (outer join: el alias se lista aunque el producto no exista)
+                query = session.query(ProductoAlias).outerjoin(ProductoAlias.producto).options(
+                    contains_eager(ProductoAlias.producto)
+                ).filter(ProductoAlias.origen == TipoAlias.PROVEEDOR)
                 
                 if search:
                     query = query.filter(ProductoAlias.texto_original.ilike(f'%{search}%'))
-                
-                query = query.order_by(ProductoAlias.confianza.desc(), ProductoAlias.texto_original)
-                total = query.count()
-                offset = (page - 1) * per_page
-                items = query.offset(offset).limit(per_page).all()
+                total = self._total_traducciones(session, query, search)
+
+                query = query.order_by(*clave)
+                if desde:
+                    query = query.filter(tuple_(*clave) > desde)
+                elif page > 1:
+                    query = query.offset((page - 1) * per_page)
+                items = query.limit(per_page + 1).all()
+                hay_mas = len(items) > per_page
+                items = items[:per_page]
                 
                 resultados = []
                 for alias in items:
-                    producto = session.query(Producto).filter(Producto.id == alias.producto_id).first()
+                    producto = alias.producto
                     resultados.append({
                         "id": str(alias.id),
                         "external_id": alias.external_id,
@@ -196,13 +473,19 @@ class DiccionarioManager:
                 
                 return {
                     "items": resultados, "total": total, "page": page, "per_page": per_page,
-                    "total_pages": (total + per_page - 1) // per_page
+                    "total_pages": (total + per_page - 1) // per_page,
+                    "next_cursor": self._codificar_cursor(items[-1]) if hay_mas else None
                 }
         except Exception as e:
             print(f"--- [DEBUG] ERROR en list_traducciones: {e} ---")
             return {"items": [], "total": 0}
 
     def search_productos(self, search: str, limit: int = 20) -> List[Dict]:
+        # En memoria sobre el mismo cache de productos que el matching; la base queda de respaldo
+        try:
+            return self._load_productos_cache().autocompletado.buscar(search, limit)
+        except Exception as e:
+            print(f"--- [DEBUG] Autocompletado en memoria no disponible, se consulta la base: {e} ---")
         try:
             with self.Session() as session:
                 query = session.query(Producto).filter(Producto.nombre_producto.ilike(f'%{search}%')).limit(limit)
@@ -225,6 +508,7 @@ class DiccionarioManager:
                 alias_existente.termino_busqueda = nombre_normalizado
                 alias_existente.confianza = confianza
                 session.commit()
+                self._invalidar_stats()
                 return {"accion": "actualizado", "id": str(alias_existente.id), "nombre_panacea": nombre_panacea, "producto": producto.nombre_producto}
             else:
                 nuevo_alias = ProductoAlias(
@@ -233,6 +517,7 @@ class DiccionarioManager:
                 )
                 session.add(nuevo_alias)
                 session.commit()
+                self._invalidar_stats()
                 return {"accion": "creado", "id": str(nuevo_alias.id), "nombre_panacea": nombre_panacea, "producto": producto.nombre_producto}
 
     def delete_traduccion(self, alias_id: str):
@@ -241,114 +526,345 @@ class DiccionarioManager:
             if not alias: raise ValueError(f"Traducción {alias_id} no encontrada")
             session.delete(alias)
             session.commit()
+        self._invalidar_stats()
+
+    def _load_productos_cache(self) -> IndiceMatching:
+        """Devuelve el índice de matching vigente. La primera vez lo carga de disco
+        (o lo arma); después solo incorpora los productos nuevos o modificados."""
+        if self._indice is not None:
+            self._verificar_cambios()
+            return self._indice
+        with self._lock_indice:
+            if self._indice is not None: return self._indice
+            try:
+                marca = self._marca_productos()
+                huella = self._huella_productos()
+                indice = self._cargar_indice(huella)
+                if indice is not None:
+                    print(f"✅ Índice de matching cargado desde disco: {len(indice.productos)} productos")
+                else:
+                    indice = self._construir_indice()
+                    print(f"✅ Cache cargado: {len(indice.productos)} productos")
+                    self._guardar_indice(huella, indice)
+                indice.marca = marca
+                self._indice = indice
+                self._ultima_verificacion = time.monotonic()
+                return indice
+            except Exception as e:
+                 print(f"--- [DEBUG] Error en _load_productos_cache: {e} ---")
+                 raise e
+
+    def _construir_indice(self) -> IndiceMatching:
+        with self.Session() as session:
+            productos = session.query(Producto).all()
+            df = pd.DataFrame([{
+                'id': str(p.id), 'nombre': p.nombre_producto, 'nombre_limpio': self.normalizar_texto(p.nombre_producto)
+            } for p in productos])
+        
+        vectorizer = TfidfVectorizer(**PARAMS_TFIDF)
+        matriz = vectorizer.fit_transform(df['nombre_limpio'])
+        # stop_words_ guarda todos los n-gramas descartados por max_features: no se usa para transform
+        vectorizer.stop_words_ = None
+        return IndiceMatching(df, vectorizer, matriz)
 
-    def _load_productos_cache(self):
-        if self._productos_cache is not None: return
+    def _marca_productos(self):
+        """(cantidad, último created_at/updated_at) de productos: consulta barata para detectar cambios"""
         try:
-            with self.Session() as session:
-                productos = session.query(Producto).all()
-                self._productos_cache = pd.DataFrame([{
-                    'id': str(p.id), 'nombre': p.nombre_producto, 'nombre_limpio': self.normalizar_texto(p.nombre_producto)
-                } for p in productos])
-            
-            self._vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5), max_features=6000, min_df=1, sublinear_tf=True)
-            tfidf_matrix = self._vectorizer.fit_transform(self._productos_cache['nombre_limpio'])
-            self._nn_model = NearestNeighbors(n_neighbors=5, metric='cosine', n_jobs=-1)
-            self._nn_model.fit(tfidf_matrix)
-            print(f"✅ Cache cargado: {len(self._productos_cache)} productos")
+            with self.engine.connect() as conn:
+                total, ultimo = conn.execute(text(
+                    "SELECT count(*), max(coalesce(updated_at, created_at)) FROM productos"
+                )).one()
+            return (total, ultimo)
+        except Exception as e:
+            print(f"--- [DEBUG] No se pudo leer la marca de productos: {e} ---")
+            return None
+
+    def _verificar_cambios(self):
+        """Cada INTERVALO_VERIFICACION_INDICE segundos compara la marca de productos
+        y, si cambió, incorpora al índice solo lo nuevo, modificado o borrado."""
+        if time.monotonic() - self._ultima_verificacion < INTERVALO_VERIFICACION_INDICE: return
+        if not self._lock_indice.acquire(blocking=False): return  # otro hilo ya está verificando
+        try:
+            self._ultima_verificacion = time.monotonic()
+            indice = self._indice
+            marca = self._marca_productos()
+            if marca is None or marca == indice.marca: return
+
+            cambios, borrados = self._leer_cambios(indice, marca)
+            if len(cambios) or borrados:
+                indice = indice.con_cambios(cambios, borrados)
+                print(f"🔄 Índice de matching actualizado: {len(cambios)} productos nuevos/modificados, {len(borrados)} eliminados")
+            indice.marca = marca
+            self._indice = indice
+            if indice.necesita_refit(): self._refit_en_segundo_plano()
+        except Exception as e:
+            # Se sigue con el índice anterior; se reintenta en la próxima verificación
+            print(f"--- [DEBUG] Error actualizando el índice de matching: {e} ---")
+        finally:
+            self._lock_indice.release()
+
+    def _leer_cambios(self, indice: IndiceMatching, marca):
+        """Productos con timestamp posterior a la marca anterior (menos un margen) cuyo
+        nombre difiere del índice. Si además la cantidad no cierra (borrados, o altas
+        con timestamps viejos) se comparan los ids completos."""
+        actuales = dict(zip(indice.productos['id'], indice.productos['nombre']))
+        ultimo_anterior = indice.marca[1] if indice.marca else None
+        with self.engine.connect() as conn:
+            if ultimo_anterior is None:
+                filas = conn.execute(text("SELECT id, nombre_producto FROM productos")).all()
+            else:
+                filas = conn.execute(text(
+                    "SELECT id, nombre_producto FROM productos WHERE coalesce(updated_at, created_at) > :desde"
+                ), {"desde": ultimo_anterior - MARGEN_MARCA_INDICE}).all()
+            cambios = {str(i): n for i, n in filas if str(i) not in actuales or actuales[str(i)] != n}
+
+            borrados = []
+            if marca[0] != len(actuales.keys() | cambios.keys()):
+                ids = {str(r[0]) for r in conn.execute(text("SELECT id FROM productos"))}
+                borrados = [i for i in actuales if i not in ids]
+                faltantes = list(ids - actuales.keys() - cambios.keys())
+                if faltantes:
+                    filas = conn.execute(text(
+                        "SELECT id, nombre_producto FROM productos WHERE id::text = ANY(:ids)"
+                    ), {"ids": faltantes}).all()
+                    cambios.update({str(i): n for i, n in filas})
+
+        cambios = pd.DataFrame(
+            [{'id': i, 'nombre': n, 'nombre_limpio': self.normalizar_texto(n)} for i, n in cambios.items()],
+            columns=['id', 'nombre', 'nombre_limpio']
+        )
+        return cambios, borrados
+
+    def _refit_en_segundo_plano(self):
+        """Refit completo (vocabulario e IDF nuevos) en un hilo; al terminar reemplaza el índice"""
+        if self._refit_en_curso: return
+        self._refit_en_curso = True
+
+        def tarea():
+            try:
+                marca = self._marca_productos()
+                huella = self._huella_productos()
+                indice = self._construir_indice()
+                indice.marca = marca
+                with self._lock_indice:
+                    self._indice = indice
+                self._guardar_indice(huella, indice)
+                print(f"✅ Refit del índice de matching completo: {len(indice.productos)} productos")
+            except Exception as e:
+                print(f"--- [DEBUG] Error en el refit del índice de matching: {e} ---")
+            finally:
+                self._refit_en_curso = False
+
+        threading.Thread(target=tarea, daemon=True).start()
+
+    def _huella_productos(self) -> Optional[str]:
+        """Huella de la tabla productos (ids + nombres) calculada en la base, sin traer las filas"""
+        try:
+            with self.engine.connect() as conn:
+                total, digest = conn.execute(text("""
+                    SELECT count(*), md5(string_agg(id::text || ':' || coalesce(nombre_producto, ''), E'\\n' ORDER BY id))
+                    FROM productos
+                """)).one()
+            return f"v{VERSION_INDICE_MATCHING}-sklearn{sklearn.__version__}-{total}-{digest}"
+        except Exception as e:
+            print(f"--- [DEBUG] No se pudo calcular la huella de productos, se reconstruye el índice: {e} ---")
+            return None
+
+    def _cargar_indice(self, huella: Optional[str]) -> Optional[IndiceMatching]:
+        """Carga el índice persistido si corresponde a la huella actual. Se guardan
+        las matrices que usa MotorSimilitud (normalizada y transpuesta) y se abren con
+        mmap tal cual: no se copian al cargar y varios procesos comparten las páginas."""
+        meta_path = PATH_INDICE_MATCHING / "meta.json"
+        if not huella or not meta_path.exists(): return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+            if meta.get("huella") != huella: return None
+            matriz, transpuesta = (csr_matrix(tuple(
+                np.load(PATH_INDICE_MATCHING / f"{prefijo}{parte}.npy", mmap_mode='r') for parte in ("data", "indices", "indptr")
+            ), shape=tuple(forma), copy=False) for prefijo, forma in (("", meta["shape"]), ("t_", meta["shape"][::-1])))
+            productos = json.loads((PATH_INDICE_MATCHING / "productos.json").read_text(encoding='utf-8'))
+            vectorizer = joblib.load(PATH_INDICE_MATCHING / "vectorizer.joblib")
+        except Exception as e:
+            print(f"--- [DEBUG] Índice en disco ilegible, se reconstruye: {e} ---")
+            return None
+        return IndiceMatching(pd.DataFrame(productos), vectorizer, matriz, transpuesta=transpuesta)
+
+    def _guardar_indice(self, huella: Optional[str], indice: IndiceMatching):
+        """Escribe el índice en un directorio temporal y lo reemplaza de una vez"""
+        if not huella: return
+        tmp = PATH_INDICE_MATCHING.with_name(f"{PATH_INDICE_MATCHING.name}.tmp-{uuid4().hex}")
+        try:
+            tmp.mkdir(parents=True)
+            for prefijo, matriz in (("", indice.motor.normalizada), ("t_", indice.motor.transpuesta)):
+                for parte in ("data", "indices", "indptr"):
+                    np.save(tmp / f"{prefijo}{parte}.npy", getattr(matriz, parte))
+            (tmp / "productos.json").write_text(
+                json.dumps(indice.productos.to_dict(orient='list'), ensure_ascii=False), encoding='utf-8'
+            )
+            joblib.dump(indice.vectorizer, tmp / "vectorizer.joblib")
+            (tmp / "meta.json").write_text(json.dumps({
+                "huella": huella, "shape": list(indice.matriz.shape), "creado": datetime.now().isoformat()
+            }), encoding='utf-8')
+
+            viejo = None
+            if PATH_INDICE_MATCHING.exists():
+                viejo = PATH_INDICE_MATCHING.with_name(f"{PATH_INDICE_MATCHING.name}.old-{uuid4().hex}")
+                os.replace(PATH_INDICE_MATCHING, viejo)
+            os.replace(tmp, PATH_INDICE_MATCHING)
+            if viejo: shutil.rmtree(viejo, ignore_errors=True)
         except Exception as e:
-             print(f"--- [DEBUG] Error en _load_productos_cache: {e} ---")
-             raise e
+            shutil.rmtree(tmp, ignore_errors=True)
+            print(f"--- [DEBUG] No se pudo guardar el índice de matching: {e} ---")
 
     def get_sugerencias(self, nombre_panacea: str, top_n: int = 5) -> List[Dict]:
-        self._load_productos_cache()
+        indice = self._load_productos_cache()
         nombre_limpio = self.normalizar_texto(nombre_panacea)
-        vec = self._vectorizer.transform([nombre_limpio])
-        distancias, indices = self._nn_model.kneighbors(vec)
+        vec = indice.vectorizer.transform([nombre_limpio])
+        distancias, indices = indice.motor.kneighbors(vec, n_neighbors=5)
         sugerencias = []
         for i in range(min(top_n, len(indices[0]))):
             idx = indices[0][i]
             confianza = (1 - distancias[0][i]) * 100
-            row = self._productos_cache.iloc[idx]
+            row = indice.productos.iloc[idx]
             sugerencias.append({'producto_id': row['id'], 'nombre': row['nombre'], 'confianza': round(confianza, 2)})
         return sugerencias
 
     def auto_match(self, umbral: float = 80.0, limite: int = 100) -> Dict:
         try:
-            self._load_productos_cache()
+            indice = self._load_productos_cache()
             json_path = Path("outputs/panacea_clicks_enriquecido.json")
             if not json_path.exists(): raise FileNotFoundError("No se encontró JSON de scraping")
             
-            with open(json_path, 'r', encoding='utf-8') as f: data = json.load(f)
-            productos_panacea = data.get("productos", [])
+            # Lectura en streaming: solo se decodifican los primeros `limite` productos
+            productos_panacea = islice(iterar_productos(json_path), limite)
             
             with self.Session() as session:
-                sin_traduccion = []
-                for p in productos_panacea[:limite]:
-                    nombre = p.get("descripcion", "").strip()
-                    if not nombre: continue
-                    if not session.query(ProductoAlias).filter(ProductoAlias.texto_original == nombre, ProductoAlias.origen == TipoAlias.PROVEEDOR).first():
-                        sin_traduccion.append(nombre)
+                nombres = [p.get("descripcion", "").strip() for p in productos_panacea]
+                nombres = list(dict.fromkeys(n for n in nombres if n))
+                traducidos = self._textos_traducidos(session, nombres)
+                sin_traduccion = [n for n in nombres if n not in traducidos]
                 
-                insertados = 0
-                for nombre_panacea in sin_traduccion:
-                    nombre_limpio = self.normalizar_texto(nombre_panacea)
-                    vec = self._vectorizer.transform([nombre_limpio])
-                    distancias, indices = self._nn_model.kneighbors(vec, n_neighbors=1)
-                    confianza = (1 - distancias[0][0]) * 100
-                    
+                # Matching en lote y alta de todos los alias en un solo INSERT
+                nombres_limpios = [self.normalizar_texto(n) for n in sin_traduccion]
+                posiciones, confianzas = indice.mejor_match(nombres_limpios)
+                ids = indice.productos['id'].to_numpy()
+                nuevos_alias = []
+                for nombre_panacea, nombre_limpio, pos, confianza in zip(sin_traduccion, nombres_limpios, posiciones, confianzas):
                     if confianza >= umbral:
-                        idx = indices[0][0]
-                        nuevo_alias = ProductoAlias(
-                            id=uuid4(), producto_id=self._productos_cache.iloc[idx]['id'],
-                            termino_busqueda=nombre_limpio, texto_original=nombre_panacea,
-                            origen=TipoAlias.PROVEEDOR, confianza=confianza
-                        )
-                        session.add(nuevo_alias)
-                        insertados += 1
+                        nuevos_alias.append({
+                            "id": uuid4(), "producto_id": ids[pos], "termino_busqueda": nombre_limpio,
+                            "texto_original": nombre_panacea, "origen": TipoAlias.PROVEEDOR, "confianza": float(confianza)
+                        })
                         print(f"MATCH: {nombre_panacea} ({confianza:.1f}%)")
+                if nuevos_alias: session.execute(insert(ProductoAlias), nuevos_alias)
                 session.commit()
-            return {"insertados": insertados}
+            self._invalidar_stats()
+            return {"insertados": len(nuevos_alias)}
         except Exception as e:
             print(f"[ERROR] auto_match: {e}")
             raise e
 
+    def _textos_traducidos(self, session, nombres: List[str]) -> set:
+        """Cuáles de los nombres ya tienen alias PROVEEDOR: una consulta IN por lote
+        en vez de una consulta por nombre."""
+        traducidos = set()
+        for inicio in range(0, len(nombres), TAMANO_LOTE_ALIAS):
+            lote = nombres[inicio:inicio + TAMANO_LOTE_ALIAS]
+            traducidos.update(t for (t,) in session.query(ProductoAlias.texto_original).filter(
+                ProductoAlias.origen == TipoAlias.PROVEEDOR, ProductoAlias.texto_original.in_(lote)
+            ))
+        return traducidos
+
+    def iter_export(self, formato: str = 'json', comprimir: bool = False):
+        """Genera el diccionario exportado por partes a medida que se leen las filas
+        (cursor del lado del servidor, de a TAMANO_LOTE_EXPORT): la primera parte sale
+        antes de la consulta y la memoria no depende del tamaño del diccionario.
+        formato 'json' es el mismo objeto que antes escribía export_to_json (indent=2);
+        'ndjson' es una traducción por línea. Con comprimir las partes son gzip."""
+        if formato not in FORMATOS_EXPORT: raise ValueError(f"Formato de exportación inválido: {formato}")
+        ndjson = formato == 'ndjson'
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None  # 31: cabecera gzip
+
+        def salida(texto: str, final: bool = False) -> bytes:
+            datos = texto.encode('utf-8')
+            if compresor is None: return datos
+            # SYNC_FLUSH: cada parte se puede descomprimir apenas llega
+            return compresor.compress(datos) + compresor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+        consulta = select(
+            ProductoAlias.texto_original, ProductoAlias.producto_id, ProductoAlias.confianza, Producto.id, Producto.nombre_producto
+        ).outerjoin(ProductoAlias.producto).where(
+            ProductoAlias.origen == TipoAlias.PROVEEDOR
+        ).execution_options(yield_per=TAMANO_LOTE_EXPORT)
+
+        inicio = time.time()
+        yield salida("" if ndjson else "{")  # con gzip, la cabecera
+        # Sin conjunto de claves vistas (la memoria seguiría creciendo): si un texto_original
+        # se repite sale dos veces y al leer el JSON vale la última, como en el dict anterior
+        total = 0
+        with self.Session() as session:
+            for filas in session.execute(consulta).partitions():
+                partes = []
+                for texto_original, producto_id, confianza, id_encontrado, nombre_producto in filas:
+                    nombre = nombre_producto if id_encontrado is not None else "Desconocido"
+                    estado = "EXACTO" if (confianza or 0) >= 90 else "APROXIMADO"
+                    if ndjson:
+                        partes.append(_json_compacto({
+                            "texto_original": texto_original, "mi_id": str(producto_id), "mi_nombre": nombre,
+                            "match_score": confianza, "estado": estado
+                        }) + "\n")
+                    else:
+                        # Mismo texto que json.dump(..., indent=2) (tests/test_diccionario_manager.py),
+                        # sin su encoder en Python puro
+                        partes.append(
+                            f'{"," if total or partes else ""}\n  {_clave_json(texto_original)}: {{\n'
+                            f'    "mi_id": {_json_compacto(str(producto_id))},\n'
+                            f'    "mi_nombre": {_json_compacto(nombre)},\n'
+                            f'    "match_score": {_json_compacto(confianza)},\n'
+                            f'    "estado": "{estado}"\n  }}'
+                        )
+                total += len(partes)
+                if partes: yield salida("".join(partes))
+        cierre = "" if ndjson else ("\n}" if total else "}")
+        if cierre or compresor is not None: yield salida(cierre, final=True)
+        print(f"[INFO] Exportación: {total} traducciones enviadas en {time.time() - inicio:.2f}s (1 consulta)")
+
     def export_to_json(self) -> Path:
         output_path = Path("outputs/diccionario_panacea.json")
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        with self.Session() as session:
-            alias_list = session.query(ProductoAlias).filter(ProductoAlias.origen == TipoAlias.PROVEEDOR).all()
-            diccionario = {}
-            for alias in alias_list:
-                producto = session.query(Producto).filter(Producto.id == alias.producto_id).first()
-                diccionario[alias.texto_original] = {
-                    "mi_id": str(alias.producto_id), "mi_nombre": producto.nombre_producto if producto else "Desconocido",
-                    "match_score": alias.confianza, "estado": "EXACTO" if alias.confianza >= 90 else "APROXIMADO"
-                }
-        with open(output_path, 'w', encoding='utf-8') as f: json.dump(diccionario, f, ensure_ascii=False, indent=2)
+        with open(output_path, 'wb') as f:
+            for parte in self.iter_export('json'): f.write(parte)
         return output_path
 
     def import_from_txt(self, filepath: Path) -> Dict:
-        self._load_productos_cache()
+        indice = self._load_productos_cache()
         with open(filepath, 'r', encoding='utf-8') as f: lineas = [l.strip() for l in f if l.strip()]
         resultados = {"total": len(lineas), "insertados": 0}
         
         with self.Session() as session:
-            for nombre_panacea in lineas:
-                try:
-                    if session.query(ProductoAlias).filter(ProductoAlias.texto_original == nombre_panacea, ProductoAlias.origen == TipoAlias.PROVEEDOR).first(): continue
-                    
-                    nombre_limpio = self.normalizar_texto(nombre_panacea)
-                    vec = self._vectorizer.transform([nombre_limpio])
-                    distancias, indices = self._nn_model.kneighbors(vec, n_neighbors=1)
-                    confianza = (1 - distancias[0][0]) * 100
-                    
-                    session.add(ProductoAlias(
-                        id=uuid4(), producto_id=self._productos_cache.iloc[indices[0][0]]['id'],
-                        termino_busqueda=nombre_limpio, texto_original=nombre_panacea,
-                        origen=TipoAlias.PROVEEDOR, confianza=confianza
-                    ))
-                    resultados["insertados"] += 1
-                except: pass
+            nombres = list(dict.fromkeys(lineas))
+            traducidos = self._textos_traducidos(session, nombres)
+            sin_traduccion = [n for n in nombres if n not in traducidos]
+            nombres_limpios = [self.normalizar_texto(n) for n in sin_traduccion]
+            posiciones, confianzas = indice.mejor_match(nombres_limpios)
+            ids = indice.productos['id'].to_numpy()
+            nuevos_alias = [{
+                "id": uuid4(), "producto_id": ids[pos], "termino_busqueda": nombre_limpio,
+                "texto_original": nombre_panacea, "origen": TipoAlias.PROVEEDOR, "confianza": float(confianza)
+            } for nombre_panacea, nombre_limpio, pos, confianza in zip(sin_traduccion, nombres_limpios, posiciones, confianzas)]
+            if nuevos_alias: session.execute(insert(ProductoAlias), nuevos_alias)
             session.commit()
-        return resultados
\ No newline at end of file
+            resultados["insertados"] = len(nuevos_alias)
+        self._invalidar_stats()
+        return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Diccionario de traducciones Panacea <-> Mi Sistema")
+    parser.add_argument("--migrar", action="store_true",
+                        help="Crear los índices de producto_alias (una sola vez) y salir")
+    args = parser.parse_args()
+    if args.migrar:
+        sys.exit(0 if DiccionarioManager().crear_indices_alias() else 1)
+    parser.print_help()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Lectura en streaming del JSON de scraping (panacea_clicks_enriquecido.json).
+
+iterar_productos() devuelve los productos de a uno sin cargar el archivo
+completo ni su copia en texto: la memoria depende del producto más grande,
+no del tamaño del catálogo.
+
+- Con ijson instalado se usa su backend en C (yajl2_c) cuando está disponible.
+- Sin ijson se usa json.JSONDecoder.raw_decode sobre bloques del archivo.
+
+Verificación contra json.load (y del pico de memoria) en tests/test_lector_json.py.
+"""
+import re
+import json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+RE_ESPACIOS = re.compile(r"[ \t\n\r]*")
+
+
+class _LectorBloques:
+    """Buffer sobre el archivo de texto que se va descartando a medida que se consume"""
+    def __init__(self, f, tam_bloque):
+        self.f = f
+        self.tam_bloque = tam_bloque
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _leer_mas(self):
+        bloque = self.f.read(self.tam_bloque)
+        if not bloque: self.eof = True
+        self.buffer = self.buffer[self.pos:] + bloque
+        self.pos = 0
+
+    def siguiente_caracter(self):
+        """Saltea espacios y devuelve el próximo carácter sin consumirlo ("" al final)"""
+        while True:
+            self.pos = RE_ESPACIOS.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._leer_mas()
+
+    def consumir(self, esperado):
+        c = self.siguiente_caracter()
+        if c != esperado:
+            raise json.JSONDecodeError(f"Se esperaba '{esperado}'", self.buffer, self.pos)
+        self.pos += 1
+
+    def valor(self):
+        """Decodifica el próximo valor JSON completo, leyendo más bloques si hace falta"""
+        self.siguiente_caracter()
+        while True:
+            try:
+                obj, fin = self.decoder.raw_decode(self.buffer, self.pos)
+                # Un número al borde del buffer puede estar cortado: se confirma con más texto
+                if fin < len(self.buffer) or self.eof:
+                    self.pos = fin
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof: raise
+            self._leer_mas()
+
+
+def _items_stdlib(path, clave, tam_bloque):
+    with open(path, "r", encoding="utf-8") as f:
+        lector = _LectorBloques(f, tam_bloque)
+        lector.consumir("{")
+        if lector.siguiente_caracter() == "}": return
+        while True:
+            nombre = lector.valor()
+            lector.consumir(":")
+            if nombre == clave and lector.siguiente_caracter() == "[":
+                lector.consumir("[")
+                if lector.siguiente_caracter() != "]":
+                    while True:
+                        yield lector.valor()
+                        if lector.siguiente_caracter() != ",": break
+                        lector.consumir(",")
+                lector.consumir("]")
+            else:
+                lector.valor()  # otra clave (count, generated_at...): se descarta
+            if lector.siguiente_caracter() != ",": break
+            lector.consumir(",")
+        lector.consumir("}")
+
+
+def _items_ijson(path, clave):
+    with open(path, "rb") as f:
+        try:
+            yield from ijson.items(f, f"{clave}.item", use_float=True)
+        except ijson.JSONError as e:
+            # Mismo tipo de error que el backend stdlib (JSONDecodeError es ValueError)
+            raise ValueError(f"JSON inválido: {e}") from e
+
+
+def iterar_productos(path, clave="productos", tam_bloque=1 << 16):
+    """Genera los elementos de data[clave] de a uno. Si la clave no existe no
+    genera nada; si el JSON está mal formado levanta ValueError."""
+    if ijson is not None:
+        return _items_ijson(path, clave)
+    return _items_stdlib(path, clave, tam_bloque)
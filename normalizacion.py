@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Normalización de nombres de producto para el matching del diccionario.
+
+Todas las reglas de reemplazo de palabras (colores en inglés, unidades,
+presentaciones y POR -> X) se resuelven en una sola pasada con una
+alternancia compilada y un dict de sinónimos. Las reglas son de palabra
+completa y ningún resultado es entrada de otra regla, así que aplicarlas
+juntas da lo mismo que aplicarlas una por una en orden.
+Los resultados se memoizan (LRU): los mismos nombres se normalizan muchas
+veces entre el caché de productos, auto_match, sugerencias e importaciones.
+
+Equivalencia contra la versión original (re.sub por regla) en
+tests/test_normalizacion.py; tiempos con python tests/bench_matching.py.
+"""
+import re
+from functools import lru_cache
+
+TRADUCCIONES_COLORES = {
+    'GOLD': 'DORADO', 'YELLOW': 'DORADO', 'PURPLE': 'PURPURA', 'VIOLET': 'PURPURA',
+    'CARAMEL': 'CARAMELO', 'ORANGE': 'CARAMELO', 'TEAL': 'AZUL', 'BLUE': 'AZUL',
+    'GREEN': 'VERDE', 'BROWN': 'MARRON'
+}
+
+# Forma canónica -> variantes que se reemplazan por ella
+SINONIMOS = {
+    'ML': ['ML', 'CC', 'CM3', 'MILILITRO', 'MILILITROS'],
+    'GR': ['GR', 'GRS', 'GRAM', 'GRAMO', 'GRAMOS'],
+    'KG': ['KG', 'KGS', 'KILO', 'KILOS'],
+    'MG': ['MG', 'MGR', 'MILIGRAMO', 'MILIGRAMOS'],
+    'COMP': ['COMP', 'COMPRIMIDO', 'COMPRIMIDOS', 'CS', 'CAPS', 'CAPSULA', 'CAPSULAS',
+             'TAB', 'TABLET', 'TABLETS', 'TABLETA', 'TABLETAS'],
+    'AMP': ['AMP', 'AMPOLLA', 'AMPOLLAS', 'FCO', 'FRASCO', 'FRASCOS', 'VIALES', 'VIAL'],
+    'INY': ['INY', 'INYECTABLE', 'INYECCION'],
+    'SUSP': ['SUSP', 'SUSPENSION'],
+    'SOL': ['SOL', 'SOLUCION'],
+    'GOT': ['GOT', 'GOTAS'],
+    'PALAT': ['PALAT', 'PALATABLE', 'MASTICABLE', 'MASTICABLES'],
+    'X': ['POR'],
+}
+
+MAPA_PALABRAS = {**TRADUCCIONES_COLORES, **{v: canon for canon, variantes in SINONIMOS.items() for v in variantes}}
+
+# Más largas primero para que la alternancia no tenga que retroceder (GR antes que GRAMOS)
+RE_PALABRAS = re.compile(
+    r'\b(?:' + '|'.join(re.escape(p) for p in sorted(MAPA_PALABRAS, key=len, reverse=True)) + r')\b'
+)
+RE_GUION = re.compile(r'\s*-\s*')
+RE_X_ENTRE_NUMEROS = re.compile(r'(?<=\d)\s*[xX×]\s*(?=\d)')
+RE_X_SUELTA = re.compile(r'\s+[xX×]\s+(?=\d)')
+RE_ESPACIOS = re.compile(r'\s+')
+
+
+def _reemplazar_palabra(match):
+    return MAPA_PALABRAS[match.group()]
+
+
+@lru_cache(maxsize=65536)
+def normalizar_texto(texto: str) -> str:
+    if not texto: return ""
+    texto = texto.upper().strip().replace(',', '.')
+    texto = RE_GUION.sub('-', texto)
+    texto = RE_PALABRAS.sub(_reemplazar_palabra, texto)
+    texto = RE_X_ENTRE_NUMEROS.sub(' X ', texto)
+    texto = RE_X_SUELTA.sub(' X ', texto)
+    texto = RE_ESPACIOS.sub(' ', texto)
+    return texto.strip()
@@ -1,10 +1,16 @@
 import pandas as pd
+import xlsxwriter
+import numpy as np
 import json
 import os
 import sys
 import re
+import time
+import hashlib
 from pathlib import Path
-from collections import defaultdict
+from contextlib import contextmanager
+
+from lector_json import iterar_productos
 
 sys.stdout.reconfigure(encoding='utf-8')
 
@@ -20,288 +26,514 @@ def clean_float(val):
     except:
         return 0.0
 
+# Columnas numéricas del JSON de scraping y su valor por defecto si falta la clave
+CAMPOS_NUMERICOS = {
+    "precio_base": 0, "descuento_especial": 0, "bonificacion": 0, "descuento_financiero": 0,
+    "mejor_precio": 0, "stock": 0, "stock_minimo": 0, "cantidad_desde_optima": 1,
+}
+
+# Columnas que pasan del JSON sin normalizar (columna -> campo, defecto):
+# pueden mezclar tipos entre productos
+COLUMNAS_CRUDAS = {
+    "ID": ("id_producto", ""), "Código": ("codigo", ""), "Tipo": ("producto_tipo", ""),
+    "Días s/Stock": ("stock_dias_sin_stock", "0"),
+}
+
+TABLA_LIMPIEZA_NUMERICA = str.maketrans({',': '.', '$': None, '%': None})
+
+def limpiar_columna_numerica(valores):
+    """Versión vectorizada de clean_float para una columna completa.
+    Si todo es numérico (o texto numérico) se convierte en un solo paso;
+    si no, solo los valores que fallan ("45,00%", "$ 10", "null"...) pasan
+    por la limpieza de texto."""
+    try:
+        numeros = np.array(valores, dtype=float)
+    except (ValueError, TypeError):
+        serie = pd.Series(valores, dtype=object)
+        numeros = pd.to_numeric(serie, errors='coerce')
+        pendientes = numeros.isna() & serie.notna()
+        if pendientes.any():
+            texto = serie[pendientes].astype(str).str.translate(TABLA_LIMPIEZA_NUMERICA).str.strip()
+            numeros[pendientes] = pd.to_numeric(texto, errors='coerce')
+        numeros = numeros.to_numpy(dtype=float)
+    return np.where(np.isnan(numeros), 0.0, numeros)
+
+def a_fraccion(valores):
+    """Porcentajes expresados como 45 en vez de 0.45 -> se pasan a fracción"""
+    return np.where(valores > 1, valores / 100.0, valores)
+
+# Etiquetas de la 'descripcion_larga' -> clave en el dict de info
+ETIQUETAS_HTML = {
+    "proveedor": "Proveedor",
+    "acción farmacológica": "Acción",
+    "especie": "Especie",
+    "presentación": "Presentación",
+    "laboratorio": "Laboratorio",
+}
+# La primera letra va como clase explícita para que el motor descarte rápido las
+# posiciones que no pueden empezar una etiqueta (con IGNORECASE sobre toda la
+# alternancia, o con una alternativa por letra, el escaneo es tan lento como las
+# cinco búsquedas por separado). A cambio matchean combinaciones que no son
+# etiquetas ("Eroveedor:", "Lresentación:"): extraer_info_html las saltea.
+RE_ETIQUETA_HTML = re.compile(r"([PpAaEeLl](?i:roveedor|cción farmacológica|specie|resentación|aboratorio)):")
+RE_VALOR_HTML = re.compile(r"><strong>(.*?)</strong>", re.IGNORECASE | re.DOTALL)
+
+PATH_CACHE_HTML = Path(__file__).parent / "outputs/cache_info_html.json"
+
 def extraer_info_html(html_raw):
-    """Analiza la 'descripcion_larga' para sacar datos médicos"""
+    """Analiza la 'descripcion_larga' para sacar datos médicos.
+    Una sola pasada buscando las etiquetas; para la primera aparición de
+    cada una se toma el primer <strong> que le sigue."""
     if not html_raw or not isinstance(html_raw, str):
         return {}
-    
-    data = {}
-    patterns = {
-        "Proveedor": r"Proveedor:.*?><strong>(.*?)</strong>",
-        "Acción": r"Acción Farmacológica:.*?><strong>(.*?)</strong>",
-        "Especie": r"Especie:.*?><strong>(.*?)</strong>",
-        "Presentación": r"Presentación:.*?><strong>(.*?)</strong>",
-        "Laboratorio": r"Laboratorio:.*?><strong>(.*?)</strong>"
-    }
 
-    for key, pattern in patterns.items():
-        match = re.search(pattern, html_raw, re.IGNORECASE | re.DOTALL)
+    data = {}
+    for etiqueta in RE_ETIQUETA_HTML.finditer(html_raw):
+        key = ETIQUETAS_HTML.get(etiqueta.group(1).lower())  # None: letra inicial de otra etiqueta
+        if key is None or key in data: continue
+        match = RE_VALOR_HTML.search(html_raw, etiqueta.end())
         if match:
-            clean_text = match.group(1).replace("&nbsp;", " ").strip()
-            data[key] = clean_text
-            
+            data[key] = match.group(1).replace("&nbsp;", " ").strip()
+        if len(data) == len(ETIQUETAS_HTML): break
     return data
 
-def generar_archivos():
-    # CONFIGURACIÓN DE RUTAS
-    project_root = Path(__file__).parent
-    output_dir = project_root / "outputs"
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    json_path = project_root / "data/panacea_clicks_enriquecido.json"
-    diccionario_path = project_root / "data/diccionario_panacea.json"
-    
-    excel_full_path = output_dir / "Panacea_Completo.xlsx"
-    csv_simple_path = output_dir / "Panacea_Resumen_Precios.csv"
-    csv_errores_path = output_dir / "Panacea_Mapeo_Errores.csv"
+def _hash_html(html_raw):
+    return hashlib.blake2b(html_raw.encode("utf-8"), digest_size=16).hexdigest()
 
-    print(f"[INFO] Procesando archivos en: {project_root}")
+def _clave_html(p):
+    """Clave del producto en el caché HTML (None si no tiene descripción)."""
+    html_raw = p.get("descripcion_larga", "")
+    if not html_raw or not isinstance(html_raw, str): return None
+    return _hash_html(html_raw)
 
-    # 1. CARGA DE DATOS
-    if not json_path.exists():
-        print(f"[ERROR] No se encontró: {json_path}")
-        return
+def _guardar_cache_html(cache, path_cache):
+    Path(path_cache).parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(path_cache).with_suffix(".tmp")
+    tmp.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path_cache)
 
+def _leer_cache_html(path_cache):
+    if not path_cache or not Path(path_cache).exists(): return {}
     try:
-        content = json_path.read_text(encoding="utf-8")
-        data = json.loads(content)
-        productos = data.get("productos", [])
-    except Exception as e:
-        print(f"[ERROR] Error al leer JSON: {e}")
-        return
+        return json.loads(Path(path_cache).read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"[WARN] Caché HTML ilegible, se regenera: {e}")
+        return {}
 
-    print(f"[INFO] Total productos: {len(productos)}")
+def extraer_info_productos(productos, path_cache=None, podar=True, cache=None):
+    """extraer_info_html para todo el catálogo, memoizado por hash del HTML.
+    Con path_cache el memo se persiste entre corridas: solo se parsean las
+    descripciones nuevas o modificadas. Con podar se descartan las que ya no
+    aparecen (solo tiene sentido cuando productos es el catálogo completo).
+    Con cache (dict) se usa y completa ese memo sin leer ni escribir el
+    archivo: lo persiste quien lo pasa."""
+    en_memoria = cache is not None
+    if not en_memoria: cache = _leer_cache_html(path_cache)
 
-    # 2. PROCESAMIENTO
-    rows = []
+    vigentes, parseadas, info = {}, 0, []
     for p in productos:
-        info_extra = extraer_info_html(p.get("descripcion_larga", ""))
-        
-        # Cálculos de Precios
-        precio_base = clean_float(p.get("precio_base", 0))
-        desc_esp = clean_float(p.get("descuento_especial", 0))
-        if desc_esp > 1: desc_esp = desc_esp / 100.0
-        bonif = clean_float(p.get("bonificacion", 0))
-        if bonif > 1: bonif = bonif / 100.0
-        desc_fin = clean_float(p.get("descuento_financiero", 0))
-        if desc_fin > 1: desc_fin = desc_fin / 100.0
-        mejor_precio_neto = clean_float(p.get("mejor_precio", 0))
-        
-        precio_calc = precio_base * (1 - bonif) * (1 - desc_esp) * (1 - desc_fin)
-        precio_final_neto = mejor_precio_neto if mejor_precio_neto > 0 else precio_calc
-        precio_final_iva = precio_final_neto * 1.21
-
-        # Datos de Stock
-        stock_actual = clean_float(p.get("stock", 0))
-        stock_min = clean_float(p.get("stock_minimo", 0))
-        vencimiento = p.get("fecha_vencimiento", "")
-        if "0000" in str(vencimiento): vencimiento = ""
-        dias_sin_stock = p.get("stock_dias_sin_stock", "0")
-
-        rows.append({
-            "ID": p.get("id_producto", ""),
-            "Código": p.get("codigo", ""),
-            "Descripción": p.get("descripcion", ""),
-            "Tipo": p.get("producto_tipo", ""),
-            "Proveedor/Lab": info_extra.get("Proveedor") or info_extra.get("Laboratorio") or p.get("producto_marca", ""),
-            "Acción Farmacológica": info_extra.get("Acción", ""),
-            "Especie": info_extra.get("Especie", ""),
-            "Presentación": info_extra.get("Presentación", ""),
-            "Vencimiento": vencimiento,
-            "Stock Actual": int(stock_actual),
-            "Stock Mínimo": int(stock_min),
-            "Estado Stock": "CRÍTICO" if stock_actual <= stock_min else "OK",
-            "Días s/Stock": dias_sin_stock,
-            "Cant. Min. Compra": int(clean_float(p.get("cantidad_desde_optima", 1))),
-            "Precio Lista": precio_base,
-            "Bonif. %": bonif,
-            "Desc. Esp. %": desc_esp,
-            "Desc. Fin. %": desc_fin,
-            "NETO (Unitario)": precio_final_neto,
-            "FINAL c/IVA (Estimado)": precio_final_iva
-        })
-
-    df = pd.DataFrame(rows)
-
-    cols_order = [
-        "ID", "Código", "Descripción", "Tipo", 
-        "Proveedor/Lab", "Acción Farmacológica", "Especie", "Presentación",
-        "Vencimiento", "Stock Actual", "Stock Mínimo", "Estado Stock", "Días s/Stock",
-        "Cant. Min. Compra", "Precio Lista", "Bonif. %", "Desc. Esp. %", "Desc. Fin. %",
-        "NETO (Unitario)", "FINAL c/IVA (Estimado)"
-    ]
-    df = df[[c for c in cols_order if c in df.columns]]
-
-    # 3. EXCEL COMPLETO
-    print(f"[INFO] Generando Excel: {excel_full_path}")
+        clave = _clave_html(p)
+        if clave is None:
+            info.append({})
+            continue
+        if clave not in vigentes:
+            if clave in cache:
+                vigentes[clave] = cache[clave]
+            else:
+                vigentes[clave] = extraer_info_html(p["descripcion_larga"])
+                parseadas += 1
+        info.append(vigentes[clave])
+
+    if vigentes:
+        print(f"[INFO] Descripciones HTML: {len(vigentes) - parseadas} desde caché, {parseadas} parseadas")
+    if en_memoria:
+        cache.update(vigentes)
+        return info
+    if not podar:
+        vigentes = {**cache, **vigentes}
+    if path_cache and (parseadas or len(vigentes) != len(cache)):
+        _guardar_cache_html(vigentes, path_cache)
+    return info
+
+def construir_dataframe(productos, path_cache_html=None, podar_cache_html=True, cache_html=None):
+    """Arma la tabla normalizada: columnas numéricas y precios se calculan
+    vectorizados sobre todo el catálogo en vez de producto por producto."""
+    col = lambda clave, defecto="": [p.get(clave, defecto) for p in productos]
+    num = {k: limpiar_columna_numerica(col(k, d)) for k, d in CAMPOS_NUMERICOS.items()}
+
+    precio_base = num["precio_base"]
+    desc_esp = a_fraccion(num["descuento_especial"])
+    bonif = a_fraccion(num["bonificacion"])
+    desc_fin = a_fraccion(num["descuento_financiero"])
+    mejor_precio_neto = num["mejor_precio"]
+
+    precio_calc = precio_base * (1 - bonif) * (1 - desc_esp) * (1 - desc_fin)
+    precio_final_neto = np.where(mejor_precio_neto > 0, mejor_precio_neto, precio_calc)
+
+    stock_actual = num["stock"]
+    stock_min = num["stock_minimo"]
+    vencimiento = pd.Series(col("fecha_vencimiento"), dtype=object)
+    vencimiento = vencimiento.where(~vencimiento.astype(str).str.contains("0000", regex=False), "")
+
+    info_extra = extraer_info_productos(productos, path_cache_html, podar_cache_html, cache_html)
+    crudas = {nombre: col(clave, defecto) for nombre, (clave, defecto) in COLUMNAS_CRUDAS.items()}
+
+    return pd.DataFrame({
+        "ID": crudas["ID"],
+        "Código": crudas["Código"],
+        "Descripción": col("descripcion"),
+        "Tipo": crudas["Tipo"],
+        "Proveedor/Lab": [i.get("Proveedor") or i.get("Laboratorio") or p.get("producto_marca", "")
+                          for i, p in zip(info_extra, productos)],
+        "Acción Farmacológica": [i.get("Acción", "") for i in info_extra],
+        "Especie": [i.get("Especie", "") for i in info_extra],
+        "Presentación": [i.get("Presentación", "") for i in info_extra],
+        "Vencimiento": vencimiento,
+        "Stock Actual": stock_actual.astype(int),
+        "Stock Mínimo": stock_min.astype(int),
+        "Estado Stock": np.where(stock_actual <= stock_min, "CRÍTICO", "OK"),
+        "Días s/Stock": crudas["Días s/Stock"],
+        "Cant. Min. Compra": num["cantidad_desde_optima"].astype(int),
+        "Precio Lista": precio_base,
+        "Bonif. %": bonif,
+        "Desc. Esp. %": desc_esp,
+        "Desc. Fin. %": desc_fin,
+        "NETO (Unitario)": precio_final_neto,
+        "FINAL c/IVA (Estimado)": precio_final_neto * 1.21
+    })
+
+FACTOR_PRECIO_FINAL = 0.779
+
+def resolver_duplicados(df, mapping):
+    """Cruza el catálogo con el diccionario y resuelve los IDs duplicados.
+    Reglas por ID: si ningún match llega a 70 se usa el de mejor match; si no,
+    entre los buenos matches se prefiere el de mayor precio con stock y, sin
+    stock, el de mejor match. Devuelve (df_simple, df_errores)."""
+    mapa = pd.DataFrame({
+        "Descripción": pd.Series(list(mapping.keys()), dtype=object),
+        "mi_id": pd.Series([v.get("mi_id") for v in mapping.values()], dtype=object),
+        "mi_nombre": pd.Series([v.get("mi_nombre") for v in mapping.values()], dtype=object),
+        "tiene_nombre": [("mi_nombre" in v) for v in mapping.values()],
+        "match_score": pd.Series([v.get("match_score", 0) for v in mapping.values()], dtype=object),
+    })
+    base = df[["Descripción", "Código", "Stock Actual", "NETO (Unitario)"]].reset_index(drop=True)
+    base["orden"] = np.arange(len(base))
+    cruce = base.merge(mapa, on="Descripción", how="left", indicator=True, sort=False).sort_values("orden", kind="stable")
+
+    sin_mapeo = cruce[cruce["_merge"] == "left_only"]
+    mapeados = cruce[cruce["_merge"] == "both"].copy()
+
+    # mi_id válido: numérico > 0 (o un ID de texto no vacío, p.ej. UUID)
+    id_num = pd.to_numeric(mapeados["mi_id"], errors="coerce")
+    es_texto = mapeados["mi_id"].map(lambda v: isinstance(v, str))
+    valido = mapeados["mi_id"].notna() & ((id_num > 0) | (es_texto & id_num.isna() & (mapeados["mi_id"] != "")))
+    mapeados = mapeados[valido].copy()
+
+    neto = mapeados["NETO (Unitario)"]
+    mapeados["precio"] = np.where(neto > 0, neto / FACTOR_PRECIO_FINAL, 0)
+    mapeados["nombre_final"] = mapeados["mi_nombre"].where(mapeados["tiene_nombre"], mapeados["Descripción"])
+    score = pd.to_numeric(mapeados["match_score"], errors="coerce").fillna(0)
+    mapeados["stock"] = mapeados["Stock Actual"]
+
+    # Clasificación de cada grupo (ID) y clave de selección
+    grupo = mapeados.groupby("mi_id", sort=False)
+    mapeados["grupo"] = grupo.ngroup()
+    bueno = score >= 70
+    con_stock = bueno & (mapeados["stock"] > 0)
+    hay_bueno = bueno.groupby(mapeados["grupo"]).transform("any")
+    hay_stock = con_stock.groupby(mapeados["grupo"]).transform("any")
+    mapeados["caso"] = np.select([~hay_bueno, hay_stock], ["match_bajo", "stock"], "match")
+    mapeados["prioridad"] = np.select(
+        [~hay_bueno, hay_stock], [0, np.where(con_stock, 0, 1)], np.where(bueno, 0, 1)
+    )
+    mapeados["clave"] = np.where(hay_stock, -mapeados["precio"], -score)
+
+    ordenado = mapeados.sort_values(["grupo", "prioridad", "clave", "orden"], kind="stable")
+    elegidos = ordenado.drop_duplicates("grupo", keep="first")
+    mapeados["elegido"] = False
+    mapeados.loc[elegidos.index, "elegido"] = True
+    mapeados["tamano"] = grupo["orden"].transform("size")
+
+    df_simple = elegidos.sort_values("grupo")[["mi_id", "nombre_final", "precio"]].rename(
+        columns={"mi_id": "producto_id", "nombre_final": "nombre"}
+    )
+
+    # Reporte de errores: sin mapeo, luego duplicados por ID en orden de aparición
+    duplicados = mapeados[mapeados["tamano"] > 1].sort_values(["grupo", "orden"], kind="stable")
+    print(f"\n[INFO] Analizando {len(elegidos)} IDs únicos...")
+    _imprimir_duplicados(duplicados)
+
+    criterio = np.where(duplicados["caso"] == "stock", "mayor precio con stock", "mejor match (sin stock)")
+    error = np.where(
+        duplicados["caso"] == "match_bajo",
+        np.where(duplicados["elegido"], "Duplicado - seleccionado por match", "Duplicado - match bajo - descartado"),
+        np.char.add("Duplicado descartado - se eligió otro por ", criterio.astype(str))
+    )
+    duplicados = duplicados.assign(error=error)
+    reportables = duplicados[(duplicados["caso"] == "match_bajo") | ~duplicados["elegido"]]
+
+    partes = []
+    if len(sin_mapeo):
+        partes.append(pd.DataFrame({
+            "nombre_panacea": sin_mapeo["Descripción"].to_numpy(),
+            "precio_neto": sin_mapeo["NETO (Unitario)"].to_numpy(),
+            "stock": sin_mapeo["Stock Actual"].to_numpy(),
+            "error": "Sin mapeo en diccionario",
+        }))
+    columnas_dup = {
+        "match_bajo": ["producto_id", "nombre_panacea", "precio", "match_score", "stock", "error"],
+        "descartado": ["producto_id", "nombre_panacea", "nombre_final", "precio", "match_score", "stock", "error"],
+    }
+    if len(reportables):
+        partes.append(pd.DataFrame({
+            "producto_id": reportables["mi_id"].to_numpy(),
+            "nombre_panacea": reportables["Descripción"].to_numpy(),
+            "nombre_final": reportables["nombre_final"].where(reportables["caso"] != "match_bajo").to_numpy(),
+            "precio": reportables["precio"].to_numpy(),
+            "match_score": reportables["match_score"].to_numpy(),
+            "stock": reportables["stock"].to_numpy(),
+            "error": reportables["error"].to_numpy(),
+        }))
+
+    # Mismas columnas (y orden de aparición) que el armado fila por fila
+    columnas = ["nombre_panacea", "precio_neto", "stock", "error"] if len(sin_mapeo) else []
+    for caso in reportables["caso"].map(lambda c: "match_bajo" if c == "match_bajo" else "descartado").unique():
+        columnas += [c for c in columnas_dup[caso] if c not in columnas]
+    df_errores = pd.concat(partes, ignore_index=True)[columnas].infer_objects() if partes else pd.DataFrame()
+
+    return df_simple.reset_index(drop=True), df_errores
+
+def _imprimir_duplicados(duplicados):
+    """Arma el reporte de duplicados con operaciones de columna y lo imprime de una vez."""
+    if duplicados.empty: return
+    d = duplicados.assign(descartado=~duplicados["elegido"]).sort_values(["grupo", "descartado", "orden"], kind="stable")
+    desc = d["Descripción"].astype(str)
+    score = d["match_score"].astype(str)
+    precio = d["precio"].map("{:.2f}".format)
+    criterio = np.where(d["caso"] == "stock", "mayor precio con stock", "mejor match (sin stock)")
+
+    encabezado = "\n[WARN] ID " + d["mi_id"].astype(str) + " tiene " + d["tamano"].astype(str) + " productos:\n"
+    elegido = np.where(
+        d["caso"] == "match_bajo",
+        "  ⚠ Ningún match >70%. Usando mejor disponible: " + desc + " (" + score + "%)",
+        "  ✓ Seleccionado: " + desc + "\n    Criterio: " + criterio + " | Precio: $" + precio + " | Match: " + score + "%"
+    )
+    descartado = "    ✗ Descartado: " + desc + " ($" + precio + " | " + score + "%)"
+    lineas = np.where(d["elegido"], encabezado + elegido, descartado)
+    # En los grupos sin ningún match bueno solo se informa el elegido
+    lineas = lineas[(d["elegido"] | (d["caso"] != "match_bajo")).to_numpy()]
+    print("\n".join(lineas))
+
+# ==============================================================================
+# TABLA INTERMEDIA Y REGENERACIÓN INCREMENTAL
+# ==============================================================================
+
+# Subir si cambia el armado de construir_dataframe o el formato de los reportes:
+# invalida la tabla intermedia y fuerza a regenerar todo.
+VERSION_REPORTES = 2
+
+COLUMNAS_REPORTE = [
+    "ID", "Código", "Descripción", "Tipo",
+    "Proveedor/Lab", "Acción Farmacológica", "Especie", "Presentación",
+    "Vencimiento", "Stock Actual", "Stock Mínimo", "Estado Stock", "Días s/Stock",
+    "Cant. Min. Compra", "Precio Lista", "Bonif. %", "Desc. Esp. %", "Desc. Fin. %",
+    "NETO (Unitario)", "FINAL c/IVA (Estimado)"
+]
+
+# Productos nuevos que se normalizan juntos mientras se lee el JSON
+TAMANO_BLOQUE_TABLA = 5000
+
+# Columnas con valores del JSON tal cual: Parquet no acepta columnas de tipos
+# mezclados, así que en la tabla intermedia se guardan codificadas en JSON
+COLUMNAS_JSON_TABLA = [*COLUMNAS_CRUDAS, "Vencimiento"]
+
+@contextmanager
+def etapa(nombre, tiempos):
+    t0 = time.perf_counter()
     try:
-        with pd.ExcelWriter(excel_full_path, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False, sheet_name='Stock y Precios')
-            workbook = writer.book
-            worksheet = writer.sheets['Stock y Precios']
-            
-            fmt_header = workbook.add_format({'bold': True, 'bg_color': '#4F81BD', 'font_color': 'white', 'border': 1})
-            fmt_currency = workbook.add_format({'num_format': '$ #,##0.00'})
-            fmt_pct = workbook.add_format({'num_format': '0.0%'})
-            fmt_date = workbook.add_format({'num_format': 'dd/mm/yyyy', 'align': 'center'})
-            fmt_alert_red = workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
-            fmt_alert_green = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})
-            
-            worksheet.set_column('A:B', 10)
-            worksheet.set_column('C:C', 40)
-            worksheet.set_column('D:E', 20)
-            worksheet.set_column('F:H', 25)
-            worksheet.set_column('I:I', 12, fmt_date)
-            worksheet.set_column('J:K', 10)
-            worksheet.set_column('L:L', 12)
-            worksheet.set_column('O:O', 12, fmt_currency)
-            worksheet.set_column('P:R', 8, fmt_pct)
-            worksheet.set_column('S:T', 15, fmt_currency)
-
-            worksheet.conditional_format('L2:L5000', {'type': 'cell', 'criteria': 'equal to', 'value': '"CRÍTICO"', 'format': fmt_alert_red})
-            worksheet.conditional_format('L2:L5000', {'type': 'cell', 'criteria': 'equal to', 'value': '"OK"', 'format': fmt_alert_green})
-
-            for col_num, value in enumerate(df.columns.values):
-                worksheet.write(0, col_num, value, fmt_header)
-        
-        print(f"[OK] Excel generado.")
+        yield
+    finally:
+        tiempos[nombre] = time.perf_counter() - t0
+
+def _hash_producto(p):
+    contenido = json.dumps(p, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(f"{VERSION_REPORTES}:{contenido}".encode("utf-8"), digest_size=16).hexdigest()
+
+def _leer_tabla_intermedia(path_tabla):
+    if not path_tabla.exists(): return None
+    try:
+        tabla = pd.read_parquet(path_tabla)
+        return tabla.assign(**{c: pd.Series([json.loads(v) for v in tabla[c]], index=tabla.index, dtype=object)
+                               for c in COLUMNAS_JSON_TABLA})
     except Exception as e:
-        print(f"[ERROR] Falló Excel: {e}")
+        print(f"[WARN] No se pudo leer la tabla intermedia, se recalcula todo: {e}")
+        return None
 
-    # 4. CSV CON GESTIÓN INTELIGENTE DE DUPLICADOS
-    print(f"[INFO] Generando CSV con resolución de duplicados...")
+def _guardar_tabla_intermedia(tabla, path_tabla):
+    tmp = path_tabla.with_suffix(".tmp")
+    try:
+        codificadas = {c: [json.dumps(v, ensure_ascii=False) for v in tabla[c].tolist()] for c in COLUMNAS_JSON_TABLA}
+        tabla.assign(**codificadas).to_parquet(tmp, index=False)
+        os.replace(tmp, path_tabla)
+    except Exception as e:
+        # Sin pyarrow o sin espacio en disco: la próxima corrida recalcula todo
+        tmp.unlink(missing_ok=True)
+        print(f"[WARN] No se pudo guardar la tabla intermedia ({type(e).__name__}: {e})")
 
-    if not diccionario_path.exists():
-        print(f"[ERROR] No se encontró diccionario: {diccionario_path}")
-        return
+def _construir_bloque(pendientes, cache_html):
+    """Filas normalizadas de un bloque {hash: producto} de productos nuevos."""
+    productos = list(pendientes.values())
+    nuevos = construir_dataframe(productos, cache_html=cache_html)
+    # Valores crudos, sin el tipo inferido solo para este bloque (ver _tipos_del_catalogo)
+    for nombre, (clave, defecto) in COLUMNAS_CRUDAS.items():
+        nuevos[nombre] = pd.Series([p.get(clave, defecto) for p in productos], dtype=object)
+    nuevos["_hash"] = list(pendientes)
+    return nuevos
 
+def _tipos_del_catalogo(df):
+    """Las columnas crudas vuelven al tipo que infiere construir_dataframe sobre
+    el catálogo completo (p.ej. IDs todos numéricos -> int64), así los reportes
+    salen iguales con o sin tabla intermedia."""
+    return df.assign(**{c: pd.Series(df[c].tolist(), index=df.index) for c in COLUMNAS_CRUDAS})
+
+def construir_dataframe_incremental(productos, path_tabla, path_cache_html=None):
+    """construir_dataframe reutilizando las filas ya normalizadas en corridas
+    anteriores: cada fila se guarda en un Parquet con el hash del producto
+    original y solo se recalculan los productos nuevos o modificados.
+    productos puede ser un iterador (lectura en streaming): de los productos
+    ya conocidos solo se guarda el hash, y los nuevos se normalizan de a
+    bloques de TAMANO_BLOQUE_TABLA mientras se lee.
+    Devuelve (df, hashes) con los hashes en el orden de los productos."""
+    previa = _leer_tabla_intermedia(path_tabla)
+    conocidos = set(previa["_hash"]) if previa is not None else set()
+    # El caché HTML se lee una vez y lo completan todos los bloques. Con tabla
+    # previa se recalcula solo una parte y no se poda; sin ella se poda al
+    # final con las descripciones de todo el catálogo
+    cache_html = _leer_cache_html(path_cache_html) if path_cache_html else None
+    en_cache = len(cache_html) if cache_html is not None else 0
+    claves_html = set() if previa is None and cache_html is not None else None
+
+    hashes, recalculados, pendientes = [], set(), {}
+    partes = [previa] if previa is not None else []
+    for p in productos:
+        h = _hash_producto(p)
+        hashes.append(h)
+        if h in conocidos or h in recalculados: continue
+        recalculados.add(h)
+        pendientes[h] = p
+        if claves_html is not None: claves_html.add(_clave_html(p))
+        if len(pendientes) >= TAMANO_BLOQUE_TABLA:
+            partes.append(_construir_bloque(pendientes, cache_html))
+            pendientes = {}
+    if pendientes:
+        partes.append(_construir_bloque(pendientes, cache_html))
+    if cache_html is not None:
+        # Solo se agregan claves: si cambió el tamaño hubo descripciones nuevas
+        parseadas = len(cache_html) != en_cache
+        if claves_html is not None:
+            cache_html = {k: v for k, v in cache_html.items() if k in claves_html}
+        if parseadas or len(cache_html) != en_cache:
+            _guardar_cache_html(cache_html, path_cache_html)
+
+    tabla = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0] if partes else None
+    if tabla is None:
+        return construir_dataframe([]), hashes
+    tabla = tabla.drop_duplicates("_hash").set_index("_hash")
+    vigentes = list(dict.fromkeys(hashes))
+    print(f"[INFO] Tabla de productos: {len(vigentes) - len(recalculados)} filas reutilizadas, {len(recalculados)} recalculadas")
+
+    if recalculados or len(tabla) != len(vigentes):
+        _guardar_tabla_intermedia(tabla.loc[vigentes].reset_index(), path_tabla)
+    return _tipos_del_catalogo(tabla.loc[hashes].reset_index(drop=True)), hashes
+
+def leer_manifiesto(path_manifiesto):
+    if not path_manifiesto.exists(): return {}
     try:
-        diccionario_contenido = diccionario_path.read_text(encoding="utf-8")
-        mapping = json.loads(diccionario_contenido)
+        return json.loads(path_manifiesto.read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return {}
 
-        # Estructuras para gestionar duplicados
-        productos_por_id = defaultdict(list)
-        errores = []
+def guardar_manifiesto(manifiesto, path_manifiesto):
+    tmp = path_manifiesto.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifiesto, indent=2), encoding="utf-8")
+    os.replace(tmp, path_manifiesto)
 
-        # Primera pasada: recopilar todos los productos por ID
-        for _, row in df.iterrows():
-            nombre_origen = row["Descripción"]
-            
-            if nombre_origen in mapping:
-                info_map = mapping[nombre_origen]
-                mi_id = info_map.get("mi_id")
-                mi_nombre = info_map.get("mi_nombre", nombre_origen)
-                match_score = info_map.get("match_score", 0)
-                estado = info_map.get("estado", "DESCONOCIDO")
-                precio_neto = row["NETO (Unitario)"]
-                
-                # Factor de conversión (ajusta según tu necesidad)
-                # Si este factor es correcto, déjalo; si no, cámbialo
-                precio_final = precio_neto / 0.779 if precio_neto > 0 else 0
-
-                if mi_id is not None and mi_id > 0:
-                    productos_por_id[mi_id].append({
-                        "nombre_panacea": nombre_origen,
-                        "nombre_final": mi_nombre,
-                        "precio": precio_final,
-                        "precio_neto": precio_neto,
-                        "match_score": match_score,
-                        "estado": estado,
-                        "stock": row["Stock Actual"],
-                        "codigo": row["Código"]
-                    })
-            else:
-                errores.append({
-                    "nombre_panacea": nombre_origen,
-                    "precio_neto": row["NETO (Unitario)"],
-                    "stock": row["Stock Actual"],
-                    "error": "Sin mapeo en diccionario"
-                })
-
-        # Segunda pasada: resolver duplicados con estrategia inteligente
-        rows_mapped = []
-        
-        print(f"\n[INFO] Analizando {len(productos_por_id)} IDs únicos...")
-        
-        for mi_id, productos in productos_por_id.items():
-            if len(productos) == 1:
-                # Caso simple: un solo producto para este ID
-                p = productos[0]
-                rows_mapped.append({
-                    "producto_id": mi_id,
-                    "nombre": p['nombre_final'],
-                    "precio": p['precio']
-                })
-            else:
-                # DUPLICADOS: aplicar estrategia de resolución
-                print(f"\n[WARN] ID {mi_id} tiene {len(productos)} productos:")
-                
-                # Filtrar por calidad de match
-                buenos_matches = [p for p in productos if p['match_score'] >= 70]
-                
-                if not buenos_matches:
-                    # Si ninguno es bueno, tomar el mejor disponible
-                    mejor = max(productos, key=lambda x: x['match_score'])
-                    print(f"  ⚠ Ningún match >70%. Usando mejor disponible: {mejor['nombre_panacea']} ({mejor['match_score']}%)")
-                    
-                    rows_mapped.append({
-                        "producto_id": mi_id,
-                        "nombre": mejor['nombre_final'],
-                        "precio": mejor['precio']
-                    })
-                    
-                    # Registrar como error
-                    for p in productos:
-                        errores.append({
-                            "producto_id": mi_id,
-                            "nombre_panacea": p['nombre_panacea'],
-                            "precio": p['precio'],
-                            "match_score": p['match_score'],
-                            "stock": p['stock'],
-                            "error": f"Duplicado - match bajo - descartado" if p != mejor else "Duplicado - seleccionado por match"
-                        })
-                else:
-                    # Estrategia: 
-                    # 1. Si hay productos con STOCK > 0, preferirlos
-                    # 2. Entre productos con stock, elegir el de MAYOR PRECIO (más conservador)
-                    # 3. Si no hay stock, elegir el de mayor match_score
-                    
-                    con_stock = [p for p in buenos_matches if p['stock'] > 0]
-                    
-                    if con_stock:
-                        # Elegir el de MAYOR precio entre los que tienen stock
-                        elegido = max(con_stock, key=lambda x: x['precio'])
-                        criterio = "mayor precio con stock"
-                    else:
-                        # Elegir el de mejor match
-                        elegido = max(buenos_matches, key=lambda x: x['match_score'])
-                        criterio = "mejor match (sin stock)"
-                    
-                    print(f"  ✓ Seleccionado: {elegido['nombre_panacea']}")
-                    print(f"    Criterio: {criterio} | Precio: ${elegido['precio']:.2f} | Match: {elegido['match_score']}%")
-                    
-                    rows_mapped.append({
-                        "producto_id": mi_id,
-                        "nombre": elegido['nombre_final'],
-                        "precio": elegido['precio']
-                    })
-                    
-                    # Registrar los descartados
-                    for p in productos:
-                        if p != elegido:
-                            print(f"    ✗ Descartado: {p['nombre_panacea']} (${p['precio']:.2f} | {p['match_score']}%)")
-                            errores.append({
-                                "producto_id": mi_id,
-                                "nombre_panacea": p['nombre_panacea'],
-                                "nombre_final": p['nombre_final'],
-                                "precio": p['precio'],
-                                "match_score": p['match_score'],
-                                "stock": p['stock'],
-                                "error": f"Duplicado descartado - se eligió otro por {criterio}"
-                            })
-
-        # Crear DataFrame final
-        df_simple = pd.DataFrame(rows_mapped)
+def _firma(*partes):
+    h = hashlib.blake2b(digest_size=16)
+    for parte in partes:
+        h.update(parte if isinstance(parte, bytes) else str(parte).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+# ==============================================================================
+# SALIDAS
+# ==============================================================================
+
+def _filas_excel(df, filas_por_bloque):
+    """Filas del DataFrame como tuplas de tipos nativos, convertidas de a bloques
+    para no materializar todo el catálogo como objetos Python a la vez.
+    Los NaN pasan a None (celda vacía, como el na_rep de to_excel)."""
+    for inicio in range(0, len(df), filas_por_bloque):
+        bloque = df.iloc[inicio:inicio + filas_por_bloque]
+        columnas = []
+        for c in bloque.columns:
+            valores = bloque[c].tolist()
+            if bloque[c].isna().any():
+                valores = [None if pd.isna(v) else v for v in valores]
+            columnas.append(valores)
+        yield from zip(*columnas)
+
+def escribir_excel(df, excel_full_path, filas_por_bloque=5000):
+    """Excel completo en modo constant_memory de xlsxwriter: cada fila se vuelca
+    a disco apenas se escribe, así que la memoria no crece con el catálogo.
+    En ese modo las filas tienen que ir en orden, por eso se escribe fila por
+    fila en vez de usar df.to_excel (que recorre columna por columna)."""
+    print(f"[INFO] Generando Excel: {excel_full_path}")
+    try:
+        workbook = xlsxwriter.Workbook(str(excel_full_path), {'constant_memory': True})
+        worksheet = workbook.add_worksheet('Stock y Precios')
+
+        fmt_header = workbook.add_format({'bold': True, 'bg_color': '#4F81BD', 'font_color': 'white', 'border': 1})
+        fmt_currency = workbook.add_format({'num_format': '$ #,##0.00'})
+        fmt_pct = workbook.add_format({'num_format': '0.0%'})
+        fmt_date = workbook.add_format({'num_format': 'dd/mm/yyyy', 'align': 'center'})
+        fmt_alert_red = workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
+        fmt_alert_green = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})
+
+        worksheet.set_column('A:B', 10)
+        worksheet.set_column('C:C', 40)
+        worksheet.set_column('D:E', 20)
+        worksheet.set_column('F:H', 25)
+        worksheet.set_column('I:I', 12, fmt_date)
+        worksheet.set_column('J:K', 10)
+        worksheet.set_column('L:L', 12)
+        worksheet.set_column('O:O', 12, fmt_currency)
+        worksheet.set_column('P:R', 8, fmt_pct)
+        worksheet.set_column('S:T', 15, fmt_currency)
+
+        # Formato condicional sobre todas las filas reales de "Estado Stock"
+        if len(df) and "Estado Stock" in df.columns:
+            col_estado = df.columns.get_loc("Estado Stock")
+            rango = (1, col_estado, len(df), col_estado)
+            worksheet.conditional_format(*rango, {'type': 'cell', 'criteria': 'equal to', 'value': '"CRÍTICO"', 'format': fmt_alert_red})
+            worksheet.conditional_format(*rango, {'type': 'cell', 'criteria': 'equal to', 'value': '"OK"', 'format': fmt_alert_green})
+
+        worksheet.write_row(0, 0, list(df.columns), fmt_header)
+        for fila, valores in enumerate(_filas_excel(df, filas_por_bloque), start=1):
+            worksheet.write_row(fila, 0, valores)
+        workbook.close()
+
+        print(f"[OK] Excel generado: {len(df)} filas.")
+        return True
+    except Exception as e:
+        print(f"[ERROR] Falló Excel: {e}")
+        return False
+
+def escribir_csvs(df, mapping, csv_simple_path, csv_errores_path):
+    """CSV de precios con gestión de duplicados + reporte de errores de mapeo"""
+    print(f"[INFO] Generando CSV con resolución de duplicados...")
+    try:
+        df_simple, df_errores = resolver_duplicados(df, mapping)
         
         if df_simple.empty:
             print("[WARN] No se generaron registros para el CSV.")
@@ -319,8 +551,7 @@ def generar_archivos():
             print(f"\n[OK] CSV generado: {len(df_simple)} productos únicos")
 
         # Guardar reporte de errores
-        if errores:
-            df_errores = pd.DataFrame(errores)
+        if not df_errores.empty:
             df_errores.to_csv(
                 csv_errores_path,
                 index=False,
@@ -328,15 +559,91 @@ def generar_archivos():
                 decimal=',',
                 encoding='utf-8-sig'
             )
-            print(f"[INFO] Reporte de errores guardado: {len(errores)} registros")
-            
-        if sys.platform == 'win32':
-            os.startfile(output_dir)
+            print(f"[INFO] Reporte de errores guardado: {len(df_errores)} registros")
+        return True
 
     except Exception as e:
         print(f"[ERROR] Falló CSV: {e}")
         import traceback
         traceback.print_exc()
+        return False
+
+def generar_archivos(forzar=False, excel_diferido=False):
+    """Con excel_diferido solo se actualizan la tabla intermedia y los CSV; el
+    Excel queda pendiente y se arma en la próxima corrida sin esa opción."""
+    # CONFIGURACIÓN DE RUTAS
+    project_root = Path(__file__).parent
+    output_dir = project_root / "outputs"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    json_path = project_root / "data/panacea_clicks_enriquecido.json"
+    diccionario_path = project_root / "data/diccionario_panacea.json"
+    
+    excel_full_path = output_dir / "Panacea_Completo.xlsx"
+    csv_simple_path = output_dir / "Panacea_Resumen_Precios.csv"
+    csv_errores_path = output_dir / "Panacea_Mapeo_Errores.csv"
+    tabla_path = output_dir / "tabla_productos.parquet"
+    manifiesto_path = output_dir / "manifiesto_reportes.json"
+
+    print(f"[INFO] Procesando archivos en: {project_root}")
+    tiempos = {}
+    inicio = time.perf_counter()
+    manifiesto = {} if forzar else leer_manifiesto(manifiesto_path)
+    escritos = False
+
+    # Los tiempos se reportan también cuando la corrida termina antes por un error
+    try:
+        # 1. CARGA DE DATOS
+        if not json_path.exists():
+            print(f"[ERROR] No se encontró: {json_path}")
+            return
+
+        # 2. PROCESAMIENTO (lectura en streaming, solo filas nuevas o modificadas)
+        with etapa("lectura JSON + tabla productos", tiempos):
+            try:
+                df, hashes = construir_dataframe_incremental(iterar_productos(json_path), tabla_path, PATH_CACHE_HTML)
+            except ValueError as e:
+                print(f"[ERROR] Error al leer JSON: {e}")
+                return
+            df = df[[c for c in COLUMNAS_REPORTE if c in df.columns]]
+
+        print(f"[INFO] Total productos: {len(hashes)}")
+        firma_tabla = _firma(VERSION_REPORTES, *hashes)
+
+        # 3. EXCEL COMPLETO
+        if manifiesto.get("excel") == firma_tabla and excel_full_path.exists():
+            print(f"[INFO] Excel sin cambios, se conserva: {excel_full_path}")
+        elif excel_diferido:
+            print(f"[INFO] Excel diferido: tabla en {tabla_path.name}, se genera en la próxima corrida sin --excel-diferido")
+        else:
+            with etapa("excel", tiempos):
+                if escribir_excel(df, excel_full_path):
+                    manifiesto["excel"] = firma_tabla
+                    guardar_manifiesto(manifiesto, manifiesto_path)
+                    escritos = True
+
+        # 4. CSV CON GESTIÓN INTELIGENTE DE DUPLICADOS
+        if not diccionario_path.exists():
+            print(f"[ERROR] No se encontró diccionario: {diccionario_path}")
+            return
+
+        diccionario_contenido = diccionario_path.read_text(encoding="utf-8")
+        firma_csv = _firma(firma_tabla, diccionario_contenido)
+        if manifiesto.get("csv") == firma_csv and csv_simple_path.exists():
+            print(f"[INFO] CSV sin cambios, se conserva: {csv_simple_path}")
+        else:
+            with etapa("csv", tiempos):
+                mapping = json.loads(diccionario_contenido)
+                if escribir_csvs(df, mapping, csv_simple_path, csv_errores_path):
+                    manifiesto["csv"] = firma_csv
+                    guardar_manifiesto(manifiesto, manifiesto_path)
+                    escritos = True
+    finally:
+        tiempos["total"] = time.perf_counter() - inicio
+        print("[TIEMPOS] " + " | ".join(f"{k}: {v:.2f}s" for k, v in tiempos.items()))
+
+    if escritos and sys.platform == 'win32':
+        os.startfile(output_dir)
 
 if __name__ == "__main__":
-    generar_archivos()
\ No newline at end of file
+    generar_archivos(forzar="--forzar" in sys.argv, excel_diferido="--excel-diferido" in sys.argv)
\ No newline at end of file
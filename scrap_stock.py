@@ -1,12 +1,20 @@
-import requests
 import json
 import time
 import random
 import os
 import re
-from datetime import datetime
+import argparse
+import sys
+import queue
+import threading
+from datetime import datetime, timedelta
+from itertools import islice
 from uuid import uuid4
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, table, column, cast, Date
+from sqlalchemy.dialects.postgresql import insert
+
+from cliente_http import ClienteHTTP, ErrorHTTP, CircuitoAbierto
+from cola_revision import encolar_revision
 from sqlalchemy.orm import sessionmaker
 
 # ==============================================================================
@@ -22,7 +30,10 @@ DB_PASS = os.getenv("DB_PASS", "password")
 DB_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 DIR_ACTUAL = os.path.dirname(os.path.abspath(__file__))
-PATH_BACKUP_JSON = os.path.join(DIR_ACTUAL, "outputs", "backup_stock_panacea.json")
+PATH_BACKUP_NDJSON = os.path.join(DIR_ACTUAL, "outputs", "backup_stock_panacea.ndjson")
+PATH_BACKUP_CURSOR = os.path.join(DIR_ACTUAL, "outputs", "backup_stock_cursor.json")
+PATH_BACKUP_CARGADOS = os.path.join(DIR_ACTUAL, "outputs", "backup_stock_cargados.json")
+PATH_POLITICA = os.path.join(DIR_ACTUAL, "politica_carga.json")
 
 URL_API = "https://www.gc-sistemas.com.ar/crmcloud/panacea-api/api/v1/producto/producto_x_usuario2"
 HEADERS = {
@@ -37,6 +48,34 @@ HEADERS = {
 }
 NOMBRE_COMPETIDOR = "Panacea"
 ORIGEN_CARGA = "scraping_automatico_unificado"
+# Registros extra del mismo día ("conservar_ambos"); quedan fuera del índice único
+ORIGEN_CARGA_DUPLICADO = "scraping_automatico_duplicado"
+INDICE_UNICO_STOCK = "ux_stock_competencia_scraping_dia"
+
+# Política del modo desatendido (--batch). Valores posibles:
+#   desconocidos: "revisar" (encolar y omitir) / "crear" / "omitir"
+#   duplicados:   "revisar" (conservar el primero y encolar) / "conservar_primero" /
+#                 "conservar_ultimo" / "conservar_ambos"
+POLITICA_DEFECTO = {
+    "desconocidos": "revisar",
+    "duplicados": "revisar"
+}
+OPCIONES_POLITICA = {
+    "desconocidos": ("revisar", "crear", "omitir"),
+    "duplicados": ("revisar", "conservar_primero", "conservar_ultimo", "conservar_ambos")
+}
+
+# Cantidad de filas por INSERT multi-fila en stock_competencia
+TAMANO_LOTE_STOCK = 1000
+
+# Páginas scrapeadas que pueden esperar al escritor de DB (acota la memoria)
+MAX_PAGINAS_EN_COLA = 8
+
+TABLA_STOCK = table(
+    "stock_competencia",
+    column("id"), column("producto_id"), column("competidor_id"),
+    column("stock"), column("fecha_registro"), column("origen_carga")
+)
 
 
 # ==============================================================================
@@ -49,9 +88,97 @@ def limpiar_texto_simple(texto: str) -> str:
     texto = re.sub(r'[^A-Z0-9\s\.]', ' ', texto)
     return ' '.join(texto.split())
 
-def obtener_datos_scraping():
+def iniciar_backup():
+    """Vacía el backup NDJSON, el cursor y el progreso de carga para un scraping desde cero."""
+    os.makedirs(os.path.dirname(PATH_BACKUP_NDJSON), exist_ok=True)
+    open(PATH_BACKUP_NDJSON, "w", encoding="utf-8").close()
+    for path in (PATH_BACKUP_CURSOR, PATH_BACKUP_CARGADOS):
+        if os.path.exists(path): os.remove(path)
+
+def guardar_pagina_backup(productos, marca_id, pagina, total_productos):
+    """Agrega una página al backup NDJSON y avanza el cursor (marca, página).
+    El cursor guarda también cuántos productos y bytes del backup corresponden
+    a páginas completas, para descartar una página escrita a medias al reanudar."""
+    with open(PATH_BACKUP_NDJSON, "ab") as f:
+        for p in productos:
+            f.write((json.dumps(p, ensure_ascii=False) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+        fin = f.tell()
+    guardar_cursor({"marca": marca_id, "pagina": pagina, "productos": total_productos, "bytes": fin, "completo": False})
+
+def _guardar_json_atomico(path, datos):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+    os.replace(tmp, path)
+
+def guardar_cursor(cursor):
+    _guardar_json_atomico(PATH_BACKUP_CURSOR, {**cursor, "actualizado": datetime.now().isoformat()})
+
+def leer_cursor():
+    if not os.path.exists(PATH_BACKUP_CURSOR): return None
+    try:
+        with open(PATH_BACKUP_CURSOR, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[WARN] Error leyendo cursor de backup: {e}")
+        return None
+
+def guardar_productos_cargados(cantidad):
+    """Progreso del escritor de DB: los primeros `cantidad` productos del backup ya
+    están confirmados en la base. Solo lo avanza quien hace el commit."""
+    _guardar_json_atomico(PATH_BACKUP_CARGADOS, {"productos": cantidad, "actualizado": datetime.now().isoformat()})
+
+def leer_productos_cargados():
+    if not os.path.exists(PATH_BACKUP_CARGADOS): return 0
+    try:
+        with open(PATH_BACKUP_CARGADOS, "r", encoding="utf-8") as f:
+            return json.load(f)["productos"]
+    except Exception as e:
+        print(f"[WARN] Error leyendo progreso de carga: {e}. Se recarga el backup completo.")
+        return 0
+
+def recortar_backup(cursor):
+    """Descarta lo escrito después de la última página completa (un corte a mitad
+    de guardar_pagina_backup); esa página se vuelve a scrapear al reanudar."""
+    if "bytes" not in cursor or not os.path.exists(PATH_BACKUP_NDJSON): return
+    if os.path.getsize(PATH_BACKUP_NDJSON) > cursor["bytes"]:
+        print("[WARN] El backup tiene una página incompleta al final, se descarta.")
+        with open(PATH_BACKUP_NDJSON, "r+b") as f:
+            f.truncate(cursor["bytes"])
+
+def iterar_backup(desde=0):
+    """Productos del backup en orden, salteando los primeros `desde`."""
+    with open(PATH_BACKUP_NDJSON, "r", encoding="utf-8") as f:
+        leidos = 0
+        for linea in f:
+            linea = linea.strip()
+            if not linea: continue
+            try:
+                producto = json.loads(linea)
+            except json.JSONDecodeError:
+                # Última línea truncada por un corte a mitad de escritura
+                print("[WARN] Línea incompleta en backup, se ignora.")
+                continue
+            leidos += 1
+            if leidos > desde: yield producto
+
+def leer_backup():
+    return list(iterar_backup())
+
+def obtener_datos_scraping(reanudar_desde=None, en_pagina=None):
+    """Scrapea todas las marcas. Si se pasa `en_pagina`, cada página se entrega
+    a ese callback en vez de acumularse en la lista devuelta."""
     # Scraping de las 3 marcas solicitadas
     ids_marcas = [128, 145, 249] 
+
+    if reanudar_desde and reanudar_desde.get("marca") in ids_marcas:
+        ids_marcas = ids_marcas[ids_marcas.index(reanudar_desde["marca"]):]
+        print(f"\n>> Reanudando desde marca {reanudar_desde['marca']}, página {reanudar_desde['pagina'] + 1}")
+    else:
+        reanudar_desde = None
+        iniciar_backup()
     
     payload = {
         "id_usuario": 2801,
@@ -68,8 +195,11 @@ def obtener_datos_scraping():
     }
 
     todos_los_productos = []
-    session = requests.Session()
-    session.headers.update(HEADERS)
+    total_recolectado = 0
+    # Productos que ya tenía el backup antes de reanudar (el cursor los cuenta)
+    en_backup = reanudar_desde.get("productos", 0) if reanudar_desde else 0
+    cliente = ClienteHTTP(headers=HEADERS)
+    interrumpido = False
 
     print(f"\n--- [FASE 1] Iniciando Scraping Multimarca: {ids_marcas} ---")
 
@@ -77,70 +207,89 @@ def obtener_datos_scraping():
         print(f"\n>>> PROCESANDO MARCA ID: {marca_id}")
         payload["id_producto_marca"] = marca_id
         pagina_actual = 1
+        if reanudar_desde and reanudar_desde["marca"] == marca_id:
+            pagina_actual = reanudar_desde["pagina"] + 1
         payload["pagina"] = pagina_actual
         
         contador_racha = 0
         limite_racha = random.randint(8, 15)
-        hay_mas_datos = True
 
-        while hay_mas_datos:
+        while True:
             print(f"   Pag {pagina_actual}...", end=" ")
             payload["pagina"] = pagina_actual
-            
+
+            # ClienteHTTP devuelve solo respuestas < 400; el resto llega como ErrorHTTP
             try:
-                response = session.post(URL_API, json=payload)
-                if response.status_code == 200:
-                    data = response.json()
-                    lista_a_procesar = []
-
-                    if isinstance(data, list):
-                        lista_a_procesar = data
-                    elif isinstance(data, dict):
-                        for key, value in data.items():
-                            if isinstance(value, list):
-                                lista_a_procesar = value
-                                break
-                    
-                    if not lista_a_procesar:
-                        print("\n   [INFO] Fin de resultados para esta marca.")
-                        hay_mas_datos = False
-                        break
-                    
-                    count = 0
-                    for item in lista_a_procesar:
-                        if isinstance(item, dict):
-                            todos_los_productos.append({
-                                "id": item.get("id_producto", "N/A"),
-                                "producto": item.get("descripcion", "Sin Nombre"),
-                                "stock": item.get("stock", "0")
-                            })
-                            count += 1
-                    
-                    print(f"-> {count} items", end=" ")
-                    pagina_actual += 1
-                    contador_racha += 1
-                    
-                    if contador_racha >= limite_racha:
-                        tiempo_enfriamiento = random.uniform(15, 30)
-                        print(f"\n     [☕] Pausa larga ({tiempo_enfriamiento:.1f}s)...")
-                        time.sleep(tiempo_enfriamiento)
-                        contador_racha = 0
-                        limite_racha = random.randint(8, 15)
-                    else:
-                        wait_time = random.uniform(3, 60)
-                        print(f"| {wait_time:.1f}s")
-                        time.sleep(wait_time)
-                else:
-                    print(f"\n   [ERROR] Status {response.status_code}")
-                    hay_mas_datos = False
+                data = cliente.post(URL_API, json=payload).json()
+            except CircuitoAbierto as e:
+                # El host viene fallando: se corta todo y el cursor queda para reanudar
+                print(f"\n   [ERROR SCRAPING] {e}. Marca {marca_id}, pág {pagina_actual}: se corta el scraping.")
+                interrumpido = True
+                break
+            except ErrorHTTP as e:
+                if e.transitorio:
+                    # Los reintentos ya se agotaron: se corta todo y el cursor queda para reanudar
+                    print(f"\n   [ERROR SCRAPING] {e}. Marca {marca_id}, pág {pagina_actual}: se corta el scraping.")
+                    interrumpido = True
+                    break
+                # 4xx definitivo: termina esta marca y se sigue con la próxima
+                print(f"\n   [ERROR] {e}. Marca {marca_id}, pág {pagina_actual}: se pasa a la siguiente marca.")
+                break
             except Exception as e:
                 print(f"\n   [ERROR CRÍTICO SCRAPING] {e}")
-                hay_mas_datos = False
-        
+                interrumpido = True
+                break
+
+            lista_a_procesar = []
+            if isinstance(data, list):
+                lista_a_procesar = data
+            elif isinstance(data, dict):
+                for key, value in data.items():
+                    if isinstance(value, list):
+                        lista_a_procesar = value
+                        break
+
+            if not lista_a_procesar:
+                print("\n   [INFO] Fin de resultados para esta marca.")
+                break
+
+            productos_pagina = [{
+                "id": item.get("id_producto", "N/A"),
+                "producto": item.get("descripcion", "Sin Nombre"),
+                "stock": item.get("stock", "0")
+            } for item in lista_a_procesar if isinstance(item, dict)]
+            total_recolectado += len(productos_pagina)
+            guardar_pagina_backup(productos_pagina, marca_id, pagina_actual, en_backup + total_recolectado)
+            if en_pagina: en_pagina(productos_pagina)
+            else: todos_los_productos.extend(productos_pagina)
+
+            print(f"-> {len(productos_pagina)} items", end=" ")
+            pagina_actual += 1
+            contador_racha += 1
+
+            if contador_racha >= limite_racha:
+                tiempo_enfriamiento = random.uniform(15, 30)
+                print(f"\n     [☕] Pausa larga ({tiempo_enfriamiento:.1f}s)...")
+                time.sleep(tiempo_enfriamiento)
+                contador_racha = 0
+                limite_racha = random.randint(8, 15)
+            else:
+                wait_time = random.uniform(3, 60)
+                print(f"| {wait_time:.1f}s")
+                time.sleep(wait_time)
+
+        if interrumpido: break
         print(f"   [OK] Marca {marca_id} finalizada. Esperando...")
         time.sleep(5)
 
-    print(f"\n--- TOTAL RECOLECTADO: {len(todos_los_productos)} productos ---")
+    print(f"\n>> HTTP: {cliente.resumen()}")
+    if interrumpido:
+        print("[WARN] Scraping interrumpido. Use la opción 2 del menú (o --batch --backup) para reanudar.")
+    else:
+        cursor = leer_cursor() or {"marca": ids_marcas[-1], "pagina": 0}
+        guardar_cursor({**cursor, "productos": en_backup + total_recolectado, "completo": True})
+
+    print(f"\n--- TOTAL RECOLECTADO: {total_recolectado} productos ---")
     return todos_los_productos
 
 def cargar_mapa_alias_db(session):
@@ -154,16 +303,227 @@ def cargar_mapa_alias_db(session):
         print(f"[ERROR] Cargando alias: {e}")
         return {}
 
-def obtener_registros_hoy(session, competidor_id):
+def indice_unico_existe(session):
+    """True si está el índice único del día (lo crea migrar_indice_unico). Sin él,
+    la carga consulta los registros del día en vez de usar ON CONFLICT."""
+    try:
+        existe = session.execute(
+            text("SELECT 1 FROM pg_indexes WHERE indexname = :nombre"), {"nombre": INDICE_UNICO_STOCK}
+        ).fetchone()
+    except Exception as e:
+        session.rollback()
+        print(f"[WARN] No se pudo verificar el índice {INDICE_UNICO_STOCK}: {e}")
+        return False
+    if not existe:
+        print(f"[WARN] Falta el índice único {INDICE_UNICO_STOCK}: los duplicados del día se detectan "
+              f"consultando la tabla. Crearlo una vez con: python scrap_stock.py --migrar")
+    return bool(existe)
+
+def migrar_indice_unico(session):
+    """Paso manual, una sola vez (--migrar): crea el índice único por producto,
+    competidor y día para las filas de ORIGEN_CARGA; lo que cargan otros procesos o
+    los competidores manuales no entra. Antes reetiqueta los duplicados históricos de
+    este origen como ORIGEN_CARGA_DUPLICADO para que el índice se pueda construir sin
+    borrar datos. Bloquea las escrituras a stock_competencia mientras se construye:
+    correrlo fuera del horario de la carga programada.
+    Falla si fecha_registro es timestamptz (fecha_registro::date no es inmutable)."""
+    try:
+        if indice_unico_existe(session):
+            print(f">> El índice {INDICE_UNICO_STOCK} ya existe.")
+            return True
+        print(f">> Creando índice único {INDICE_UNICO_STOCK}...")
+        res = session.execute(text("""
+            UPDATE stock_competencia s
+            SET origen_carga = :dup
+            FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY producto_id, competidor_id, fecha_registro::date
+                    ORDER BY fecha_registro, id
+                ) AS rn
+                FROM stock_competencia
+                WHERE origen_carga = :origen
+            ) d
+            WHERE s.id = d.id AND d.rn > 1
+        """), {"dup": ORIGEN_CARGA_DUPLICADO, "origen": ORIGEN_CARGA})
+        if res.rowcount:
+            print(f"   - {res.rowcount} registros históricos marcados como duplicados.")
+        session.execute(text(f"""
+            CREATE UNIQUE INDEX {INDICE_UNICO_STOCK}
+            ON stock_competencia (producto_id, competidor_id, (fecha_registro::date))
+            WHERE origen_carga = '{ORIGEN_CARGA}'
+        """))
+        session.commit()
+        print(f"✅ Índice {INDICE_UNICO_STOCK} creado.")
+        return True
+    except Exception as e:
+        session.rollback()
+        print(f"[ERROR] No se pudo crear el índice {INDICE_UNICO_STOCK}: {e}")
+        return False
+
+def pedir_politica_duplicados():
+    print("\n[?] Si un producto YA FUE CARGADO HOY:")
+    print("P. Conservar el primero (omitir el nuevo)")
+    print("U. Conservar el último (reemplazar stock)")
+    print("A. Conservar ambos")
+    opciones = {"P": "conservar_primero", "U": "conservar_ultimo", "A": "conservar_ambos"}
+    while True:
+        resp = input(">> Seleccione una opción: ").strip().upper()
+        if resp in opciones: return opciones[resp]
+        print("Opción inválida.")
+
+def resolver_productos_por_nombre(session, nombres):
+    """Resuelve en una sola consulta los nombres que no están en el mapa de alias."""
+    nombres = list({n for n in nombres if n})
+    if not nombres: return {}
+    sql = text("SELECT nombre_producto, id FROM productos WHERE nombre_producto = ANY(:nombres)")
+    result = session.execute(sql, {"nombres": nombres}).fetchall()
+    return {row[0]: row[1] for row in result}
+
+def deduplicar_filas(filas, politica_duplicados):
+    """Resuelve repeticiones del mismo producto dentro de la carga (un solo
+    ON CONFLICT DO UPDATE no puede tocar dos veces la misma fila)."""
+    por_producto = {}
+    descartadas = []
+    for fila in filas:
+        pid = fila["producto_id"]
+        if pid not in por_producto:
+            por_producto[pid] = fila
+        elif politica_duplicados == "conservar_ultimo":
+            descartadas.append(por_producto[pid])
+            por_producto[pid] = fila
+        else:
+            descartadas.append(fila)
+    return list(por_producto.values()), descartadas
+
+def rango_dia(fecha):
+    """[inicio del día, inicio del siguiente) para filtrar fecha_registro por día."""
+    desde = datetime(fecha.year, fecha.month, fecha.day)
+    return desde, desde + timedelta(days=1)
+
+def productos_cargados_hoy(session, filas):
+    """producto_id de las filas que ya tienen registro de ORIGEN_CARGA en el día
+    (solo se usa cuando no está el índice único)."""
+    fila = filas[0]
+    desde, hasta = rango_dia(fila["fecha_registro"])
     sql = text("""
-        SELECT producto_id 
-        FROM stock_competencia 
-        WHERE competidor_id = :cid 
-          AND fecha_registro::date = current_date
+        SELECT DISTINCT producto_id FROM stock_competencia
+        WHERE competidor_id = :cid AND producto_id = ANY(:pids) AND origen_carga = :origen
+          AND fecha_registro >= :desde AND fecha_registro < :hasta
     """)
-    result = session.execute(sql, {"cid": competidor_id}).fetchall()
+    result = session.execute(sql, {
+        "cid": fila["competidor_id"], "pids": [f["producto_id"] for f in filas], "origen": ORIGEN_CARGA,
+        "desde": desde, "hasta": hasta
+    }).fetchall()
     return {row[0] for row in result}
 
+def upsert_stock_en_lotes(session, filas, politica_duplicados, tamano_lote=TAMANO_LOTE_STOCK, con_indice=True):
+    """Inserta las filas de stock con un INSERT ... ON CONFLICT multi-fila por lote.
+    Sin el índice único (con_indice=False) los duplicados se buscan con una consulta
+    por lote y se insertan o actualizan aparte.
+    Devuelve (insertados, filas en conflicto con registros de hoy) y reporta la tasa."""
+    if not filas: return 0, []
+    filas, conflictos = deduplicar_filas(filas, politica_duplicados)
+    clave_dia = [TABLA_STOCK.c.producto_id, TABLA_STOCK.c.competidor_id, cast(TABLA_STOCK.c.fecha_registro, Date)]
+    predicado_indice = text(f"origen_carga = '{ORIGEN_CARGA}'")
+    sql_actualizar_hoy = text("""
+        UPDATE stock_competencia SET stock = :stock, fecha_registro = :fecha_registro
+        WHERE producto_id = :producto_id AND competidor_id = :competidor_id AND origen_carga = :origen_carga
+          AND fecha_registro >= :desde AND fecha_registro < :hasta
+    """)
+
+    insertados = 0
+    inicio = time.perf_counter()
+    for i in range(0, len(filas), tamano_lote):
+        lote = filas[i:i + tamano_lote]
+        if not con_indice:
+            ya_cargados = productos_cargados_hoy(session, lote)
+            nuevas = [f for f in lote if f["producto_id"] not in ya_cargados]
+            repetidas = [f for f in lote if f["producto_id"] in ya_cargados]
+            if nuevas:
+                session.execute(insert(TABLA_STOCK).values(nuevas))
+                insertados += len(nuevas)
+            if repetidas and politica_duplicados == "conservar_ultimo":
+                desde, hasta = rango_dia(lote[0]["fecha_registro"])
+                session.execute(sql_actualizar_hoy, [{**f, "desde": desde, "hasta": hasta} for f in repetidas])
+                insertados += len(repetidas)
+            else:
+                conflictos.extend(repetidas)
+            continue
+
+        stmt = insert(TABLA_STOCK).values(lote)
+        if politica_duplicados == "conservar_ultimo":
+            stmt = stmt.on_conflict_do_update(
+                index_elements=clave_dia, index_where=predicado_indice,
+                set_={"stock": stmt.excluded.stock, "fecha_registro": stmt.excluded.fecha_registro}
+            )
+            insertados += session.execute(stmt).rowcount
+            continue
+
+        stmt = stmt.on_conflict_do_nothing(index_elements=clave_dia, index_where=predicado_indice)
+        escritos = {str(row[0]) for row in session.execute(stmt.returning(TABLA_STOCK.c.id)).fetchall()}
+        insertados += len(escritos)
+        conflictos.extend(f for f in lote if str(f["id"]) not in escritos)
+
+    extras = []
+    if politica_duplicados == "conservar_ambos":
+        extras = [{**f, "origen_carga": ORIGEN_CARGA_DUPLICADO} for f in conflictos]
+    for i in range(0, len(extras), tamano_lote):
+        session.execute(insert(TABLA_STOCK).values(extras[i:i + tamano_lote]))
+        insertados += len(extras[i:i + tamano_lote])
+
+    duracion = time.perf_counter() - inicio
+    tasa = insertados / duracion if duracion > 0 else float(insertados)
+    print(f">> Stock escrito en lote ({politica_duplicados}): {insertados} filas en {duracion:.2f}s ({tasa:.0f} filas/s)")
+    return insertados, conflictos
+
+def aplicar_revision(session, item, producto_id=None):
+    """Carga el stock de un caso de la cola de revisión: reemplaza (o crea) el
+    registro de ese día del producto. Un desconocido necesita el producto_id de
+    su traducción; un duplicado ya trae el suyo."""
+    producto_id = producto_id or item.get("producto_id")
+    if not producto_id:
+        raise ValueError("El caso no tiene producto asociado: traducirlo primero")
+    competidor = session.execute(
+        text("SELECT id FROM competidores WHERE nombre = :nombre"), {"nombre": NOMBRE_COMPETIDOR}
+    ).fetchone()
+    if not competidor:
+        raise ValueError(f"No existe el competidor {NOMBRE_COMPETIDOR}")
+
+    fila = {
+        "id": uuid4(),
+        "producto_id": producto_id,
+        "competidor_id": competidor[0],
+        "stock": int(item.get("stock") or 0),
+        "fecha_registro": datetime.fromisoformat(item["fecha"]),
+        "origen_carga": ORIGEN_CARGA
+    }
+    try:
+        upsert_stock_en_lotes(session, [fila], "conservar_ultimo", con_indice=indice_unico_existe(session))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+def cargar_politica(path=PATH_POLITICA):
+    """Política del modo desatendido. Un archivo ilegible o con valores fuera de
+    OPCIONES_POLITICA corta la carga: un error de tipeo no debe cambiar en silencio
+    qué se hace con los duplicados o los desconocidos."""
+    politica = dict(POLITICA_DEFECTO)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                politica.update(json.load(f))
+        except Exception as e:
+            raise ValueError(f"Error leyendo política {path}: {e}")
+    for clave, valor in politica.items():
+        if clave not in OPCIONES_POLITICA:
+            raise ValueError(f"Política {path}: clave desconocida '{clave}' (válidas: {', '.join(OPCIONES_POLITICA)})")
+        if valor not in OPCIONES_POLITICA[clave]:
+            raise ValueError(f"Política {path}: '{clave}' = '{valor}' no es válido "
+                             f"(opciones: {', '.join(OPCIONES_POLITICA[clave])})")
+    print(f">> Modo desatendido. Política: {politica}")
+    return politica
+
 def pedir_confirmacion_creacion(nombre_original):
     print(f"\n[?] No se encontró match en Diccionario ni Productos para: '{nombre_original}'")
     print("0. No, omitir este producto.")
@@ -174,59 +534,84 @@ def pedir_confirmacion_creacion(nombre_original):
         elif opcion == "1": return True
         else: print("Opción inválida.")
 
-def guardar_en_base_datos(stock_data):
-    print(f"\n--- [FASE 2] Guardando en Base de Datos ---")
-    
-    engine = None
-    session = None
-    
-    try:
-        engine = create_engine(DB_URL)
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        print(">> Conexión DB establecida.")
-
-        mapa_alias = cargar_mapa_alias_db(session)
-
-        sql_competidor = text("SELECT id FROM competidores WHERE nombre = :nombre")
-        res_comp = session.execute(sql_competidor, {"nombre": NOMBRE_COMPETIDOR}).fetchone()
-        
-        if not res_comp:
-            competidor_id = uuid4()
-            session.execute(text("""
-                INSERT INTO competidores (id, nombre, activo, es_manual, created_at, updated_at)
-                VALUES (:id, :nombre, true, false, now(), now())
-            """), {"id": competidor_id, "nombre": NOMBRE_COMPETIDOR})
-            session.commit()
-        else:
-            competidor_id = res_comp[0]
-
-        productos_ya_cargados_hoy = obtener_registros_hoy(session, competidor_id)
-
-        sql_busqueda_prod_nombre = text("SELECT id FROM productos WHERE nombre_producto = :nombre")
-        
-        sql_insert_nuevo_producto = text("""
-            INSERT INTO productos (id, nombre_producto, precio_lista, activo, created_at, updated_at)
-            VALUES (:id, :nombre, 1, true, now(), now())
-        """)
-
-        sql_insert_alias = text("""
-            INSERT INTO producto_alias (id, producto_id, termino_busqueda, texto_original, origen, confianza, created_at)
-            VALUES (:id, :pid, :term, :orig, 'PROVEEDOR', 100.0, now())
-        """)
+class CargadorStock:
+    """Carga incremental de stock en la DB: se le pasan páginas (o la lista
+    completa) y va resolviendo alias e insertando por lotes."""
 
-        sql_insert_stock = text("""
-            INSERT INTO stock_competencia (id, producto_id, competidor_id, stock, fecha_registro, origen_carga)
-            VALUES (:id, :pid, :cid, :stock, :fecha, :origen)
-        """)
+    sql_insert_nuevo_producto = text("""
+        INSERT INTO productos (id, nombre_producto, precio_lista, activo, created_at, updated_at)
+        VALUES (:id, :nombre, 1, true, now(), now())
+    """)
 
-        registros_insertados = 0
-        productos_creados = 0
-        registros_saltados = 0
-        timestamp_ahora = datetime.utcnow()
+    sql_insert_alias = text("""
+        INSERT INTO producto_alias (id, producto_id, termino_busqueda, texto_original, origen, confianza, created_at)
+        VALUES (:id, :pid, :term, :orig, 'PROVEEDOR', 100.0, now())
+    """)
 
-        # Variable para controlar la respuesta masiva ("Sí a todos" / "No a todos")
-        accion_duplicados_global = None 
+    def __init__(self, session, politica=None, tamano_lote=TAMANO_LOTE_STOCK, al_confirmar=None,
+                 politica_duplicados=None):
+        self.session = session
+        self.politica = politica
+        self.tamano_lote = tamano_lote
+        # Se llama con la cantidad de productos recibidos que ya quedaron confirmados
+        self.al_confirmar = al_confirmar
+
+        self.mapa_alias = cargar_mapa_alias_db(session)
+        self.competidor_id = self._obtener_competidor()
+        self.con_indice = indice_unico_existe(session)
+        if politica_duplicados is None:
+            politica_duplicados = politica["duplicados"] if politica is not None else pedir_politica_duplicados()
+        self.politica_duplicados = politica_duplicados
+
+        self.filas_stock = []
+        self.nombres_por_fila = {}
+        self.registros_insertados = 0
+        self.productos_creados = 0
+        self.registros_saltados = 0
+        self.resueltos_por_nombre = 0
+        self.timestamp_ahora = datetime.utcnow()
+        self.pendientes_revision = []
+        self.enviados_revision = 0
+        self.productos_recibidos = 0
+
+    def _obtener_competidor(self):
+        sql_competidor = text("SELECT id FROM competidores WHERE nombre = :nombre")
+        res_comp = self.session.execute(sql_competidor, {"nombre": NOMBRE_COMPETIDOR}).fetchone()
+        if res_comp: return res_comp[0]
+
+        competidor_id = uuid4()
+        self.session.execute(text("""
+            INSERT INTO competidores (id, nombre, activo, es_manual, created_at, updated_at)
+            VALUES (:id, :nombre, true, false, now(), now())
+        """), {"id": competidor_id, "nombre": NOMBRE_COMPETIDOR})
+        self.session.commit()
+        return competidor_id
+
+    def _crear_producto(self, nombre_original):
+        nuevo_id = uuid4()
+        nombre_nuevo = f"{nombre_original} (PANACEA)"
+        termino_busqueda = limpiar_texto_simple(nombre_original)
+
+        self.session.execute(self.sql_insert_nuevo_producto, {
+            "id": nuevo_id, "nombre": nombre_nuevo
+        })
+        self.session.execute(self.sql_insert_alias, {
+            "id": uuid4(), "pid": nuevo_id, "term": termino_busqueda, "orig": nombre_original
+        })
+
+        self.productos_creados += 1
+        self.mapa_alias[nombre_original] = nuevo_id
+        print(f"   [+] Creado: {nombre_nuevo}")
+        return nuevo_id
+
+    def procesar(self, stock_data):
+        """Resuelve e inserta una tanda de productos; escribe cada lote completo."""
+        nombres_sin_alias = [
+            item.get("producto", "").strip() for item in stock_data
+            if item.get("producto", "").strip() not in self.mapa_alias
+        ]
+        mapa_productos = resolver_productos_por_nombre(self.session, nombres_sin_alias)
+        self.resueltos_por_nombre += len(mapa_productos)
 
         for item in stock_data:
             nombre_original = item.get("producto", "").strip()
@@ -240,89 +625,95 @@ def guardar_en_base_datos(stock_data):
 
             producto_id = None
 
-            if nombre_original in mapa_alias:
-                producto_id = mapa_alias[nombre_original]
+            if nombre_original in self.mapa_alias:
+                producto_id = self.mapa_alias[nombre_original]
+            elif nombre_original in mapa_productos:
+                producto_id = mapa_productos[nombre_original]
             else:
-                res_p = session.execute(sql_busqueda_prod_nombre, {"nombre": nombre_original}).fetchone()
-                if res_p:
-                    producto_id = res_p[0]
+                if self.politica is None:
+                    crear = pedir_confirmacion_creacion(nombre_original)
                 else:
-                    if pedir_confirmacion_creacion(nombre_original):
-                        nuevo_id = uuid4()
-                        nombre_nuevo = f"{nombre_original} (PANACEA)"
-                        termino_busqueda = limpiar_texto_simple(nombre_original)
-                        
-                        session.execute(sql_insert_nuevo_producto, {
-                            "id": nuevo_id, "nombre": nombre_nuevo
-                        })
-                        session.execute(sql_insert_alias, {
-                            "id": uuid4(), "pid": nuevo_id, "term": termino_busqueda, "orig": nombre_original
+                    crear = self.politica.get("desconocidos") == "crear"
+                    if self.politica.get("desconocidos") == "revisar":
+                        self.pendientes_revision.append({
+                            "id": str(uuid4()), "tipo": "desconocido", "nombre": nombre_original,
+                            "stock": stock_cantidad, "fecha": self.timestamp_ahora.isoformat()
                         })
 
-                        producto_id = nuevo_id
-                        productos_creados += 1
-                        mapa_alias[nombre_original] = producto_id
-                        print(f"   [+] Creado: {nombre_nuevo}")
-                    else:
-                        continue
+                if not crear: continue
+                producto_id = self._crear_producto(nombre_original)
 
-            # --- VERIFICACIÓN DE DUPLICADOS CON PREGUNTA ---
             if producto_id:
-                insertar = True
-                
-                if producto_id in productos_ya_cargados_hoy:
-                    # Si ya hay una decisión global tomada (ST o NT)
-                    if accion_duplicados_global == "SI_A_TODOS":
-                        insertar = True
-                    elif accion_duplicados_global == "NO_A_TODOS":
-                        insertar = False
-                    else:
-                        # Preguntar al usuario
-                        print(f"\n   [!] El producto '{nombre_original}' YA FUE CARGADO HOY.")
-                        print(f"       Stock nuevo a cargar: {stock_cantidad}")
-                        print("       Opciones: [S] Si / [N] No / [ST] Si a todos / [NT] No a todos")
-                        
-                        while True:
-                            resp = input("       >> ¿Registrar igual? ").strip().upper()
-                            if resp == 'S':
-                                insertar = True
-                                break
-                            elif resp == 'N':
-                                insertar = False
-                                break
-                            elif resp == 'ST':
-                                insertar = True
-                                accion_duplicados_global = "SI_A_TODOS"
-                                print("       [INFO] Se registrarán todos los duplicados restantes sin preguntar.")
-                                break
-                            elif resp == 'NT':
-                                insertar = False
-                                accion_duplicados_global = "NO_A_TODOS"
-                                print("       [INFO] Se omitirán todos los duplicados restantes sin preguntar.")
-                                break
-                            else:
-                                print("       Opción no válida.")
-
-                if insertar:
-                    session.execute(sql_insert_stock, {
-                        "id": uuid4(),
-                        "pid": producto_id,
-                        "cid": competidor_id,
-                        "stock": stock_cantidad,
-                        "fecha": timestamp_ahora,
-                        "origen": ORIGEN_CARGA
-                    })
-                    registros_insertados += 1
-                    # Agregar al set para que si vuelve a aparecer en este mismo array, detecte duplicado
-                    productos_ya_cargados_hoy.add(producto_id)
-                else:
-                    registros_saltados += 1
-
-        session.commit()
+                fila = {
+                    "id": uuid4(),
+                    "producto_id": producto_id,
+                    "competidor_id": self.competidor_id,
+                    "stock": stock_cantidad,
+                    "fecha_registro": self.timestamp_ahora,
+                    "origen_carga": ORIGEN_CARGA
+                }
+                self.filas_stock.append(fila)
+                self.nombres_por_fila[fila["id"]] = nombre_original
+
+        self.productos_recibidos += len(stock_data)
+        if len(self.filas_stock) >= self.tamano_lote:
+            self.escribir_lote()
+
+    def escribir_lote(self):
+        """Escribe y confirma las filas acumuladas. Los duplicados del día los
+        resuelve la base con ON CONFLICT según la política. Después del commit
+        encola los casos a revisar y avisa hasta qué producto quedó todo cargado."""
+        if self.filas_stock:
+            insertados, conflictos = upsert_stock_en_lotes(
+                self.session, self.filas_stock, self.politica_duplicados, self.tamano_lote, self.con_indice
+            )
+            self.registros_insertados += insertados
+            if self.politica_duplicados != "conservar_ambos":
+                self.registros_saltados += len(conflictos)
+            if self.politica_duplicados == "revisar":
+                self.pendientes_revision += [{
+                    "id": str(uuid4()), "tipo": "duplicado", "nombre": self.nombres_por_fila[f["id"]],
+                    "producto_id": str(f["producto_id"]), "stock": f["stock"],
+                    "fecha": self.timestamp_ahora.isoformat()
+                } for f in conflictos]
+            self.session.commit()
+            self.filas_stock = []
+            self.nombres_por_fila = {}
+
+        if self.pendientes_revision:
+            encolar_revision(self.pendientes_revision)
+            self.enviados_revision += len(self.pendientes_revision)
+            self.pendientes_revision = []
+        if self.al_confirmar: self.al_confirmar(self.productos_recibidos)
+
+    def finalizar(self):
+        self.escribir_lote()
         print(f"\n>> CARGA FINALIZADA:")
-        print(f"   - Stock insertado: {registros_insertados}")
-        print(f"   - Productos creados: {productos_creados}")
-        print(f"   - Omitidos: {registros_saltados}")
+        print(f"   - Stock insertado: {self.registros_insertados}")
+        print(f"   - Resueltos por nombre (sin alias): {self.resueltos_por_nombre}")
+        print(f"   - Productos creados: {self.productos_creados}")
+        print(f"   - Omitidos: {self.registros_saltados}")
+        if self.enviados_revision:
+            print(f"   - Enviados a revisión: {self.enviados_revision}")
+
+
+def abrir_sesion_db():
+    engine = create_engine(DB_URL)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    print(">> Conexión DB establecida.")
+    return session
+
+def guardar_en_base_datos(stock_data, politica=None, al_confirmar=None):
+    print(f"\n--- [FASE 2] Guardando en Base de Datos ---")
+    
+    session = None
+    
+    try:
+        session = abrir_sesion_db()
+        cargador = CargadorStock(session, politica, al_confirmar=al_confirmar)
+        cargador.procesar(stock_data)
+        cargador.finalizar()
 
     except Exception as e:
         if session: session.rollback()
@@ -330,19 +721,171 @@ def guardar_en_base_datos(stock_data):
     finally:
         if session: session.close()
 
+def lotes_de(iterable, tamano):
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote: return
+        yield lote
+
+class SalidaDiferida:
+    """Retiene lo que imprime el hilo de scraping y lo vuelca cuando lo pide el hilo
+    principal, para que no se mezcle con las preguntas (input) del modo interactivo."""
+
+    def __init__(self, destino, hilo):
+        self.destino = destino
+        self.hilo = hilo
+        self.pendiente = []
+        self.lock = threading.Lock()
+
+    def write(self, texto):
+        if threading.current_thread() is not self.hilo:
+            return self.destino.write(texto)
+        with self.lock:
+            self.pendiente.append(texto)
+        return len(texto)
+
+    def flush(self):
+        if threading.current_thread() is not self.hilo: self.destino.flush()
+
+    def volcar(self):
+        with self.lock:
+            texto = "".join(self.pendiente)
+            self.pendiente = []
+        if texto:
+            self.destino.write(texto)
+            self.destino.flush()
+
+    def __getattr__(self, nombre):
+        return getattr(self.destino, nombre)
+
+def scrapear_y_cargar(politica=None, reanudar_desde=None, max_paginas_en_cola=MAX_PAGINAS_EN_COLA):
+    """Pipeline productor/consumidor: un hilo scrapea y encola cada página en una
+    cola acotada mientras este hilo resuelve alias e inserta por lotes.
+    El scraping (y su backup) arranca antes de conectarse a la base: si la base
+    falla, las páginas se siguen consumiendo sin cargar y el backup queda completo
+    para reanudar la carga. Al reanudar, antes de las páginas nuevas se cargan los
+    productos del backup que la corrida anterior no llegó a confirmar.
+    Devuelve True si todo lo scrapeado quedó cargado en la base."""
+    print(f"\n--- [PIPELINE] Scraping y carga en paralelo ---")
+    cola = queue.Queue(maxsize=max_paginas_en_cola)
+    FIN = object()
+    errores_productor = []
+    ya_cargados = 0
+    if reanudar_desde:
+        recortar_backup(reanudar_desde)
+        ya_cargados = leer_productos_cargados()
+
+    # Las preguntas van antes de arrancar el scraping; las de productos nuevos
+    # (durante la carga) quedan separadas reteniendo la salida del productor.
+    politica_duplicados = pedir_politica_duplicados() if politica is None else None
+
+    def productor():
+        try:
+            obtener_datos_scraping(reanudar_desde=reanudar_desde, en_pagina=cola.put)
+        except Exception as e:
+            errores_productor.append(e)
+        finally:
+            cola.put(FIN)
+
+    hilo = threading.Thread(target=productor, name="scraping-stock", daemon=True)
+    scrapear = not (reanudar_desde and reanudar_desde.get("completo"))
+    salida = None
+    if politica is None and scrapear:
+        salida = SalidaDiferida(sys.stdout, hilo)
+        sys.stdout = salida
+    volcar = salida.volcar if salida else (lambda: None)
+
+    session = None
+    cargador = None
+    try:
+        if scrapear: hilo.start()
+        else: print(">> El scraping ya estaba completo: no se vuelve a scrapear.")
+        inicio = time.perf_counter()
+
+        try:
+            session = abrir_sesion_db()
+            # El backup y la cola siguen el mismo orden: lo confirmado es un prefijo del backup
+            cargador = CargadorStock(session, politica, politica_duplicados=politica_duplicados,
+                                     al_confirmar=lambda n: guardar_productos_cargados(ya_cargados + n))
+            if reanudar_desde:
+                # Solo lo que ya estaba en el backup: lo que agregue el productor llega por la cola
+                en_backup = reanudar_desde.get("productos")
+                pendientes = islice(iterar_backup(desde=ya_cargados),
+                                    None if en_backup is None else max(en_backup - ya_cargados, 0))
+                cantidad = 0
+                for lote in lotes_de(pendientes, TAMANO_LOTE_STOCK):
+                    cargador.procesar(lote)
+                    cantidad += len(lote)
+                    volcar()
+                print(f">> Reanudación: {cantidad} productos del backup sin confirmar, cargados ({ya_cargados} ya estaban).")
+        except Exception as e:
+            if session: session.rollback()
+            print(f"[ERROR CRÍTICO DB] {e}")
+            cargador = None
+
+        while scrapear:
+            try:
+                pagina = cola.get(timeout=1)
+            except queue.Empty:
+                volcar()
+                continue
+            volcar()
+            if pagina is FIN: break
+            if cargador is None: continue
+            try:
+                cargador.procesar(pagina)
+            except Exception as e:
+                session.rollback()
+                print(f"[ERROR CRÍTICO DB] {e}")
+                print(">> Se sigue scrapeando sin cargar: el backup queda para reanudar la carga.")
+                cargador = None
+
+        if cargador:
+            try:
+                cargador.finalizar()
+                print(f">> Pipeline completo en {time.perf_counter() - inicio:.1f}s")
+            except Exception as e:
+                session.rollback()
+                print(f"[ERROR CRÍTICO DB] {e}")
+                cargador = None
+        if errores_productor:
+            print(f"[ERROR CRÍTICO SCRAPING] {errores_productor[0]}")
+        return cargador is not None and not errores_productor
+    finally:
+        if salida:
+            sys.stdout = salida.destino
+            salida.volcar()
+        if session: session.close()
+
 # ==============================================================================
 # 3. EJECUCIÓN PRINCIPAL
 # ==============================================================================
 
+def backup_incompleto():
+    """Devuelve el cursor si el último scraping quedó cortado a mitad de camino o si
+    terminó pero la carga en la base no llegó a confirmar todo el backup."""
+    cursor = leer_cursor()
+    if not cursor or not os.path.exists(PATH_BACKUP_NDJSON): return None
+    if not cursor.get("completo"): return cursor
+    if "productos" in cursor and leer_productos_cargados() < cursor["productos"]: return cursor
+    return None
+
 def menu_principal():
-    existe_backup = os.path.exists(PATH_BACKUP_JSON)
+    existe_backup = os.path.exists(PATH_BACKUP_NDJSON)
+    cursor = backup_incompleto()
     print("\n" + "="*40)
     print("       PANEL DE CONTROL DE STOCK")
     print("="*40)
     print("1. [NUEVO] Iniciar Scraping desde cero")
     if existe_backup:
-        fecha_mod = datetime.fromtimestamp(os.path.getmtime(PATH_BACKUP_JSON))
-        print(f"2. [BACKUP] Usar archivo guardado ({fecha_mod.strftime('%d/%m/%Y %H:%M:%S')})")
+        fecha_mod = datetime.fromtimestamp(os.path.getmtime(PATH_BACKUP_NDJSON))
+        estado = ""
+        if cursor and cursor.get("completo"):
+            estado = f" - CARGA INCOMPLETA: {leer_productos_cargados()} de {cursor['productos']} productos en la base"
+        elif cursor:
+            estado = f" - INCOMPLETO: marca {cursor['marca']}, pág {cursor['pagina']}"
+        print(f"2. [BACKUP] Usar archivo guardado ({fecha_mod.strftime('%d/%m/%Y %H:%M:%S')}){estado}")
     else:
         print("2. [BACKUP] (No disponible)")
     print("3. Salir")
@@ -351,42 +894,88 @@ def menu_principal():
     while True:
         opcion = input(">> Seleccione una opción: ").strip()
         if opcion == "1": return "scrap"
-        elif opcion == "2" and existe_backup: return "backup"
+        elif opcion == "2" and existe_backup:
+            if not cursor: return "backup"
+            if cursor.get("completo"):
+                print(f"\n[?] El scraping terminó pero la carga en la base quedó cortada.")
+                print("1. Reanudar: cargar solo lo que falta")
+            else:
+                print(f"\n[?] El backup quedó cortado en marca {cursor['marca']}, página {cursor['pagina']}.")
+                print("1. Reanudar: cargar lo que falta y seguir scrapeando desde ahí")
+            print("2. Usar el backup tal como está")
+            while True:
+                sub = input(">> Seleccione una opción: ").strip()
+                if sub == "1": return "reanudar"
+                elif sub == "2": return "backup"
+                else: print("Opción inválida.")
         elif opcion == "3": return "salir"
         else: print("Opción inválida.")
 
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Scraping y carga de stock de competencia")
+    parser.add_argument("--batch", action="store_true",
+                        help="Modo desatendido: sin menú ni preguntas, según la política de carga")
+    parser.add_argument("--politica", default=PATH_POLITICA,
+                        help="Archivo JSON con la política del modo desatendido")
+    parser.add_argument("--backup", action="store_true",
+                        help="En modo desatendido, cargar desde el backup (reanudándolo si quedó incompleto)")
+    parser.add_argument("--migrar", action="store_true",
+                        help="Crear el índice único de stock_competencia (una sola vez, fuera del horario de carga) y salir")
+    return parser.parse_args()
+
 def main():
-    accion = menu_principal()
+    args = parsear_argumentos()
+    politica = None
     datos = []
 
+    if args.migrar:
+        session = abrir_sesion_db()
+        try:
+            ok = migrar_indice_unico(session)
+        finally:
+            session.close()
+        sys.exit(0 if ok else 1)
+
+    if args.batch:
+        try:
+            politica = cargar_politica(args.politica)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+        accion = "scrap"
+        if args.backup and os.path.exists(PATH_BACKUP_NDJSON):
+            accion = "reanudar" if backup_incompleto() else "backup"
+    else:
+        accion = menu_principal()
+
     if accion == "salir": return
 
-    elif accion == "scrap":
-        datos = obtener_datos_scraping()
-        if datos:
-            try:
-                os.makedirs(os.path.dirname(PATH_BACKUP_JSON), exist_ok=True)
-                with open(PATH_BACKUP_JSON, "w", encoding="utf-8") as f:
-                    json.dump(datos, f, indent=2, ensure_ascii=False)
-                print(f"-> Backup actualizado: {PATH_BACKUP_JSON}")
-            except Exception as e:
-                print(f"[WARN] Error guardando backup: {e}")
-        else:
-            print("[FIN] Sin datos.")
+    elif accion in ("scrap", "reanudar"):
+        # Al reanudar se cargan los productos del backup posteriores al último commit de
+        # la corrida interrumpida y después las páginas nuevas (la opción [BACKUP] recarga todo).
+        reanudar_desde = backup_incompleto() if accion == "reanudar" else None
+        ok = scrapear_y_cargar(politica=politica, reanudar_desde=reanudar_desde)
+        if ok and not backup_incompleto():
+            print(f"-> Backup actualizado: {PATH_BACKUP_NDJSON}")
             return
+        print(f"[WARN] Carga incompleta. El backup {PATH_BACKUP_NDJSON} queda pendiente: "
+              f"reanudar con la opción 2 del menú (o --batch --backup).")
+        if args.batch: sys.exit(1)
+        return
 
     elif accion == "backup":
-        print(f"-> Cargando backup: {PATH_BACKUP_JSON}")
+        print(f"-> Cargando backup: {PATH_BACKUP_NDJSON}")
         try:
-            with open(PATH_BACKUP_JSON, 'r', encoding='utf-8') as f:
-                datos = json.load(f)
+            cursor = leer_cursor()
+            if cursor: recortar_backup(cursor)
+            datos = leer_backup()
             print(f"-> {len(datos)} productos cargados.")
         except Exception as e:
             print(f"[ERROR] Error leyendo backup: {e}")
             return
 
     if datos:
-        guardar_en_base_datos(datos)
+        guardar_en_base_datos(datos, politica=politica, al_confirmar=guardar_productos_cargados)
     else:
         print("[INFO] No hay datos para procesar.")
 
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Vecinos más cercanos por coseno sobre la matriz TF-IDF de productos.
+
+Reemplaza a NearestNeighbors(metric='cosine'), que con matrices dispersas
+hace fuerza bruta y en cada kneighbors vuelve a normalizar (copiar) la
+matriz de productos completa. Acá la matriz se normaliza y transpone una
+sola vez; cada consulta es un producto disperso (consultas x productos)
+por bloques de tamaño acotado, con argpartition para el top-k y los
+bloques repartidos entre hilos.
+
+Mismo resultado que sklearn: las distancias son 1 - coseno recortadas a
+[0, 2]. Ante empates se elige el producto de menor posición.
+
+Verificación contra NearestNeighbors en tests/test_similitud.py; tiempos
+con python tests/bench_matching.py.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+# Memoria máxima por bloque de consultas (matriz de similitudes densa + producto disperso)
+MEMORIA_BLOQUE = 64 * 1024 * 1024
+# Bytes por celda del bloque: 8 de la matriz densa + ~12 del resultado disperso previo
+BYTES_POR_CELDA = 20
+
+
+class MotorSimilitud:
+    def __init__(self, matriz, hilos: int = None, transpuesta=None):
+        """Con `transpuesta` (índice persistido) la matriz ya viene normalizada y
+        ninguna de las dos se copia: pueden ser arrays abiertos con mmap."""
+        self.n_productos = matriz.shape[0]
+        self.normalizada = matriz if transpuesta is not None else normalize(matriz)
+        self.transpuesta = transpuesta if transpuesta is not None else self.normalizada.T.tocsr()  # features x productos
+        self.hilos = hilos or os.cpu_count() or 1
+        self.posiciones = None
+
+    def subconjunto(self, posiciones) -> "MotorSimilitud":
+        """Motor solo con esas filas de la matriz; sus índices se devuelven como
+        posiciones de la matriz original."""
+        sub = MotorSimilitud(self.normalizada[posiciones], self.hilos)
+        sub.posiciones = np.asarray(posiciones) if self.posiciones is None else self.posiciones[posiciones]
+        return sub
+
+    @staticmethod
+    def _top_k(similitudes, k, permitidos=None):
+        if permitidos is not None:
+            similitudes = np.where(permitidos, similitudes, -np.inf)
+        if k == 1:
+            indices = similitudes.argmax(axis=1)[:, None]
+        else:
+            if k < similitudes.shape[1]:
+                candidatos = np.argpartition(-similitudes, k - 1, axis=1)[:, :k]
+            else:
+                candidatos = np.broadcast_to(np.arange(similitudes.shape[1]), similitudes.shape)
+            valores = np.take_along_axis(similitudes, candidatos, axis=1)
+            orden = np.lexsort((candidatos, -valores), axis=-1)
+            indices = np.take_along_axis(candidatos, orden, axis=1)
+        with np.errstate(invalid='ignore'):
+            distancias = 1 - np.take_along_axis(similitudes, indices, axis=1)
+        return np.clip(distancias, 0, 2), indices
+
+    def kneighbors(self, consultas, n_neighbors: int = 5, memoria_bloque: int = MEMORIA_BLOQUE, permitidos=None):
+        """(distancias, indices) de los n_neighbors productos más parecidos a cada
+        fila de consultas, de menor a mayor distancia (misma forma que sklearn).
+        permitidos (bool, consultas x productos) descarta pares: quedan a distancia 2."""
+        n_productos = self.n_productos
+        k = min(n_neighbors, n_productos)
+        consultas = normalize(consultas)
+        n = consultas.shape[0]
+        if n == 0 or k == 0:
+            return np.empty((n, k)), np.empty((n, k), dtype=int)
+
+        # Con varios hilos cada uno tiene su bloque en memoria a la vez
+        filas_bloque = max(1, memoria_bloque // (BYTES_POR_CELDA * n_productos * self.hilos))
+        inicios = range(0, n, filas_bloque)
+
+        def tarea(inicio):
+            fin = inicio + filas_bloque
+            similitudes = (consultas[inicio:fin] @ self.transpuesta).toarray()
+            return self._top_k(similitudes, k, None if permitidos is None else permitidos[inicio:fin])
+
+        if len(inicios) == 1 or self.hilos == 1:
+            partes = [tarea(inicio) for inicio in inicios]
+        else:
+            with ThreadPoolExecutor(max_workers=self.hilos) as pool:
+                partes = list(pool.map(tarea, inicios))
+        distancias, indices = np.vstack([d for d, _ in partes]), np.vstack([i for _, i in partes])
+        return distancias, (indices if self.posiciones is None else self.posiciones[indices])
@@ -251,6 +251,8 @@ const ScraperModule = {
 const DiccionarioModule = {
     currentPage: 1,
     perPage: 50,
+    cursors: {},  // página -> cursor de keyset (las que ya se recorrieron)
+    revisionATraducir: null,  // caso de la cola de revisión abierto en el modal de alta
     searchTimeout: null,
 
     init() {
@@ -267,12 +269,14 @@ const DiccionarioModule = {
             clearTimeout(this.searchTimeout);
             this.searchTimeout = setTimeout(() => {
                 this.currentPage = 1;
+                this.cursors = {};
                 this.loadTraducciones();
             }, 500);
         });
 
         filterSelect.addEventListener('change', () => {
             this.currentPage = 1;
+            this.cursors = {};
             this.loadTraducciones();
         });
 
@@ -330,11 +334,15 @@ const DiccionarioModule = {
         const filtro = document.getElementById('filterSelect').value;
 
         try {
-            const url = `/diccionario/list?page=${this.currentPage}&per_page=${this.perPage}&filtro=${filtro}&search=${encodeURIComponent(search)}`;
+            let url = `/diccionario/list?page=${this.currentPage}&per_page=${this.perPage}&filtro=${filtro}&search=${encodeURIComponent(search)}`;
+            // Páginas ya alcanzadas van por cursor; los saltos lejanos, por page
+            const cursor = this.cursors[this.currentPage];
+            if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
             const response = await fetch(url);
             const result = await response.json();
 
             if (result.ok) {
+                if (result.data.next_cursor) this.cursors[this.currentPage + 1] = result.data.next_cursor;
                 this.renderTable(result.data.items);
                 this.renderPagination(result.data);
             }
@@ -422,6 +430,7 @@ const DiccionarioModule = {
 
     // CRUD Operations
     showAddModal() {
+        this.revisionATraducir = null;
         document.getElementById('modalAdd').classList.add('show');
         document.getElementById('inputNombrePanacea').value = '';
         document.getElementById('inputProducto').value = '';
@@ -461,7 +470,13 @@ const DiccionarioModule = {
 
             if (result.ok) {
                 Utils.showToast(`Traducción ${result.data.accion}`, 'success');
+                if (this.revisionATraducir) {
+                    await this.aplicarRevision(this.revisionATraducir, productoId);
+                    this.revisionATraducir = null;
+                }
                 this.closeModals();
+                // Las filas cambiaron: los cursores guardados ya no apuntan a las mismas páginas
+                this.cursors = {};
                 this.loadTraducciones();
                 this.loadStats();
             } else {
@@ -486,6 +501,7 @@ const DiccionarioModule = {
 
             if (result.ok) {
                 Utils.showToast('Traducción eliminada', 'success');
+                this.cursors = {};
                 this.loadTraducciones();
                 this.loadStats();
             } else {
@@ -591,6 +607,7 @@ const DiccionarioModule = {
                     `Matching completado: ${data.insertados} insertados, ${data.rechazados} rechazados`,
                     'success'
                 );
+                this.cursors = {};
                 this.loadTraducciones();
                 this.loadStats();
             } else {
@@ -601,6 +618,101 @@ const DiccionarioModule = {
         }
     },
 
+    // Revisión de carga de stock
+    async showRevisionModal() {
+        document.getElementById('modalRevision').classList.add('show');
+        await this.loadRevision();
+    },
+
+    async loadRevision() {
+        const tbody = document.getElementById('revisionBody');
+
+        try {
+            const response = await fetch('/stock/revision');
+            const result = await response.json();
+
+            if (!result.ok) {
+                Utils.showToast('Error: ' + result.msg, 'error');
+                return;
+            }
+
+            if (result.data.length === 0) {
+                tbody.innerHTML = '<tr><td colspan="5" class="loading">No hay casos pendientes</td></tr>';
+                return;
+            }
+
+            tbody.innerHTML = result.data.map(item => `
+                <tr>
+                    <td><span class="badge ${item.tipo === 'duplicado' ? 'badge-media' : 'badge-baja'}">${item.tipo}</span></td>
+                    <td><strong>${item.nombre}</strong></td>
+                    <td>${item.stock}</td>
+                    <td>${Utils.formatDate(item.fecha)}</td>
+                    <td>
+                        <div class="action-btns">
+                            ${item.tipo === 'desconocido' ? `
+                            <button class="btn-icon" onclick="DiccionarioModule.traducirRevision('${item.id}', '${item.nombre.replace(/'/g, "\\'")}')" title="Traducir">
+                                ✏️
+                            </button>` : ''}
+                            ${item.tipo === 'duplicado' ? `
+                            <button class="btn-icon" onclick="DiccionarioModule.aplicarRevision('${item.id}')" title="Aplicar: cargar este stock en lugar del registrado">
+                                ⬆️
+                            </button>` : ''}
+                            <button class="btn-icon" onclick="DiccionarioModule.resolverRevision('${item.id}')" title="Descartar: el stock del caso no se carga">
+                                🗑️
+                            </button>
+                        </div>
+                    </td>
+                </tr>
+            `).join('');
+        } catch (error) {
+            Utils.showToast('Error al cargar revisión', 'error');
+        }
+    },
+
+    traducirRevision(id, nombre) {
+        document.getElementById('modalRevision').classList.remove('show');
+        this.showAddModal();
+        // El caso se carga y se quita de la cola recién cuando se guarda la traducción
+        this.revisionATraducir = id;
+        document.getElementById('inputNombrePanacea').value = nombre;
+        this.loadSugerencias(nombre);
+    },
+
+    async aplicarRevision(id, productoId = null) {
+        try {
+            const response = await fetch(`/stock/revision/${id}/aplicar`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ producto_id: productoId })
+            });
+            const result = await response.json();
+
+            if (result.ok) {
+                Utils.showToast(result.msg, 'success');
+                this.loadRevision();
+            } else {
+                Utils.showToast('Error: ' + result.msg, 'error');
+            }
+        } catch (error) {
+            Utils.showToast('Error al aplicar caso', 'error');
+        }
+    },
+
+    async resolverRevision(id) {
+        try {
+            const response = await fetch(`/stock/revision/${id}`, { method: 'DELETE' });
+            const result = await response.json();
+
+            if (result.ok) {
+                this.loadRevision();
+            } else {
+                Utils.showToast('Error: ' + result.msg, 'error');
+            }
+        } catch (error) {
+            Utils.showToast('Error al resolver caso', 'error');
+        }
+    },
+
     // Importar/Exportar
     exportar() {
         window.location.href = '/diccionario/export';
@@ -640,6 +752,7 @@ const DiccionarioModule = {
                     `Importación completada: ${data.insertados} insertados, ${data.existentes} ya existían`,
                     'success'
                 );
+                this.cursors = {};
                 this.loadTraducciones();
                 this.loadStats();
             } else {
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Tiempos del matching sobre productos.csv contra las versiones originales de
+tests/test_*.py (la equivalencia la verifican esos tests):
+    python tests/bench_matching.py [nombre ...]   (ver BENCHMARKS)
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalogo import leer_catalogo, nombres_catalogo
+
+
+def benchmark_normalizacion(repeticiones=20):
+    from normalizacion import normalizar_texto
+    from test_normalizacion import normalizar_texto_original, casos_borde
+
+    casos = casos_borde()
+    for fila in leer_catalogo():
+        casos += [fila.get("PRODUCTO") or "", fila.get("DESCRIPCION ADICIONAL") or ""]
+
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        for c in casos: normalizar_texto_original(c)
+    t_original = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        for c in casos: normalizar_texto.__wrapped__(c)
+    t_compilado = time.perf_counter() - t0
+
+    normalizar_texto.cache_clear()
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        for c in casos: normalizar_texto(c)
+    t_memo = time.perf_counter() - t0
+
+    print(f"[BENCH] {len(casos) * repeticiones} normalizaciones | original: {t_original:.2f}s | compilado: {t_compilado:.2f}s "
+          f"(x{t_original / t_compilado:.1f}) | compilado + LRU: {t_memo:.2f}s (x{t_original / t_memo:.1f})")
+
+
+def benchmark_similitud():
+    from sklearn.neighbors import NearestNeighbors
+    from similitud import MotorSimilitud
+    from test_similitud import armar_caso
+
+    matriz, consultas = armar_caso(nombres_catalogo())
+    t0 = time.perf_counter()
+    nn = NearestNeighbors(n_neighbors=5, metric='cosine', n_jobs=-1).fit(matriz)
+    t_fit_sk = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    motor = MotorSimilitud(matriz)
+    t_fit = time.perf_counter() - t0
+    print(f"[BENCH] {matriz.shape[0]} productos | preparación: {t_fit * 1000:.0f}ms (sklearn fit: {t_fit_sk * 1000:.0f}ms)")
+
+    for n, k, repeticiones in [(1, 5, 100), (100, 5, 3), (consultas.shape[0], 1, 1)]:
+        lote = consultas[:n]
+        t0 = time.perf_counter()
+        for _ in range(repeticiones): nn.kneighbors(lote, n_neighbors=k)
+        t_sk = (time.perf_counter() - t0) / repeticiones
+        t0 = time.perf_counter()
+        for _ in range(repeticiones): motor.kneighbors(lote, k)
+        t_motor = (time.perf_counter() - t0) / repeticiones
+        print(f"[BENCH] {n} consultas, k={k} | NearestNeighbors: {t_sk * 1000:.1f}ms | "
+              f"motor: {t_motor * 1000:.1f}ms (x{t_sk / t_motor:.1f}, {motor.hilos} hilos)")
+
+
+def benchmark_autocompletado(repeticiones=200):
+    from autocompletado import IndiceAutocompletado, clave_busqueda
+    from test_autocompletado import armar_caso
+
+    ids, nombres, consultas = armar_caso(nombres_catalogo())
+    t0 = time.perf_counter()
+    indice = IndiceAutocompletado(ids, nombres)
+    t_armado = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    indice.con_cambios(ids[:500:5], [f"RENOMBRADO {i}" for i in range(100)], ids[1000:1200])
+    t_cambios = time.perf_counter() - t0
+
+    consultas = [q for q in consultas if len(clave_busqueda(q)) >= 2]
+    tiempos = []
+    for q in consultas:
+        t0 = time.perf_counter()
+        for _ in range(repeticiones): indice.buscar(q, 10)
+        tiempos.append((time.perf_counter() - t0) / repeticiones)
+    tiempos.sort()
+    claves = [clave_busqueda(n) for n in nombres]
+    t0 = time.perf_counter()
+    for q in consultas:
+        q = clave_busqueda(q)
+        [c for c in claves if q in c]
+    t_lineal = (time.perf_counter() - t0) / len(consultas)
+
+    print(f"[BENCH] {len(nombres)} productos | armado: {t_armado * 1000:.0f}ms | cambios: {t_cambios * 1000:.1f}ms | "
+          f"búsqueda p50: {tiempos[len(tiempos) // 2] * 1e6:.0f}µs, p95: {tiempos[int(len(tiempos) * 0.95)] * 1e6:.0f}µs "
+          f"(recorrido lineal sin ordenar: {t_lineal * 1e6:.0f}µs)")
+
+
+def benchmark_bloqueo(umbral=80.0):
+    from normalizacion import normalizar_texto
+    from test_bloqueo import armar_caso, contar
+
+    productos, n_dentro, consultas, indice = armar_caso(leer_catalogo())
+    t0 = time.perf_counter()
+    indice.bloques
+    t_bloques = time.perf_counter() - t0
+    indice.fragmentos_dosis
+    limpias = [normalizar_texto(c) for c, _, _ in consultas]
+
+    for bloqueo in (False, True):
+        t0 = time.perf_counter()
+        posiciones, confianzas = indice.mejor_match(limpias, bloqueo=bloqueo)
+        t = time.perf_counter() - t0
+        aciertos, falsos, otro_lab = contar(productos, n_dentro, consultas, posiciones, confianzas, umbral)
+        print(f"[{'BLOQUEO' if bloqueo else 'COMPLETO'}] {len(limpias)} nombres vs {len(productos)} productos: "
+              f"{t:.2f}s | con confianza >= {umbral:.0f}: {aciertos} aciertos, {falsos} falsos positivos "
+              f"({otro_lab} de otro laboratorio)")
+    print(f"[INFO] Bloques armados en {t_bloques * 1000:.0f}ms | "
+          f"{len(indice.bloques.laboratorios)} palabras de laboratorio en el vocabulario")
+
+
+BENCHMARKS = {
+    "normalizacion": benchmark_normalizacion,
+    "similitud": benchmark_similitud,
+    "autocompletado": benchmark_autocompletado,
+    "bloqueo": benchmark_bloqueo,
+}
+
+if __name__ == "__main__":
+    if not leer_catalogo():
+        sys.exit("[ERROR] Falta productos.csv")
+    for nombre in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[nombre]()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de post-scrp1.py contra las implementaciones originales
+(tests/referencia_post_scrp1.py), sobre catálogos sintéticos:
+    python tests/bench_post_scrp1.py [n]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import referencia_post_scrp1 as ref
+
+ps = ref.post_scrp1
+
+
+def benchmark_precios(n=100_000):
+    productos = ref.productos_sinteticos(n)
+    print(f"[BENCH] {n} productos sintéticos")
+
+    t0 = time.perf_counter()
+    esperado = ref.construir_dataframe_escalar(productos)
+    t_escalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    df = ps.construir_dataframe(productos)
+    t_vector = time.perf_counter() - t0
+
+    for c in esperado.columns:
+        if pd.api.types.is_float_dtype(esperado[c]):
+            assert np.allclose(df[c], esperado[c]), c
+        else:
+            assert list(df[c]) == list(esperado[c]), c
+    print(f"[BENCH] Por producto: {t_escalar:.2f}s | Vectorizado: {t_vector:.2f}s | x{t_escalar / t_vector:.1f}")
+
+
+def benchmark_duplicados(n=100_000):
+    productos = ref.productos_sinteticos(n)
+    df = ps.construir_dataframe(productos)
+    mapping = ref.diccionario_sintetico(productos)
+    csv = lambda d: d.to_csv(index=False, sep=';', decimal=',')
+
+    t0 = time.perf_counter()
+    esperado_simple, esperado_errores = ref.resolver_duplicados_iterativo(df, mapping)
+    t_iter = time.perf_counter() - t0
+
+    salida = sys.stdout
+    sys.stdout = open(os.devnull, "w", encoding="utf-8")
+    try:
+        t0 = time.perf_counter()
+        df_simple, df_errores = ps.resolver_duplicados(df, mapping)
+        t_vector = time.perf_counter() - t0
+    finally:
+        sys.stdout.close()
+        sys.stdout = salida
+
+    assert csv(df_simple.sort_values("producto_id")) == csv(esperado_simple.sort_values("producto_id"))
+    assert csv(df_errores) == csv(esperado_errores)
+    print(f"[BENCH] Duplicados ({len(df_simple)} IDs, {len(df_errores)} errores) | "
+          f"iterrows: {t_iter:.2f}s | groupby: {t_vector:.2f}s (reporte a devnull) | x{t_iter / t_vector:.1f}")
+
+
+def benchmark_html(n=100_000):
+    rnd = random.Random(3)
+    distintos = [ref.html_sintetico(rnd, i) for i in range(max(1, n * 4 // 5))]
+    productos = [{"descripcion_larga": rnd.choice(distintos) if rnd.random() < 0.2 else distintos[i % len(distintos)]}
+                 for i in range(n)]
+    productos += [{"descripcion_larga": ""}, {"descripcion_larga": None}, {}]
+
+    t0 = time.perf_counter()
+    esperado = [ref.extraer_info_html_regex(p.get("descripcion_larga", "")) for p in productos]
+    t_regex = time.perf_counter() - t0
+
+    path_cache = Path(tempfile.mkdtemp()) / "cache_info_html.json"
+    try:
+        t0 = time.perf_counter()
+        frio = ps.extraer_info_productos(productos, path_cache)
+        t_frio = time.perf_counter() - t0
+        # Segunda corrida con un 5% de descripciones modificadas
+        for p in productos[: n // 20]:
+            p["descripcion_larga"] = ref.html_sintetico(rnd, rnd.randint(0, n))
+        esperado_tibio = [ref.extraer_info_html_regex(p.get("descripcion_larga", "")) for p in productos]
+        t0 = time.perf_counter()
+        tibio = ps.extraer_info_productos(productos, path_cache)
+        t_tibio = time.perf_counter() - t0
+    finally:
+        path_cache.unlink(missing_ok=True)
+
+    assert frio == esperado and tibio == esperado_tibio
+    print(f"[BENCH] HTML ({n} descripciones) | re.search x5: {t_regex:.2f}s | "
+          f"una pasada + caché fría: {t_frio:.2f}s | caché con 5% cambios: {t_tibio:.2f}s")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    benchmark_precios(n)
+    benchmark_duplicados(n)
+    benchmark_html(n)
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""Catálogo real (productos.csv) compartido por los tests y los benchmarks."""
+import csv
+from functools import lru_cache
+from pathlib import Path
+
+PATH_PRODUCTOS_CSV = Path(__file__).resolve().parent.parent / "productos.csv"
+
+
+@lru_cache(maxsize=1)
+def leer_catalogo():
+    """Filas de productos.csv (vacío si no está). No modificar: se comparte."""
+    if not PATH_PRODUCTOS_CSV.exists(): return ()
+    with open(PATH_PRODUCTOS_CSV, encoding="utf-8", errors="replace") as f:
+        return tuple(csv.DictReader(f))
+
+
+def nombres_catalogo():
+    return [fila.get("PRODUCTO") or "" for fila in leer_catalogo()]
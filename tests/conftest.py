@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path: sys.path.insert(0, str(RAIZ))
+
+from catalogo import leer_catalogo
+
+
+@pytest.fixture(scope="session")
+def catalogo():
+    """Filas de productos.csv"""
+    filas = leer_catalogo()
+    if not filas: pytest.skip("Falta productos.csv")
+    return filas
+
+
+@pytest.fixture(scope="session")
+def post_scrp1():
+    import referencia_post_scrp1
+    return referencia_post_scrp1.post_scrp1
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Referencias para verificar post-scrp1.py: las implementaciones originales
+(producto por producto, iterrows y un re.search por campo) y generadores de
+catálogos sintéticos con los formatos del JSON real.
+
+Las usan tests/test_post_scrp1.py (equivalencia) y tests/bench_post_scrp1.py
+(benchmark); no forman parte del reporte.
+"""
+import re
+import sys
+import random
+import importlib.util
+from pathlib import Path
+from collections import defaultdict
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path: sys.path.insert(0, str(RAIZ))
+
+# post-scrp1.py no es importable por nombre (tiene un guion)
+_spec = importlib.util.spec_from_file_location("post_scrp1", RAIZ / "post-scrp1.py")
+post_scrp1 = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(post_scrp1)
+clean_float = post_scrp1.clean_float
+
+
+def extraer_info_html_regex(html_raw):
+    """Extracción original (un re.search por campo)"""
+    if not html_raw or not isinstance(html_raw, str):
+        return {}
+    
+    data = {}
+    patterns = {
+        "Proveedor": r"Proveedor:.*?><strong>(.*?)</strong>",
+        "Acción": r"Acción Farmacológica:.*?><strong>(.*?)</strong>",
+        "Especie": r"Especie:.*?><strong>(.*?)</strong>",
+        "Presentación": r"Presentación:.*?><strong>(.*?)</strong>",
+        "Laboratorio": r"Laboratorio:.*?><strong>(.*?)</strong>"
+    }
+
+    for key, pattern in patterns.items():
+        match = re.search(pattern, html_raw, re.IGNORECASE | re.DOTALL)
+        if match:
+            clean_text = match.group(1).replace("&nbsp;", " ").strip()
+            data[key] = clean_text
+            
+    return data
+
+
+def construir_dataframe_escalar(productos):
+    """Armado original producto por producto"""
+    rows = []
+    for p in productos:
+        info_extra = extraer_info_html_regex(p.get("descripcion_larga", ""))
+        precio_base = clean_float(p.get("precio_base", 0))
+        desc_esp = clean_float(p.get("descuento_especial", 0))
+        if desc_esp > 1: desc_esp = desc_esp / 100.0
+        bonif = clean_float(p.get("bonificacion", 0))
+        if bonif > 1: bonif = bonif / 100.0
+        desc_fin = clean_float(p.get("descuento_financiero", 0))
+        if desc_fin > 1: desc_fin = desc_fin / 100.0
+        mejor_precio_neto = clean_float(p.get("mejor_precio", 0))
+        precio_calc = precio_base * (1 - bonif) * (1 - desc_esp) * (1 - desc_fin)
+        precio_final_neto = mejor_precio_neto if mejor_precio_neto > 0 else precio_calc
+        stock_actual = clean_float(p.get("stock", 0))
+        stock_min = clean_float(p.get("stock_minimo", 0))
+        vencimiento = p.get("fecha_vencimiento", "")
+        if "0000" in str(vencimiento): vencimiento = ""
+        rows.append({
+            "ID": p.get("id_producto", ""),
+            "Código": p.get("codigo", ""),
+            "Descripción": p.get("descripcion", ""),
+            "Tipo": p.get("producto_tipo", ""),
+            "Proveedor/Lab": info_extra.get("Proveedor") or info_extra.get("Laboratorio") or p.get("producto_marca", ""),
+            "Acción Farmacológica": info_extra.get("Acción", ""),
+            "Especie": info_extra.get("Especie", ""),
+            "Presentación": info_extra.get("Presentación", ""),
+            "Vencimiento": vencimiento,
+            "Stock Actual": int(stock_actual),
+            "Stock Mínimo": int(stock_min),
+            "Estado Stock": "CRÍTICO" if stock_actual <= stock_min else "OK",
+            "Días s/Stock": p.get("stock_dias_sin_stock", "0"),
+            "Cant. Min. Compra": int(clean_float(p.get("cantidad_desde_optima", 1))),
+            "Precio Lista": precio_base,
+            "Bonif. %": bonif,
+            "Desc. Esp. %": desc_esp,
+            "Desc. Fin. %": desc_fin,
+            "NETO (Unitario)": precio_final_neto,
+            "FINAL c/IVA (Estimado)": precio_final_neto * 1.21
+        })
+    return pd.DataFrame(rows)
+
+
+def resolver_duplicados_iterativo(df, mapping):
+    """Resolución original fila por fila"""
+    # Estructuras para gestionar duplicados
+    productos_por_id = defaultdict(list)
+    errores = []
+
+    # Primera pasada: recopilar todos los productos por ID
+    for _, row in df.iterrows():
+        nombre_origen = row["Descripción"]
+
+        if nombre_origen in mapping:
+            info_map = mapping[nombre_origen]
+            mi_id = info_map.get("mi_id")
+            mi_nombre = info_map.get("mi_nombre", nombre_origen)
+            match_score = info_map.get("match_score", 0)
+            estado = info_map.get("estado", "DESCONOCIDO")
+            precio_neto = row["NETO (Unitario)"]
+
+            # Factor de conversión (ajusta según tu necesidad)
+            # Si este factor es correcto, déjalo; si no, cámbialo
+            precio_final = precio_neto / 0.779 if precio_neto > 0 else 0
+
+            if mi_id is not None and mi_id > 0:
+                productos_por_id[mi_id].append({
+                    "nombre_panacea": nombre_origen,
+                    "nombre_final": mi_nombre,
+                    "precio": precio_final,
+                    "precio_neto": precio_neto,
+                    "match_score": match_score,
+                    "estado": estado,
+                    "stock": row["Stock Actual"],
+                    "codigo": row["Código"]
+                })
+        else:
+            errores.append({
+                "nombre_panacea": nombre_origen,
+                "precio_neto": row["NETO (Unitario)"],
+                "stock": row["Stock Actual"],
+                "error": "Sin mapeo en diccionario"
+            })
+
+    # Segunda pasada: resolver duplicados con estrategia inteligente
+    rows_mapped = []
+
+    for mi_id, productos in productos_por_id.items():
+        if len(productos) == 1:
+            # Caso simple: un solo producto para este ID
+            p = productos[0]
+            rows_mapped.append({
+                "producto_id": mi_id,
+                "nombre": p['nombre_final'],
+                "precio": p['precio']
+            })
+        else:
+            # DUPLICADOS: aplicar estrategia de resolución
+            # Filtrar por calidad de match
+            buenos_matches = [p for p in productos if p['match_score'] >= 70]
+
+            if not buenos_matches:
+                # Si ninguno es bueno, tomar el mejor disponible
+                mejor = max(productos, key=lambda x: x['match_score'])
+
+                rows_mapped.append({
+                    "producto_id": mi_id,
+                    "nombre": mejor['nombre_final'],
+                    "precio": mejor['precio']
+                })
+
+                # Registrar como error
+                for p in productos:
+                    errores.append({
+                        "producto_id": mi_id,
+                        "nombre_panacea": p['nombre_panacea'],
+                        "precio": p['precio'],
+                        "match_score": p['match_score'],
+                        "stock": p['stock'],
+                        "error": f"Duplicado - match bajo - descartado" if p != mejor else "Duplicado - seleccionado por match"
+                    })
+            else:
+                # Estrategia: 
+                # 1. Si hay productos con STOCK > 0, preferirlos
+                # 2. Entre productos con stock, elegir el de MAYOR PRECIO (más conservador)
+                # 3. Si no hay stock, elegir el de mayor match_score
+
+                con_stock = [p for p in buenos_matches if p['stock'] > 0]
+
+                if con_stock:
+                    # Elegir el de MAYOR precio entre los que tienen stock
+                    elegido = max(con_stock, key=lambda x: x['precio'])
+                    criterio = "mayor precio con stock"
+                else:
+                    # Elegir el de mejor match
+                    elegido = max(buenos_matches, key=lambda x: x['match_score'])
+                    criterio = "mejor match (sin stock)"
+
+                rows_mapped.append({
+                    "producto_id": mi_id,
+                    "nombre": elegido['nombre_final'],
+                    "precio": elegido['precio']
+                })
+
+                # Registrar los descartados
+                for p in productos:
+                    if p != elegido:
+                        errores.append({
+                            "producto_id": mi_id,
+                            "nombre_panacea": p['nombre_panacea'],
+                            "nombre_final": p['nombre_final'],
+                            "precio": p['precio'],
+                            "match_score": p['match_score'],
+                            "stock": p['stock'],
+                            "error": f"Duplicado descartado - se eligió otro por {criterio}"
+                        })
+
+    return pd.DataFrame(rows_mapped), pd.DataFrame(errores)
+
+
+def productos_sinteticos(n, seed=42):
+    """Catálogo con los formatos del JSON real (números como texto, floats,
+    nulls) y un 1% de valores sucios ("45,00%", "$ 120", "null") en descuentos."""
+    rnd = random.Random(seed)
+    sucio = lambda v: rnd.choice([f"{v * 100:.2f}%".replace('.', ','), f"$ {v * 100:.1f}", "null", ""])
+    productos = []
+    for i in range(n):
+        p = {
+            "id_producto": str(i), "codigo": f"{i:011d}", "descripcion": f"PRODUCTO {i}",
+            "precio_base": f"{rnd.uniform(100, 50000):.2f}",
+            "bonificacion": str(round(rnd.uniform(0, 1.5), 2)),
+            "descuento_especial": rnd.choice([round(rnd.uniform(0, 0.3), 2), rnd.uniform(0, 30), None]),
+            "mejor_precio": rnd.choice([None, rnd.uniform(100, 40000)]),
+            "stock": str(rnd.randint(0, 500)),
+            "stock_minimo": rnd.choice([str(rnd.randint(0, 20)), None]),
+        }
+        if rnd.random() < 0.01: p["descuento_especial"] = sucio(rnd.uniform(0, 0.3))
+        if rnd.random() < 0.5: p["descuento_financiero"] = rnd.choice([0, "5", 0.1])
+        if rnd.random() < 0.5: p["cantidad_desde_optima"] = rnd.choice([None, 1, "3"])
+        productos.append(p)
+    return productos
+
+
+def diccionario_sintetico(productos, seed=7):
+    """~90% de los nombres mapeados, con varios nombres por ID para forzar duplicados"""
+    rnd = random.Random(seed)
+    n_ids = max(1, len(productos) // 3)
+    return {
+        p["descripcion"]: {"mi_id": rnd.randint(1, n_ids), "mi_nombre": f"MI PRODUCTO {rnd.randint(1, n_ids)}",
+                           "match_score": rnd.choice([rnd.randint(40, 100), round(rnd.uniform(40, 100), 1)]),
+                           "estado": "APROXIMADO"}
+        for p in productos if rnd.random() < 0.9
+    }
+
+
+def html_sintetico(rnd, i):
+    """descripcion_larga con el formato del sitio: campos en orden variable,
+    algunos faltantes, mayúsculas mezcladas, &nbsp; y relleno de texto"""
+    campos = [("Proveedor", f"LAB {i % 97}"), ("Acción Farmacológica", "ANTIBIÓTICO&nbsp;"),
+              ("Especie", rnd.choice(["Perros", "Gatos", "Bovinos"])), ("Presentación", f"Frasco x {i % 50} ml"),
+              ("Laboratorio", f"LABORATORIO {i % 31}")]
+    rnd.shuffle(campos)
+    partes = ["<div class='desc'>" + "Lorem ipsum dolor sit amet. " * rnd.randint(5, 40) + "</div>"]
+    for etiqueta, valor in campos:
+        if rnd.random() < 0.15: continue
+        if rnd.random() < 0.1: etiqueta = etiqueta.upper()
+        partes.append(f"<p>{etiqueta}: <span class='x'><strong> {valor} </strong></span></p>")
+    return "".join(partes)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""IndiceAutocompletado contra una búsqueda lineal sobre todos los nombres"""
+import random
+
+import pytest
+
+from autocompletado import IndiceAutocompletado, clave_busqueda
+
+
+def buscar_lineal(ids, nombres, texto, limite):
+    q = clave_busqueda(texto)
+    encontrados = []
+    for i, n in zip(ids, nombres):
+        clave = clave_busqueda(n)
+        if q not in clave: continue
+        grupo = 0 if clave.startswith(q) else 1 if (" " + q) in clave else 2
+        encontrados.append(((grupo, len(clave), clave), i, n))
+    return [{"id": i, "nombre": n} for _, i, n in sorted(encontrados, key=lambda e: e[0])[:limite]]
+
+
+def armar_caso(nombres, variantes=8, n_consultas=300):
+    """(ids, nombres, consultas): catálogo del tamaño real, con acentos y nulos,
+    y subcadenas de nombres como consultas"""
+    nombres = [f"{n} V{k}" for k in range(variantes) for n in nombres] + ["Ñandú ÁMBAR", "ANTÍ-PULGAS", None, ""]
+    ids = [f"id-{i}" for i in range(len(nombres))]
+    rnd = random.Random(3)
+    consultas = ["", "a", "ñ", "anti", "ámbar", "  x  30 ", "zzzz", "v7"]
+    for _ in range(n_consultas):
+        n = clave_busqueda(rnd.choice(nombres))
+        if len(n) < 2: continue
+        inicio = rnd.randrange(len(n) - 1)
+        consultas.append(n[inicio:inicio + rnd.randint(2, 8)].upper())
+    return ids, nombres, consultas
+
+
+@pytest.fixture(scope="module")
+def caso(catalogo):
+    ids, nombres, consultas = armar_caso([fila.get("PRODUCTO") or "" for fila in catalogo], variantes=2)
+    return ids, nombres, consultas, IndiceAutocompletado(ids, nombres)
+
+
+def test_igual_a_busqueda_lineal(caso):
+    ids, nombres, consultas, indice = caso
+    for q in consultas:
+        assert indice.buscar(q, 10) == buscar_lineal(ids, nombres, q, 10), q
+
+
+def test_cambios_incrementales_igual_a_reconstruir(caso):
+    ids, nombres, consultas, indice = caso
+    # Renombrados, altas y bajas
+    cambios_ids = ids[:500:5] + ["id-nuevo-1", "id-nuevo-2"]
+    cambios_nombres = [f"RENOMBRADO {i}" for i in range(len(cambios_ids) - 2)] + ["Antiparasitario Nuevo", "ámbar gel"]
+    borrados = ids[1000:1200] + ["id-inexistente"]
+    actualizado = indice.con_cambios(cambios_ids, cambios_nombres, borrados)
+    finales = dict(zip(ids, nombres))
+    for i in borrados: finales.pop(i, None)
+    finales.update(zip(cambios_ids, cambios_nombres))
+    for q in consultas + ["renombrado", "nuevo", "ámbar"]:
+        assert actualizado.buscar(q, 10) == buscar_lineal(list(finales), list(finales.values()), q, 10), q
+    assert indice.buscar("renombrado", 10) == []  # el índice anterior no cambió
+    assert len(actualizado) == len(finales)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Matching con y sin bloqueo sobre productos.csv: el bloqueo no pierde aciertos
+ni agrega falsos positivos"""
+import random
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from normalizacion import normalizar_texto
+from bloqueo import PATH_PRODUCTOS_CSV, vocabulario_laboratorios
+from diccionario_manager import IndiceMatching, PARAMS_TFIDF
+
+
+def variante(nombre: str, rnd) -> str:
+    """Nombre como lo escribiría otro proveedor: abreviado, sin puntos, desordenado"""
+    palabras = nombre.replace(".", " ").split()
+    if len(palabras) > 3 and rnd.random() < 0.4: palabras.pop(rnd.randrange(1, len(palabras)))
+    if len(palabras) > 2 and rnd.random() < 0.3:
+        i = rnd.randrange(len(palabras) - 1)
+        palabras[i], palabras[i + 1] = palabras[i + 1], palabras[i]
+    texto = " ".join(palabras)
+    return texto.replace(" X ", " X") if rnd.random() < 0.5 else texto.lower()
+
+
+def armar_caso(catalogo, variantes=8):
+    """(productos, consultas, índice). El 10% de los nombres queda afuera del
+    catálogo: si matchea con confianza alta es un falso positivo. El catálogo
+    se repite con sufijos que no cambian laboratorio, forma ni dosis."""
+    filas = [(fila["PRODUCTO"], fila["LABORATORIO"]) for fila in catalogo if fila.get("PRODUCTO")]
+    rnd = random.Random(7)
+    rnd.shuffle(filas)
+    n_fuera = len(filas) // 10
+    dentro, fuera = filas[n_fuera:], filas[:n_fuera]
+    productos = [(f"{n} V{k}" if k else n, lab) for k in range(variantes) for n, lab in dentro]
+
+    limpios = [normalizar_texto(n) for n, _ in productos]
+    vectorizer = TfidfVectorizer(**PARAMS_TFIDF)
+    indice = IndiceMatching(pd.DataFrame({'id': [str(i) for i in range(len(productos))], 'nombre': [n for n, _ in productos],
+                                          'nombre_limpio': limpios}), vectorizer, vectorizer.fit_transform(limpios))
+    consultas = [(variante(n, rnd), i, lab) for i, (n, lab) in enumerate(dentro)]
+    consultas += [(variante(n, rnd), None, lab) for n, lab in fuera]
+    return productos, len(dentro), consultas, indice
+
+
+def contar(productos, n_dentro, consultas, posiciones, confianzas, umbral):
+    """(aciertos, falsos positivos, de otro laboratorio) con confianza >= umbral"""
+    aciertos = falsos = otro_lab = 0
+    for (_, esperado, lab), pos, conf in zip(consultas, posiciones, confianzas):
+        if conf < umbral: continue
+        _, lab_match = productos[pos]
+        if esperado is not None and pos % n_dentro == esperado: aciertos += 1
+        else: falsos += 1
+        if lab_match != lab: otro_lab += 1
+    return aciertos, falsos, otro_lab
+
+
+def test_bloqueo_no_empeora_el_matching(catalogo):
+    productos, n_dentro, consultas, indice = armar_caso(catalogo, variantes=2)
+    limpias = [normalizar_texto(c) for c, _, _ in consultas]
+    completo = contar(productos, n_dentro, consultas, *indice.mejor_match(limpias, bloqueo=False), 80.0)
+    bloqueo = contar(productos, n_dentro, consultas, *indice.mejor_match(limpias, bloqueo=True), 80.0)
+    assert bloqueo[0] >= completo[0] and bloqueo[1] <= completo[1] and bloqueo[2] <= completo[2], (completo, bloqueo)
+
+
+def test_vocabulario_sin_csv_avisa(tmp_path, capsys):
+    assert vocabulario_laboratorios(tmp_path / "productos.csv") == {}
+    assert "[WARN]" in capsys.readouterr().out
+
+
+def test_vocabulario_no_depende_del_directorio(catalogo, tmp_path, monkeypatch):
+    esperado = vocabulario_laboratorios()
+    vocabulario_laboratorios.cache_clear()
+    monkeypatch.chdir(tmp_path)
+    assert PATH_PRODUCTOS_CSV.is_absolute()
+    assert vocabulario_laboratorios() == esperado and esperado
+
+
+def test_con_cambios_igual_a_reconstruir(catalogo):
+    productos, _, consultas, indice = armar_caso(catalogo, variantes=1)
+    limpias = [normalizar_texto(c) for c, _, _ in consultas]
+    indice.mejor_match(limpias[:50])  # arma bloques y fragmentos
+
+    rnd = random.Random(11)
+    ids = indice.productos['id'].tolist()
+    borrados = rnd.sample(ids, 40)
+    modificados = rnd.sample([i for i in ids if i not in borrados], 30)
+    nombres = [variante(n, rnd) for n, _ in rnd.sample(productos, 60)]
+    cambios = pd.DataFrame({'id': modificados + [f"nuevo-{i}" for i in range(30)], 'nombre': nombres})
+    cambios['nombre_limpio'] = [normalizar_texto(n) for n in nombres]
+
+    incremental = indice.con_cambios(cambios, borrados)
+    completo = IndiceMatching(incremental.productos, indice.vectorizer, incremental.matriz)
+
+    a, b = incremental._bloques, completo.bloques
+    assert a.n_productos == b.n_productos
+    for i in range(3):
+        assert np.array_equal(a.sin_valor[i], b.sin_valor[i])
+        assert a.por_valor[i].keys() == b.por_valor[i].keys()
+        assert all(np.array_equal(a.por_valor[i][v], b.por_valor[i][v]) for v in b.por_valor[i])
+    fa, fb = incremental._fragmentos_dosis, completo.fragmentos_dosis
+    assert fa.keys() == fb.keys()
+    for valor in fb:
+        assert np.array_equal(fa[valor].posiciones, fb[valor].posiciones)
+        assert (fa[valor].normalizada != fb[valor].normalizada).nnz == 0
+    for r_inc, r_full in zip(incremental.mejor_match(limpias), completo.mejor_match(limpias)):
+        assert np.array_equal(r_inc, r_full)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""ClienteHTTP contra un servidor local que inyecta fallas"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cliente_http import ClienteHTTP, CircuitBreaker, ErrorHTTP, CircuitoAbierto
+
+
+@pytest.fixture
+def servidor():
+    """Devuelve una función que levanta el stub con un guion de respuestas por
+    request (status o "lento", que supera el timeout) y da su URL."""
+    servidores = []
+
+    def levantar(guion):
+        estado = {"i": 0}
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args): pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                paso = guion[min(estado["i"], len(guion) - 1)]
+                estado["i"] += 1
+                if paso == "lento":
+                    time.sleep(0.5)
+                    paso = 200
+                cuerpo = json.dumps({"ok": paso == 200}).encode()
+                self.send_response(paso)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                try:
+                    self.wfile.write(cuerpo)
+                except BrokenPipeError:
+                    pass  # el cliente ya cortó por timeout
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servidores.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/api"
+
+    yield levantar
+    for server in servidores: server.shutdown()
+
+
+def cliente_rapido(**kwargs):
+    opciones = dict(max_reintentos=3, backoff_base=0.01, backoff_max=0.05, timeout=(1, 0.2),
+                    umbral_circuito=3, enfriamiento_circuito=0.3)
+    return ClienteHTTP(**{**opciones, **kwargs})
+
+
+def test_reintenta_errores_transitorios(servidor):
+    url = servidor([502, 503, 200, "lento", 200])
+    cliente = cliente_rapido(umbral_circuito=10)
+    # 502, 503 -> reintento -> 200
+    assert cliente.post(url, json={}).status_code == 200
+    # timeout -> reintento -> 200
+    assert cliente.post(url, json={}).status_code == 200
+
+
+def test_4xx_no_se_reintenta_ni_cuenta_para_el_circuito(servidor):
+    url = servidor([404, 404, 404, 404, 200])
+    cliente = cliente_rapido()
+    for _ in range(4):
+        with pytest.raises(ErrorHTTP) as e:
+            cliente.post(url, json={})
+        assert e.value.status == 404 and not e.value.transitorio
+    assert cliente.post(url, json={}).status_code == 200
+
+
+def test_circuito_se_abre_y_cierra_con_un_request_de_prueba(servidor):
+    url = servidor([500, 500, 500, 200])
+    cliente = cliente_rapido()
+    # tres 500 seguidos abren el circuito
+    with pytest.raises(CircuitoAbierto):
+        cliente.post(url, json={})
+    # pasado el enfriamiento, el request de prueba (half-open) pasa y cierra el circuito
+    time.sleep(0.35)
+    assert cliente.post(url, json={}).status_code == 200
+
+
+def test_half_open_deja_pasar_un_solo_request():
+    breaker = CircuitBreaker(umbral_fallos=2, enfriamiento=0.05)
+    breaker.registrar_fallo()
+    breaker.registrar_fallo()
+    assert not breaker.permitir()
+    time.sleep(0.06)
+    assert breaker.permitir()
+    assert not breaker.permitir()
+    # Si la prueba falla, el circuito se reabre aunque el contador no llegue al umbral
+    breaker.registrar_fallo()
+    assert not breaker.permitir()
+    time.sleep(0.06)
+    assert breaker.permitir()
+    breaker.registrar_exito()
+    assert breaker.permitir() and breaker.permitir()
+
+
+def test_umbral_por_defecto_mayor_que_los_reintentos():
+    cliente = ClienteHTTP()
+    assert cliente._circuito("http://x/api").umbral_fallos > cliente.max_reintentos
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Cola de revisión de la carga de stock desatendida"""
+from cola_revision import encolar_revision, leer_revision, buscar_revision, quitar_revision
+
+
+def caso(id_, nombre, stock, fecha, tipo="desconocido"):
+    return {"id": id_, "tipo": tipo, "nombre": nombre, "stock": stock, "fecha": fecha}
+
+
+def test_un_caso_por_dia(tmp_path):
+    path = str(tmp_path / "revision.json")
+    encolar_revision([caso("a", "PIPETA X", 5, "2024-03-01T06:00:00")], path)
+    encolar_revision([caso("b", "PIPETA X", 7, "2024-03-02T06:00:00")], path)
+
+    assert [(p["id"], p["stock"]) for p in leer_revision(path)] == [("a", 5), ("b", 7)]
+
+
+def test_carga_repetida_del_dia_actualiza_el_caso(tmp_path):
+    path = str(tmp_path / "revision.json")
+    encolar_revision([caso("a", "PIPETA X", 5, "2024-03-01T06:00:00")], path)
+    encolar_revision([caso("b", "PIPETA X", 9, "2024-03-01T18:00:00"),
+                      caso("c", "PIPETA X", 9, "2024-03-01T18:00:00", tipo="duplicado")], path)
+
+    pendientes = leer_revision(path)
+    assert [(p["id"], p["tipo"], p["stock"]) for p in pendientes] == [
+        ("a", "desconocido", 9), ("c", "duplicado", 9)
+    ]
+    assert buscar_revision("a", path)["fecha"] == "2024-03-01T18:00:00"
+    assert buscar_revision("b", path) is None
+
+
+def test_quitar(tmp_path):
+    path = str(tmp_path / "revision.json")
+    encolar_revision([caso("a", "PIPETA X", 5, "2024-03-01T06:00:00")], path)
+
+    assert quitar_revision("a", path)
+    assert not quitar_revision("a", path)
+    assert leer_revision(path) == []
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""DiccionarioManager sobre SQLite en memoria (sin Postgres)"""
+import gzip
+import json
+import uuid
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy.orm import sessionmaker
+
+import diccionario_manager as dm
+
+
+def armar_manager(alias):
+    """Manager sin __init__ (no se conecta a Postgres) sobre una base SQLite con
+    200 productos y los alias dados como (texto_original, confianza)."""
+    engine = create_engine("sqlite://")
+    dm.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    rnd = random.Random(2)
+    with Session() as session:
+        productos = [{"id": uuid.uuid4(), "nombre_producto": f"Prod ñ \"{i}\""} for i in range(200)]
+        session.execute(insert(dm.Producto), productos)
+        if alias:
+            session.execute(insert(dm.ProductoAlias), [{
+                "id": uuid.uuid4(), "producto_id": rnd.choice(productos)["id"] if i % 50 else uuid.uuid4(),
+                "termino_busqueda": "t", "texto_original": texto, "origen": dm.TipoAlias.PROVEEDOR, "confianza": confianza,
+            } for i, (texto, confianza) in enumerate(alias)])
+        session.commit()
+    manager = object.__new__(dm.DiccionarioManager)
+    manager.engine, manager.Session = engine, Session
+    return manager
+
+
+def export_anterior(manager):
+    """Lo que armaba export_to_json antes del streaming: un dict y json.dump"""
+    salida = {}
+    with manager.Session() as session:
+        for alias in session.query(dm.ProductoAlias).filter_by(origen=dm.TipoAlias.PROVEEDOR):
+            producto = session.get(dm.Producto, alias.producto_id)
+            salida[alias.texto_original] = {
+                "mi_id": str(alias.producto_id), "mi_nombre": producto.nombre_producto if producto else "Desconocido",
+                "match_score": alias.confianza, "estado": "EXACTO" if (alias.confianza or 0) >= 90 else "APROXIMADO",
+            }
+    return json.dumps(salida, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+@pytest.fixture
+def manager():
+    rnd = random.Random(3)
+    alias = [(f"Nombré \"{i}\" x10", rnd.choice([100.0, 95.5, 80.0, 40.0, None])) for i in range(300)]
+    return armar_manager(alias + [(None, 70.0)])
+
+
+def test_export_json_igual_a_json_dump(manager, tmp_path, monkeypatch):
+    esperado = export_anterior(manager)
+    salida = b"".join(manager.iter_export())
+    assert salida == esperado
+    assert json.loads(salida)["null"]["match_score"] == 70.0
+    assert gzip.decompress(b"".join(manager.iter_export(comprimir=True))) == esperado
+
+    monkeypatch.chdir(tmp_path)
+    assert manager.export_to_json().read_bytes() == esperado
+
+
+def test_export_ndjson(manager):
+    esperado = json.loads(export_anterior(manager))
+    for comprimir in (False, True):
+        datos = b"".join(manager.iter_export('ndjson', comprimir=comprimir))
+        lineas = [json.loads(l) for l in (gzip.decompress(datos) if comprimir else datos).decode("utf-8").splitlines()]
+        por_texto = {("null" if l["texto_original"] is None else l["texto_original"]):
+                     {k: v for k, v in l.items() if k != "texto_original"} for l in lineas}
+        assert por_texto == esperado
+
+
+def test_export_vacio_y_formato_invalido():
+    vacio = armar_manager([])
+    assert b"".join(vacio.iter_export()) == b"{}" == export_anterior(vacio)
+    assert b"".join(vacio.iter_export('ndjson')) == b""
+    assert gzip.decompress(b"".join(vacio.iter_export(comprimir=True))) == b"{}"
+    with pytest.raises(ValueError):
+        next(vacio.iter_export('xml'))
+
+
+def test_al_iniciar_solo_verifica_indices(manager, monkeypatch, capsys):
+    sentencias = []
+    event.listen(manager.engine, "before_cursor_execute", lambda conn, cur, sql, *a: sentencias.append(sql))
+    monkeypatch.setattr(dm.DiccionarioManager, "_indices_alias_validos",
+                        lambda self, conn: {dm.INDICE_LISTADO_ALIAS: True, dm.INDICE_TEXTO_ALIAS: False})
+
+    manager._verificar_indices_alias()
+
+    salida = capsys.readouterr().out
+    assert "[WARN]" in salida and dm.INDICE_TEXTO_ALIAS in salida and "--migrar" in salida
+    assert dm.INDICE_LISTADO_ALIAS not in salida
+    assert sentencias == []
+
+
+def respaldado_por_mmap(arr):
+    while arr is not None:
+        if isinstance(arr, np.memmap): return True
+        arr = arr.base
+    return False
+
+
+def test_indice_persistido_abre_las_matrices_del_motor_con_mmap(tmp_path, monkeypatch):
+    nombres = [f"PIPETA {i} PERRO {i % 7} ML" for i in range(300)]
+    productos = pd.DataFrame({"id": [str(i) for i in range(300)], "nombre": nombres, "nombre_limpio": nombres})
+    vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 3))
+    indice = dm.IndiceMatching(productos, vectorizer, vectorizer.fit_transform(nombres))
+    monkeypatch.setattr(dm, "PATH_INDICE_MATCHING", tmp_path / "indice")
+    manager = object.__new__(dm.DiccionarioManager)
+
+    manager._guardar_indice("huella", indice)
+    cargado = manager._cargar_indice("huella")
+
+    for matriz in (cargado.motor.normalizada, cargado.motor.transpuesta):
+        assert all(respaldado_por_mmap(getattr(matriz, parte)) for parte in ("data", "indices", "indptr"))
+    consultas = ["PIPETA 12 PERRO 5 ML", "PIPETA GATO"]
+    esperado, obtenido = indice.mejor_match(consultas, bloqueo=False), cargado.mejor_match(consultas, bloqueo=False)
+    assert np.array_equal(esperado[0], obtenido[0]) and np.allclose(esperado[1], obtenido[1])
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Lectura en streaming de lector_json contra json.load"""
+import json
+import random
+import tracemalloc
+
+import pytest
+
+import lector_json
+from lector_json import iterar_productos, _items_stdlib, _items_ijson
+
+
+def productos_sinteticos(n, seed=5):
+    rnd = random.Random(seed)
+    return [{
+        "id_producto": str(i), "descripcion": f"PRODUCTO {i} \"comillas\" ñ",
+        "stock": rnd.choice(["10", 3, None]), "precio_base": rnd.choice([12.5, 1e-7, 123456789012, "99,90"]),
+        "descripcion_larga": "<p>Especie: <strong>Perros</strong></p>" * rnd.randint(0, 50),
+        "producto_precios_especificos": [{"cantidad": j, "precio": j * 1.5} for j in range(rnd.randint(0, 4))],
+    } for i in range(n)]
+
+
+@pytest.fixture(scope="module")
+def catalogo_json(tmp_path_factory):
+    productos = productos_sinteticos(5000)
+    path = tmp_path_factory.mktemp("lector") / "catalogo.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"count": len(productos), "generated_at": "Mon Jan 1 00:00:00 2024", "productos": productos},
+                  f, ensure_ascii=False, indent=2)
+    return path, productos
+
+
+@pytest.mark.parametrize("data", [
+    {"productos": productos_sinteticos(50), "count": 50},
+    {"count": 0, "productos": []},
+    {"count": 0},
+], ids=["productos_al_principio", "vacio", "sin_productos"])
+def test_casos_chicos_iguales_a_json_load(data, tmp_path):
+    path = tmp_path / "datos.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    assert list(_items_stdlib(path, "productos", 4096)) == data.get("productos", [])
+    if lector_json.ijson is not None:
+        assert list(_items_ijson(path, "productos")) == data.get("productos", [])
+
+
+def test_catalogo_igual_a_json_load(catalogo_json):
+    path, productos = catalogo_json
+    assert list(_items_stdlib(path, "productos", 4096)) == productos
+    assert list(iterar_productos(path)) == productos
+
+
+def test_json_mal_formado_levanta_value_error(tmp_path):
+    path = tmp_path / "roto.json"
+    path.write_text('{"productos": [{"id": 1}, {"id": ', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(_items_stdlib(path, "productos", 8))
+
+
+def test_streaming_no_carga_el_archivo_completo(catalogo_json):
+    path, _ = catalogo_json
+    picos = {}
+    with open(path, encoding="utf-8") as f:
+        for nombre, leer in [("json.load", lambda: len(json.load(f)["productos"])),
+                             ("stream", lambda: sum(1 for _ in iterar_productos(path)))]:
+            tracemalloc.start()
+            leer()
+            picos[nombre] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    assert picos["stream"] * 10 < picos["json.load"], picos
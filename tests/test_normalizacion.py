@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""normalizar_texto (una pasada + LRU) contra la versión original con un re.sub por regla"""
+import re
+import random
+
+from normalizacion import normalizar_texto, MAPA_PALABRAS
+
+
+def normalizar_texto_original(texto: str) -> str:
+    """Versión original de DiccionarioManager.normalizar_texto (un re.sub por regla)"""
+    if not texto: return ""
+    texto = texto.upper().strip()
+    texto = texto.replace(',', '.')
+    texto = re.sub(r'\s*-\s*', '-', texto)
+
+    traducciones = {
+        'GOLD': 'DORADO', 'YELLOW': 'DORADO', 'PURPLE': 'PURPURA', 'VIOLET': 'PURPURA',
+        'CARAMEL': 'CARAMELO', 'ORANGE': 'CARAMELO', 'TEAL': 'AZUL', 'BLUE': 'AZUL',
+        'GREEN': 'VERDE', 'BROWN': 'MARRON'
+    }
+    for eng, esp in traducciones.items():
+        texto = re.sub(rf'\b{eng}\b', esp, texto)
+
+    # Normalizaciones médicas
+    texto = re.sub(r'\b(ML|CC|CM3|MILILITROS?)\b', 'ML', texto)
+    texto = re.sub(r'\b(GR|GRS|GRAM|GRAMOS?)\b', 'GR', texto)
+    texto = re.sub(r'\b(KG|KGS|KILO|KILOS)\b', 'KG', texto)
+    texto = re.sub(r'\b(MG|MGR|MILIGRAMOS?)\b', 'MG', texto)
+    texto = re.sub(r'\b(COMP|COMPRIMIDOS?|CS|CAPS|CAPSULAS?|TAB|TABLETS?|TABLETAS?)\b', 'COMP', texto)
+    texto = re.sub(r'\b(AMP|AMPOLLA|AMPOLLAS|FCO|FRASCO|FRASCOS|VIALES|VIAL)\b', 'AMP', texto)
+    texto = re.sub(r'\b(INY|INYECTABLE|INYECCION)\b', 'INY', texto)
+    texto = re.sub(r'\b(SUSP|SUSPENSION)\b', 'SUSP', texto)
+    texto = re.sub(r'\b(SOL|SOLUCION)\b', 'SOL', texto)
+    texto = re.sub(r'\b(GOT|GOTAS)\b', 'GOT', texto)
+    texto = re.sub(r'\b(PALAT|PALATABLE|MASTICABLE|MASTICABLES)\b', 'PALAT', texto)
+
+    texto = re.sub(r'\bPOR\b', 'X', texto)
+    texto = re.sub(r'(?<=\d)\s*[xX×]\s*(?=\d)', ' X ', texto)
+    texto = re.sub(r'\s+[xX×]\s+(?=\d)', ' X ', texto)
+    texto = re.sub(r'\s+', ' ', texto)
+    return texto.strip()
+
+
+def casos_borde():
+    return [
+        "", "   ", "pipeta gold 10-20 kg", "Collar  Blue/Green", "GOLDEN yellowish", "tabletas x 10",
+        "Aplonal iny. 5% x 30 ml.", "10x20 comp", "10 X20", "3 × 4", "2 por 10 ml", "CM3 cc ML",
+        "Frasco-Ampolla 50 mL", "Mililitro 1,5", "gramos,gramo,gram,grs", "kilos kilo kgs", "MGR mg miligramo",
+        "susp. sol. got. palat", "Masticables x 30", "VIALES vial", "inyección inyeccion", "ml_10 10ml",
+        "Ñandú ÁMBAR ML", "orange-teal", "caps\tcapsula\ncapsulas", "x 10", "A x B", "10 x 5",
+        "ÜBER POR X 2", "PORTA 3 x4", "PÓR 5", "naranja cc",
+    ]
+
+
+def casos_aleatorios(n=3000, seed=11):
+    """Combinaciones de todas las variantes con números, separadores y minúsculas"""
+    rnd = random.Random(seed)
+    vocab = list(MAPA_PALABRAS) + ["10", "2.5", "x", "X", "×", "-", ",", "ÁMBAR", "_", "PRO", "GRAMOSS", "AML"]
+    seps = [" ", "", "  ", "-", " - ", ",", "\t"]
+    casos = []
+    for _ in range(n):
+        partes = [rnd.choice(vocab) for _ in range(rnd.randint(1, 8))]
+        texto = "".join(p + rnd.choice(seps) for p in partes)
+        casos.append(texto.lower() if rnd.random() < 0.5 else texto)
+    return casos
+
+
+def test_igual_a_la_version_original(catalogo):
+    casos = casos_borde() + casos_aleatorios()
+    for fila in catalogo:
+        casos += [fila.get("PRODUCTO") or "", fila.get("DESCRIPCION ADICIONAL") or ""]
+    distintos = [c for c in casos if normalizar_texto.__wrapped__(c) != normalizar_texto_original(c)]
+    assert not distintos, f"Difieren {len(distintos)} textos, p.ej. {distintos[:5]}"
+
+
+def test_memoizado_igual_al_compilado():
+    normalizar_texto.cache_clear()
+    for c in casos_borde() * 2:
+        assert normalizar_texto(c) == normalizar_texto.__wrapped__(c)
+    assert normalizar_texto.cache_info().hits >= len(casos_borde())
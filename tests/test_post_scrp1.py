@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""post-scrp1.py da lo mismo que las implementaciones originales (referencia_post_scrp1.py)"""
+import json
+import random
+
+import numpy as np
+import pandas as pd
+import openpyxl
+
+import referencia_post_scrp1 as ref
+
+N = 3000
+
+
+def test_construir_dataframe_igual_al_armado_por_producto(post_scrp1):
+    productos = ref.productos_sinteticos(N)
+    esperado = ref.construir_dataframe_escalar(productos)
+    df = post_scrp1.construir_dataframe(productos)
+    for c in esperado.columns:
+        if pd.api.types.is_float_dtype(esperado[c]):
+            assert np.allclose(df[c], esperado[c]), c
+        else:
+            assert list(df[c]) == list(esperado[c]), c
+
+
+def test_resolver_duplicados_igual_al_iterativo(post_scrp1):
+    productos = ref.productos_sinteticos(N)
+    df = post_scrp1.construir_dataframe(productos)
+    mapping = ref.diccionario_sintetico(productos)
+    csv = lambda d: d.to_csv(index=False, sep=';', decimal=',')
+
+    esperado_simple, esperado_errores = ref.resolver_duplicados_iterativo(df, mapping)
+    df_simple, df_errores = post_scrp1.resolver_duplicados(df, mapping)
+    assert csv(df_simple.sort_values("producto_id")) == csv(esperado_simple.sort_values("producto_id"))
+    assert csv(df_errores) == csv(esperado_errores)
+
+
+def test_extraer_info_html_igual_a_re_search_con_cache(post_scrp1, tmp_path):
+    rnd = random.Random(3)
+    distintos = [ref.html_sintetico(rnd, i) for i in range(N * 4 // 5)]
+    productos = [{"descripcion_larga": rnd.choice(distintos) if rnd.random() < 0.2 else distintos[i % len(distintos)]}
+                 for i in range(N)]
+    productos += [{"descripcion_larga": ""}, {"descripcion_larga": None}, {}]
+    path_cache = tmp_path / "cache_info_html.json"
+
+    esperado = [ref.extraer_info_html_regex(p.get("descripcion_larga", "")) for p in productos]
+    assert post_scrp1.extraer_info_productos(productos, path_cache) == esperado
+    # Segunda corrida con la caché ya armada y un 5% de descripciones modificadas
+    for p in productos[: N // 20]:
+        p["descripcion_larga"] = ref.html_sintetico(rnd, rnd.randint(0, N))
+    esperado = [ref.extraer_info_html_regex(p.get("descripcion_larga", "")) for p in productos]
+    assert post_scrp1.extraer_info_productos(productos, path_cache) == esperado
+
+
+def test_extraer_info_html_ignora_etiquetas_parecidas(post_scrp1):
+    casos = [
+        "<p>Eroveedor:</b><strong>X</strong></p><p>Proveedor:</b><strong>Konig</strong></p>",
+        "<p>aspecie:</b><strong>Perros</strong></p><p>ESPECIE:</b><strong>Gatos</strong></p>",
+        "<p>Lresentación:</b><strong>x 10</strong></p><p>Acción farmacológica:</b><strong>Analgésico</strong></p>",
+        "<p>Presentación:</b><strong>x 30</strong> Pcción farmacológica:</b><strong>?</strong> "
+        "Laboratorio:</b><strong>Lab</strong></p>",
+    ]
+    for html in casos:
+        assert post_scrp1.extraer_info_html(html) == ref.extraer_info_html_regex(html), html
+    assert post_scrp1.extraer_info_html(casos[0]) == {"Proveedor": "Konig"}
+def test_tabla_intermedia_con_columnas_de_tipos_mezclados(post_scrp1, tmp_path, capsys):
+    productos = ref.productos_sinteticos(200)
+    for i, p in enumerate(productos):
+        if i % 3 == 0:
+            p["id_producto"] = f"X-{i}"
+            p["codigo"] = None
+            p["stock_dias_sin_stock"] = 4
+    path_tabla = tmp_path / "tabla_productos.parquet"
+
+    df, _ = post_scrp1.construir_dataframe_incremental(iter(productos), path_tabla)
+    assert path_tabla.exists(), capsys.readouterr().out
+    df_cache, _ = post_scrp1.construir_dataframe_incremental(iter(productos), path_tabla)
+    assert "0 recalculadas" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(df, df_cache)
+
+
+def test_tiempos_se_reportan_en_salidas_anticipadas(post_scrp1, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(post_scrp1, "__file__", str(tmp_path / "post-scrp1.py"))
+    monkeypatch.setattr(post_scrp1, "PATH_CACHE_HTML", tmp_path / "outputs/cache_info_html.json")
+
+    post_scrp1.generar_archivos()
+    salida = capsys.readouterr().out
+    assert "[ERROR] No se encontró" in salida and "[TIEMPOS]" in salida
+
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data/panacea_clicks_enriquecido.json").write_text("{\"productos\": []}", encoding="utf-8")
+    post_scrp1.generar_archivos(excel_diferido=True)
+    salida = capsys.readouterr().out
+    assert "[ERROR] No se encontró diccionario" in salida and "[TIEMPOS]" in salida
+
+
+def test_tabla_incremental_por_bloques_igual_a_todo_junto(post_scrp1, tmp_path, monkeypatch):
+    monkeypatch.setattr(post_scrp1, "TAMANO_BLOQUE_TABLA", 7)
+    rnd = random.Random(5)
+    productos = ref.productos_sinteticos(100)
+    for i, p in enumerate(productos):
+        p["descripcion_larga"] = ref.html_sintetico(rnd, i % 40)
+    path_tabla, path_cache = tmp_path / "tabla_productos.parquet", tmp_path / "cache_info_html.json"
+    path_cache.write_text(json.dumps({"obsoleta": {"Acción": "x"}}), encoding="utf-8")
+
+    esperado = post_scrp1.construir_dataframe(productos)
+    df, _ = post_scrp1.construir_dataframe_incremental(iter(productos), path_tabla, path_cache)
+    pd.testing.assert_frame_equal(df, esperado)
+    # Sin tabla previa el caché queda con las descripciones de todo el catálogo
+    cache = json.loads(path_cache.read_text(encoding="utf-8"))
+    assert set(cache) == {post_scrp1._clave_html(p) for p in productos}
+
+    # Con tabla previa solo se recalculan los modificados y el caché no se poda
+    productos[3]["descripcion_larga"] = ref.html_sintetico(rnd, 999)
+    df, _ = post_scrp1.construir_dataframe_incremental(iter(productos), path_tabla, path_cache)
+    pd.testing.assert_frame_equal(df, post_scrp1.construir_dataframe(productos))
+    assert set(json.loads(path_cache.read_text(encoding="utf-8"))) > set(cache)
+
+
+def _celdas_excel(post_scrp1, df, path):
+    assert post_scrp1.escribir_excel(df, path)
+    hoja = openpyxl.load_workbook(path, read_only=True).active
+    return [[(c.value, c.data_type) for c in fila] for fila in hoja.iter_rows()]
+
+
+def test_tabla_intermedia_conserva_los_tipos_de_celda(post_scrp1, tmp_path, monkeypatch):
+    monkeypatch.setattr(post_scrp1, "TAMANO_BLOQUE_TABLA", 7)
+    catalogos = {
+        "ids_numericos": ref.productos_sinteticos(40),
+        "tipos_mezclados": ref.productos_sinteticos(40),
+    }
+    for i, p in enumerate(catalogos["ids_numericos"]):
+        p["id_producto"] = 800 + i
+        p["stock_dias_sin_stock"] = None if i < 10 else i
+    for i, p in enumerate(catalogos["tipos_mezclados"]):
+        p["id_producto"] = 872 if i % 2 else f"X-{i}"
+        p["codigo"] = None if i % 5 == 0 else i
+        p["stock_dias_sin_stock"] = None if i % 3 == 0 else 2
+        p["fecha_vencimiento"] = None if i % 4 == 0 else "2025-01-31"
+
+    for nombre, productos in catalogos.items():
+        columnas = post_scrp1.COLUMNAS_REPORTE
+        celdas = _celdas_excel(post_scrp1, ref.construir_dataframe_escalar(productos)[columnas],
+                               tmp_path / f"{nombre}_referencia.xlsx")
+        esperado = post_scrp1.construir_dataframe(productos)
+        path_tabla = tmp_path / f"{nombre}.parquet"
+        # Primera corrida (sin tabla) y segunda (todo desde el Parquet)
+        for corrida in ("fria", "cache"):
+            df, _ = post_scrp1.construir_dataframe_incremental(iter(productos), path_tabla)
+            assert path_tabla.exists()
+            for c in [*post_scrp1.COLUMNAS_CRUDAS, "Vencimiento"]:
+                pd.testing.assert_series_equal(df[c], esperado[c], obj=f"{nombre}/{corrida}/{c}")
+            assert _celdas_excel(post_scrp1, df[columnas], tmp_path / f"{nombre}_{corrida}.xlsx") == celdas, (nombre, corrida)
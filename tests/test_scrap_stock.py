@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""Backup NDJSON, política y pipeline de scrap_stock, sin Postgres"""
+import threading
+
+import pytest
+
+import scrap_stock as ss
+from cliente_http import ErrorHTTP, CircuitoAbierto
+
+
+@pytest.fixture(autouse=True)
+def backup(tmp_path, monkeypatch):
+    """Backup, cursor y progreso de carga en un directorio temporal."""
+    (tmp_path / "outputs").mkdir()
+    monkeypatch.setattr(ss, "PATH_BACKUP_NDJSON", str(tmp_path / "outputs" / "backup.ndjson"))
+    monkeypatch.setattr(ss, "PATH_BACKUP_CURSOR", str(tmp_path / "outputs" / "cursor.json"))
+    monkeypatch.setattr(ss, "PATH_BACKUP_CARGADOS", str(tmp_path / "outputs" / "cargados.json"))
+    return tmp_path
+
+
+def productos(desde, hasta):
+    return [{"id": i, "producto": f"PRODUCTO {i}", "stock": str(i)} for i in range(desde, hasta)]
+
+
+def escribir_paginas(paginas, marca=128):
+    ss.iniciar_backup()
+    total = 0
+    for n, pagina in enumerate(paginas, start=1):
+        total += len(pagina)
+        ss.guardar_pagina_backup(pagina, marca, n, total)
+
+
+# --- Deduplicación dentro de la carga ---
+
+def fila(pid, stock):
+    return {"id": f"{pid}-{stock}", "producto_id": pid, "stock": stock}
+
+
+def test_deduplicar_conserva_el_primero():
+    filas = [fila("a", 1), fila("b", 2), fila("a", 3)]
+    quedan, descartadas = ss.deduplicar_filas(filas, "conservar_primero")
+    assert quedan == [fila("a", 1), fila("b", 2)]
+    assert descartadas == [fila("a", 3)]
+
+
+def test_deduplicar_conserva_el_ultimo():
+    filas = [fila("a", 1), fila("b", 2), fila("a", 3)]
+    quedan, descartadas = ss.deduplicar_filas(filas, "conservar_ultimo")
+    assert quedan == [fila("a", 3), fila("b", 2)]
+    assert descartadas == [fila("a", 1)]
+
+
+# --- Política del modo desatendido ---
+
+def test_politica_por_defecto_sin_archivo(tmp_path):
+    assert ss.cargar_politica(str(tmp_path / "no_existe.json")) == ss.POLITICA_DEFECTO
+
+
+@pytest.mark.parametrize("contenido", [
+    '{"duplicados": "conservar_ultmo"}',
+    '{"desconocido": "crear"}',
+    '{"duplicados": ',
+])
+def test_politica_invalida(tmp_path, contenido):
+    path = tmp_path / "politica.json"
+    path.write_text(contenido, encoding="utf-8")
+    with pytest.raises(ValueError):
+        ss.cargar_politica(str(path))
+
+
+# --- Backup NDJSON y reanudación ---
+
+def test_recortar_descarta_la_pagina_a_medias():
+    escribir_paginas([productos(0, 3), productos(3, 5)])
+    cursor = ss.leer_cursor()
+    with open(ss.PATH_BACKUP_NDJSON, "ab") as f:
+        f.write(b'{"id": 5, "producto": "PRODUCTO 5"}\n{"id": 6, "prod')
+
+    ss.recortar_backup(cursor)
+
+    assert ss.leer_backup() == productos(0, 5)
+    assert (cursor["pagina"], cursor["productos"]) == (2, 5)
+
+
+def test_iterar_backup_desde_y_linea_truncada():
+    escribir_paginas([productos(0, 4)])
+    with open(ss.PATH_BACKUP_NDJSON, "ab") as f:
+        f.write(b'{"id": 4, "prod')
+
+    assert list(ss.iterar_backup(desde=2)) == productos(2, 4)
+
+
+def test_progreso_de_carga():
+    assert ss.leer_productos_cargados() == 0
+    ss.guardar_productos_cargados(7)
+    assert ss.leer_productos_cargados() == 7
+
+    with open(ss.PATH_BACKUP_CARGADOS, "w", encoding="utf-8") as f:
+        f.write("{")
+    assert ss.leer_productos_cargados() == 0
+
+
+def test_backup_incompleto():
+    assert ss.backup_incompleto() is None
+
+    escribir_paginas([productos(0, 3)])
+    assert ss.backup_incompleto()["pagina"] == 1
+
+    ss.guardar_cursor({**ss.leer_cursor(), "completo": True})
+    ss.guardar_productos_cargados(2)
+    assert ss.backup_incompleto()["productos"] == 3
+
+    ss.guardar_productos_cargados(3)
+    assert ss.backup_incompleto() is None
+
+
+# --- Scraping ante errores HTTP ---
+
+class RespuestaFalsa:
+    def __init__(self, datos): self.datos = datos
+    def json(self): return self.datos
+
+
+def cliente_falso(guion, pedidos):
+    """ClienteHTTP que responde según (marca, página): una lista de productos o
+    una excepción. Lo que no está en el guion es una página vacía."""
+    class Cliente:
+        def __init__(self, headers=None): pass
+        def resumen(self): return "-"
+        def post(self, url, json):
+            clave = (json["id_producto_marca"], json["pagina"])
+            pedidos.append(clave)
+            paso = guion.get(clave, [])
+            if isinstance(paso, Exception): raise paso
+            return RespuestaFalsa({"data": paso})
+    return Cliente
+
+
+@pytest.fixture
+def sin_esperas(monkeypatch):
+    monkeypatch.setattr(ss.time, "sleep", lambda s: None)
+
+
+def item(i):
+    return {"id_producto": i, "descripcion": f"PRODUCTO {i}", "stock": str(i)}
+
+
+def test_scraping_4xx_pasa_a_la_siguiente_marca(monkeypatch, sin_esperas):
+    pedidos = []
+    guion = {(128, 1): [item(0)], (128, 2): ErrorHTTP("Status 404", 404), (145, 1): [item(1)]}
+    monkeypatch.setattr(ss, "ClienteHTTP", cliente_falso(guion, pedidos))
+
+    assert [p["id"] for p in ss.obtener_datos_scraping()] == [0, 1]
+    assert pedidos == [(128, 1), (128, 2), (145, 1), (145, 2), (249, 1)]
+    assert ss.leer_cursor()["completo"]
+
+
+@pytest.mark.parametrize("error", [CircuitoAbierto("Circuito abierto"), ErrorHTTP("Status 503", 503)])
+def test_scraping_error_transitorio_corta_y_deja_reanudar(monkeypatch, sin_esperas, error):
+    pedidos = []
+    guion = {(128, 1): [item(0)], (128, 2): [item(1)], (145, 1): error}
+    monkeypatch.setattr(ss, "ClienteHTTP", cliente_falso(guion, pedidos))
+
+    assert [p["id"] for p in ss.obtener_datos_scraping()] == [0, 1]
+    assert pedidos == [(128, 1), (128, 2), (128, 3), (145, 1)]
+    cursor = ss.backup_incompleto()
+    assert (cursor["marca"], cursor["pagina"], cursor["completo"]) == (128, 2, False)
+
+
+# --- Pipeline productor/consumidor ---
+
+class SesionFalsa:
+    def rollback(self): pass
+    def close(self): pass
+
+
+class CargadorFalso:
+    """Registra lo que recibe y confirma todo al finalizar."""
+    recibidos = []
+
+    def __init__(self, session, politica=None, tamano_lote=None, al_confirmar=None, politica_duplicados=None):
+        self.al_confirmar = al_confirmar
+        self.politica_duplicados = politica_duplicados
+        CargadorFalso.recibidos = []
+
+    def procesar(self, lote):
+        CargadorFalso.recibidos += lote
+
+    def finalizar(self):
+        self.al_confirmar(len(CargadorFalso.recibidos))
+
+
+def scraper_falso(paginas):
+    """Emula obtener_datos_scraping: backup por página, callback y cursor final."""
+    def obtener(reanudar_desde=None, en_pagina=None):
+        total = reanudar_desde["productos"] if reanudar_desde else 0
+        if not reanudar_desde: ss.iniciar_backup()
+        for n, pagina in enumerate(paginas, start=1):
+            total += len(pagina)
+            ss.guardar_pagina_backup(pagina, 249, n, total)
+            en_pagina(pagina)
+        ss.guardar_cursor({**ss.leer_cursor(), "completo": True})
+    return obtener
+
+
+def test_pipeline_sin_base_completa_el_backup(monkeypatch):
+    def sin_base():
+        raise ConnectionError("base caída")
+    monkeypatch.setattr(ss, "obtener_datos_scraping", scraper_falso([productos(0, 3), productos(3, 6)]))
+    monkeypatch.setattr(ss, "abrir_sesion_db", sin_base)
+
+    assert ss.scrapear_y_cargar(politica=ss.POLITICA_DEFECTO, max_paginas_en_cola=1) is False
+
+    assert ss.leer_backup() == productos(0, 6)
+    assert ss.backup_incompleto()["completo"]
+    assert ss.leer_productos_cargados() == 0
+
+
+def test_pipeline_reanuda_desde_lo_confirmado(monkeypatch):
+    escribir_paginas([productos(0, 3), productos(3, 5)])
+    ss.guardar_productos_cargados(2)
+    monkeypatch.setattr(ss, "obtener_datos_scraping", scraper_falso([productos(5, 8)]))
+    monkeypatch.setattr(ss, "abrir_sesion_db", SesionFalsa)
+    monkeypatch.setattr(ss, "CargadorStock", CargadorFalso)
+
+    assert ss.scrapear_y_cargar(politica=ss.POLITICA_DEFECTO, reanudar_desde=ss.backup_incompleto())
+
+    assert CargadorFalso.recibidos == productos(2, 8)
+    assert ss.leer_productos_cargados() == 8
+    assert ss.backup_incompleto() is None
+
+
+def test_pipeline_interactivo_pregunta_antes_de_scrapear(monkeypatch, capsys):
+    eventos = []
+
+    def obtener(reanudar_desde=None, en_pagina=None):
+        eventos.append("scraping")
+        print("   Pag 1... -> 1 items")
+        scraper_falso([productos(0, 1)])(reanudar_desde, en_pagina)
+
+    def pedir():
+        eventos.append("pregunta")
+        return "conservar_ultimo"
+
+    monkeypatch.setattr(ss, "obtener_datos_scraping", obtener)
+    monkeypatch.setattr(ss, "pedir_politica_duplicados", pedir)
+    monkeypatch.setattr(ss, "abrir_sesion_db", SesionFalsa)
+    monkeypatch.setattr(ss, "CargadorStock", CargadorFalso)
+
+    assert ss.scrapear_y_cargar(politica=None)
+
+    assert eventos == ["pregunta", "scraping"]
+    assert "Pag 1..." in capsys.readouterr().out
+
+
+def test_salida_diferida_retiene_solo_al_hilo():
+    class Destino:
+        texto = ""
+        def write(self, t): Destino.texto += t
+        def flush(self): pass
+
+    listo = threading.Event()
+    hilo = threading.Thread(target=lambda: (salida.write("productor\n"), listo.set()))
+    salida = ss.SalidaDiferida(Destino(), hilo)
+    hilo.start()
+    listo.wait()
+    salida.write("pregunta? ")
+
+    assert Destino.texto == "pregunta? "
+    salida.volcar()
+    assert Destino.texto == "pregunta? productor\n"
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""MotorSimilitud contra NearestNeighbors(metric='cosine') de sklearn"""
+import random
+
+import numpy as np
+import pytest
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import normalize
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from normalizacion import normalizar_texto
+from similitud import MotorSimilitud
+
+
+def armar_caso(nombres, n_consultas=3000, variantes=8):
+    """(matriz de productos, consultas) TF-IDF como las del matching. Los
+    productos se repiten con sufijos para llegar al tamaño real (con nombres
+    repetidos: hay empates)."""
+    productos = [normalizar_texto(f"{n} V{k}") for k in range(variantes) for n in nombres] + [""] + nombres[:200]
+    vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5), max_features=6000, sublinear_tf=True)
+    matriz = vectorizer.fit_transform([normalizar_texto(p) for p in productos])
+    rnd = random.Random(1)
+    textos = [normalizar_texto(rnd.choice(nombres).lower() + rnd.choice(["", " x 10", " 5%", " gold"]))
+              for _ in range(n_consultas)] + ["", "ZZZZ"]
+    return matriz, vectorizer.transform(textos)
+
+
+def comparar(motor, nn, matriz, consultas, k):
+    """Mismos vecinos que sklearn salvo empates (misma distancia, otro producto)"""
+    d_nuevo, i_nuevo = motor.kneighbors(consultas, k)
+    d_sk, i_sk = nn.kneighbors(consultas, n_neighbors=k)
+    assert np.allclose(d_nuevo, d_sk, rtol=0, atol=1e-9)
+    distintos = i_nuevo != i_sk
+    if distintos.any():
+        filas, cols = np.nonzero(distintos)
+        normalizada = normalize(matriz)
+        q = normalize(consultas)
+        for f, c in zip(filas, cols):
+            s_nuevo = q[f].multiply(normalizada[i_nuevo[f, c]]).sum()
+            s_sk = q[f].multiply(normalizada[i_sk[f, c]]).sum()
+            assert abs(s_nuevo - s_sk) < 1e-9, (f, c)
+    return int(distintos.any(axis=1).sum())
+
+
+@pytest.fixture(scope="module")
+def caso(catalogo):
+    nombres = [fila.get("PRODUCTO") or "" for fila in catalogo]
+    matriz, consultas = armar_caso(nombres, n_consultas=600, variantes=2)
+    return matriz, consultas, MotorSimilitud(matriz)
+
+
+def test_vecinos_iguales_a_nearest_neighbors(caso):
+    matriz, consultas, motor = caso
+    nn = NearestNeighbors(n_neighbors=5, metric='cosine').fit(matriz)
+    comparar(motor, nn, matriz, consultas, 1)
+    comparar(motor, nn, matriz, consultas[:200], 5)
+
+
+def test_bloques_chicos_y_varios_hilos(caso):
+    matriz, consultas, motor = caso
+    chico = MotorSimilitud(matriz, hilos=3)
+    assert all((a == b).all() for a, b in zip(chico.kneighbors(consultas[:300], 5, memoria_bloque=1 << 20),
+                                                 motor.kneighbors(consultas[:300], 5)))
+    assert MotorSimilitud(matriz[:3]).kneighbors(consultas[:4], 5)[1].shape == (4, 3)
+
+
+def test_subconjunto_y_pares_permitidos(caso):
+    matriz, consultas, motor = caso
+    # Subconjunto: lo mismo que un motor armado solo con esas filas
+    posiciones = np.arange(0, matriz.shape[0], 7)
+    d_sub, i_sub = MotorSimilitud(matriz[posiciones]).kneighbors(consultas[:200], 3)
+    d_pos, i_pos = motor.subconjunto(posiciones).kneighbors(consultas[:200], 3)
+    assert np.allclose(d_sub, d_pos) and (posiciones[i_sub] == i_pos).all()
+    # Pares no permitidos: como si esos productos no estuvieran
+    permitidos = np.zeros((200, matriz.shape[0]), dtype=bool)
+    permitidos[:, posiciones] = True
+    d_perm, i_perm = motor.kneighbors(consultas[:200], 3, permitidos=permitidos)
+    assert np.allclose(d_perm, d_pos) and (i_perm == i_pos).all()